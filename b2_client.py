@@ -0,0 +1,250 @@
+import hashlib
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from b2sdk.v2 import InMemoryAccountInfo, B2Api, UploadSourceLocalFile, WriteIntent
+from b2sdk.v2.exception import FileNotPresent
+
+# Thời hạn của download authorization (giây) và khoảng thời gian làm mới trước khi hết hạn
+DEFAULT_DOWNLOAD_AUTH_SECONDS = 3600
+REFRESH_MARGIN_SECONDS = 300
+# Upload: file từ ngưỡng này (MB) trở lên được chia phần và upload song song
+DEFAULT_LARGE_FILE_THRESHOLD_MB = 100
+DEFAULT_PART_SIZE_MB = 25
+DEFAULT_UPLOAD_THREADS = 4
+MB = 1024 * 1024
+
+
+def file_sha1(file_path, chunk_size=MB):
+    """
+    Compute the SHA-1 (hex) of a local file, reading it in chunks.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_b2_config(config_file):
+    """
+    Read the <backblaze> section of the XML configuration file.
+
+    Args:
+        config_file (str): Path to the XML configuration file.
+
+    Returns:
+        dict: key_id, application_key, realm, download_auth_seconds and the upload settings
+            (large_file_threshold and part_size in bytes, upload_threads).
+    """
+    root = ET.parse(config_file).getroot()
+    realm = root.findtext("./backblaze/realm", default="production").strip() or "production"
+
+    def get_int(tag, default):
+        value = root.findtext(f"./backblaze/{tag}", default="").strip()
+        return int(value) if value else default
+
+    return {
+        "key_id": root.find("./backblaze/key_id").text,
+        "application_key": root.find("./backblaze/application_key").text,
+        # "production" or the URL of a B2-compatible endpoint, e.g. a local emulator
+        "realm": realm,
+        "download_auth_seconds": get_int("download_auth_seconds", DEFAULT_DOWNLOAD_AUTH_SECONDS),
+        "large_file_threshold": get_int("large_file_threshold_mb", DEFAULT_LARGE_FILE_THRESHOLD_MB) * MB,
+        "part_size": get_int("part_size_mb", DEFAULT_PART_SIZE_MB) * MB,
+        "upload_threads": max(1, get_int("upload_threads", DEFAULT_UPLOAD_THREADS)),
+    }
+
+
+class B2Client:
+    """
+    Single entry point for every Backblaze B2 operation of the pipeline.
+
+    The account is authorized lazily, once per client; b2sdk keeps the account token and
+    re-authorizes by itself when the token expires. Bucket objects and download
+    authorizations are cached: a download token covers a whole folder and is reused until
+    shortly before it expires, so loading many files costs one token request per folder
+    and hour instead of an authorization round trip per file. The client is thread-safe.
+
+    Args:
+        config_file (str): Path to the XML configuration file.
+        api (B2Api, optional): An already authorized b2sdk client to use instead of
+            authorizing with the configured key, e.g. one backed by b2sdk's RawSimulator.
+    """
+
+    def __init__(self, config_file, api=None):
+        self.config = load_b2_config(config_file)
+        self._api = api
+        self._buckets = {}
+        self._download_auths = {}
+        self._lock = threading.Lock()
+
+    @property
+    def api(self):
+        """
+        B2Api: The authorized b2sdk client (authorized on first use).
+        """
+        with self._lock:
+            if self._api is None:
+                api = B2Api(InMemoryAccountInfo(), max_upload_workers=self.config["upload_threads"])
+                api.authorize_account(
+                    self.config["realm"], self.config["key_id"], self.config["application_key"]
+                )
+                self._api = api
+            return self._api
+
+    def bucket(self, bucket_name):
+        """
+        Return the (cached) bucket with the given name.
+        """
+        api = self.api
+        with self._lock:
+            if bucket_name not in self._buckets:
+                self._buckets[bucket_name] = api.get_bucket_by_name(bucket_name)
+            return self._buckets[bucket_name]
+
+    def file_exists(self, bucket_name, file_name):
+        """
+        Check whether a file exists in a bucket.
+
+        Args:
+            bucket_name (str): Name of the B2 bucket.
+            file_name (str): Full file name, including the folder.
+
+        Returns:
+            bool: True if the file exists, False otherwise.
+        """
+        try:
+            self.bucket(bucket_name).get_file_info_by_name(file_name)
+            return True
+        except FileNotPresent:
+            return False
+
+    def upload_file(self, bucket_name, file_name, local_file, file_infos=None):
+        """
+        Upload a local file to a bucket and check what landed.
+
+        Files smaller than large_file_threshold go up in a single request, which B2 verifies
+        against the SHA-1 sent with it; the size and content SHA-1 reported back must match
+        the local file. Larger files are uploaded as a large file: parts of part_size bytes
+        (the last one up to part_size plus the account's minimum part size, so a file
+        shorter than that still goes up in one request) sent by upload_threads threads. B2 verifies each part against its SHA-1 while it is
+        uploaded but keeps no SHA-1 of the whole file, and the whole-file SHA-1 stored in
+        the large_file_sha1 file info is the one this client sends, so only the size
+        reported back is checked for large files.
+
+        Args:
+            bucket_name (str): Name of the B2 bucket.
+            file_name (str): Full file name in the bucket, including the folder.
+            local_file (str): Path to the local file.
+            file_infos (dict, optional): Custom file info stored with the file.
+
+        Returns:
+            str: The SHA-1 (hex) of the local file.
+
+        Raises:
+            ValueError: If the size, or the content SHA-1 of a single-request upload,
+                reported by B2 does not match the local file.
+        """
+        size = os.path.getsize(local_file)
+        sha1 = file_sha1(local_file)
+        bucket = self.bucket(bucket_name)
+        if size >= self.config["large_file_threshold"]:
+            # B2 không nhận phần nhỏ hơn absoluteMinimumPartSize của tài khoản
+            min_part_size = self.api.account_info.get_absolute_minimum_part_size()
+            part_size = max(self.config["part_size"], min_part_size)
+        else:
+            # Kích thước phần không nhỏ hơn file: upload trong một request
+            part_size = min_part_size = max(size, 1)
+
+        # Truyền cả recommended và max: nếu chỉ có min_part_size, b2sdk chia theo
+        # recommendedPartSize của tài khoản (100 MB) thay vì part_size
+        file_version = bucket.create_file(
+            [WriteIntent(UploadSourceLocalFile(local_path=local_file, content_sha1=sha1))],
+            file_name,
+            file_info=file_infos or {},
+            recommended_upload_part_size=part_size,
+            min_part_size=min_part_size,
+            max_part_size=part_size,
+            large_file_sha1=sha1,
+        )
+        # Large file không có content_sha1 ("none"): chỉ kiểm tra được kích thước
+        landed_sha1 = file_version.content_sha1
+        sha1_checked = landed_sha1 not in (None, "none")
+        if file_version.size != size or (sha1_checked and landed_sha1 != sha1):
+            raise ValueError(
+                f"{file_name} on B2 ({file_version.size} bytes, SHA-1 {landed_sha1}) "
+                f"does not match the local file ({size} bytes, SHA-1 {sha1})."
+            )
+        return sha1
+
+    def download_authorization(self, bucket_name, file_name_prefix, refresh=False):
+        """
+        Return a download authorization token for a file name prefix, reusing the cached
+        token until REFRESH_MARGIN_SECONDS before it expires.
+
+        Args:
+            bucket_name (str): Name of the B2 bucket.
+            file_name_prefix (str): Prefix the token is valid for.
+            refresh (bool): Request a new token even if a cached one is still valid
+                (e.g. after the download server rejected it).
+
+        Returns:
+            str: The authorization token.
+        """
+        key = (bucket_name, file_name_prefix)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._download_auths.get(key)
+            if cached and not refresh and cached[1] - REFRESH_MARGIN_SECONDS > now:
+                return cached[0]
+
+        duration = self.config["download_auth_seconds"]
+        token = self.bucket(bucket_name).get_download_authorization(file_name_prefix, duration)
+        with self._lock:
+            self._download_auths[key] = (token, now + duration)
+        return token
+
+    def download_url(self, bucket_name, file_name, refresh=False):
+        """
+        Build the URL and Authorization header value to download a file over HTTP.
+        The token is requested for the file's folder so other files in it share it.
+
+        Args:
+            bucket_name (str): Name of the B2 bucket.
+            file_name (str): Full file name, including the folder.
+            refresh (bool): Force a new download authorization.
+
+        Returns:
+            dict: download_url_base (the file URL) and authorization_token.
+        """
+        folder, _, _ = file_name.rpartition("/")
+        token = self.download_authorization(
+            bucket_name, folder + "/" if folder else file_name, refresh
+        )
+        return {
+            "download_url_base": f"{self.api.account_info.get_download_url()}/file/{bucket_name}/{file_name}",
+            "authorization_token": token,
+        }
+
+
+# Client dùng chung trong tiến trình, theo từng file config
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(config_file):
+    """
+    Return the process-wide B2Client for a configuration file.
+
+    Args:
+        config_file (str): Path to the XML configuration file.
+
+    Returns:
+        B2Client: The shared client.
+    """
+    with _clients_lock:
+        if config_file not in _clients:
+            _clients[config_file] = B2Client(config_file)
+        return _clients[config_file]
@@ -0,0 +1,339 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import psycopg2
+from psycopg2 import extras
+import b2_client as b2_client_module
+import http_client
+import load_to_staging
+import load_to_dw
+import migrate
+import output_writer
+import partition_manager
+import pipeline
+import row_hash
+
+# Nơi lấy file .csv đã lưu: 'local' (thư mục source_file_location, ví dụ daily/) hoặc 'b2'
+SOURCES = ("local", "b2")
+DEFAULT_WORKERS = 4
+
+
+def fetch_archived_file(conn, id_config, date):
+    """
+    Lấy file .csv mới nhất của id_config trong ngày từ file_logs (không xét status,
+    vì backfill nạp lại cả những ngày đã vào dw).
+
+    :param conn: Kết nối PostgreSQL.
+    :param id_config: ID Config cần lọc.
+    :param date: Ngày cần lọc (chuỗi 'YYYY-MM-DD').
+    :return: Dictionary thông tin file hoặc dictionary rỗng nếu không có.
+    """
+    query = """
+    SELECT
+        fl.id,
+        fl.id_config,
+        fl.file_name,
+        fl.time,
+        fl.status,
+        fl.content_sha1,
+        fc.source_file_location,
+        fc.destination_table_staging,
+        fc.bucket_name,
+        fc.folder_b2_name
+    FROM file_logs fl
+        INNER JOIN file_config fc ON fl.id_config = fc.id
+    WHERE fl.id_config = %s AND fl.time::date = %s AND fl.file_name IS NOT NULL
+    ORDER BY fl.id DESC
+    LIMIT 1
+    """
+    with conn.cursor(cursor_factory=extras.DictCursor) as cur:
+        cur.execute(query, (id_config, date))
+        row = cur.fetchone()
+    return dict(row) if row else {}
+
+
+def latest_dw_load(conn):
+    """
+    Ngày dt_load_to_dw lớn nhất trong dw (None nếu dw rỗng).
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(dt_load_to_dw) FROM dw")
+        return cur.fetchone()[0]
+
+
+def configs_loaded_since(conn, start):
+    """
+    Danh sách id_config có phiên bản trong dw được load từ ngày `start` trở đi.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT DISTINCT id_config FROM dw WHERE dt_load_to_dw >= %s ORDER BY id_config",
+            (start,),
+        )
+        return [str(row[0]) for row in cur.fetchall()]
+
+
+def rewind_dw(conn, start):
+    """
+    Đưa dw về trạng thái trước ngày `start`: xóa các phiên bản được load từ ngày `start`
+    và mở lại (dt_last_update = '9999-12-31') các bản ghi bị chúng đóng. Chạy trong một transaction.
+
+    :param conn: Kết nối PostgreSQL.
+    :param start: Ngày đầu của khoảng backfill.
+    :return: (số phiên bản đã xóa, số bản ghi được mở lại).
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM dw WHERE dt_load_to_dw >= %s", (start,))
+            deleted = cur.rowcount
+            # Bản ghi bị đóng vào ngày X là do phiên bản mới được load vào ngày X
+            cur.execute(
+                """
+                UPDATE dw
+                SET dt_last_update = '9999-12-31'
+                WHERE dt_last_update >= %s
+                  AND dt_last_update <> '9999-12-31'
+                """,
+                (start,),
+            )
+            reopened = cur.rowcount
+        conn.commit()
+        print(f"Đã xóa {deleted} phiên bản load từ {start} và mở lại {reopened} bản ghi trong dw.")
+        return deleted, reopened
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Lỗi khi đưa dw về trước ngày {start}: {e}")
+        raise
+
+
+def open_archived_csv(file_info, source, b2_client):
+    """
+    Mở file đã lưu (.csv, .csv.gz hoặc .parquet) dạng stream. Nếu file log có SHA-1 thì
+    nội dung được kiểm tra trong lúc đọc (iterator báo lỗi sau dòng cuối nếu không khớp).
+
+    :return: (đối tượng cần đóng, iterator các dòng, danh sách cột tiêu đề).
+    """
+    if source == "local":
+        handle = open(
+            os.path.join(file_info["source_file_location"], file_info["file_name"]), mode="rb"
+        )
+        reader, headers = output_writer.open_reader(
+            handle, file_info["file_name"], expected_sha1=file_info["content_sha1"]
+        )
+        return handle, reader, headers
+
+    file_path = file_info["folder_b2_name"] + "/" + file_info["file_name"]
+    url = load_to_staging.get_download_url(b2_client, file_info["bucket_name"], file_path)
+    return load_to_staging.open_csv_stream(
+        url,
+        file_info["file_name"],
+        lambda: b2_client.download_url(file_info["bucket_name"], file_path, refresh=True),
+        file_info["content_sha1"],
+    )
+
+
+def stage_day(db_config, id_config, date, source, b2_client, staging_config, tracked_columns):
+    """
+    Nạp lại file .csv của một (id_config, ngày) vào staging trên kết nối riêng của worker.
+    Dữ liệu staging cũ của ngày đó (dt_load = ngày) được xóa trong cùng transaction,
+    file log được chuyển RUNNING -> LS để bước dw nhận.
+
+    :return: True nếu nạp thành công, False nếu lỗi, None nếu ngày đó không có file.
+    """
+    conn = load_to_staging.connect_to_database(db_config)
+    file_info, handles = {}, []
+    try:
+        file_info = fetch_archived_file(conn, id_config, date)
+        if not file_info:
+            print(f"Không có file của ID Config {id_config} ngày {date} trong file_logs, bỏ qua.")
+            return None
+
+        handle, reader, headers = open_archived_csv(file_info, source, b2_client)
+        handles.append(handle)
+        if "product_name" not in headers or "sku" not in headers:
+            raise ValueError(f"{file_info['file_name']} thiếu cột 'product_name' hoặc 'sku'.")
+        readers = [reader]
+
+        def make_rows():
+            # Lần đầu dùng luồng đã mở; nếu phải fallback thì mở lại file
+            if readers:
+                current = readers.pop()
+            else:
+                retry_handle, current, _ = open_archived_csv(file_info, source, b2_client)
+                handles.append(retry_handle)
+            return load_to_staging.extend_rows(
+                current, headers, id_config, file_info["time"], date, tracked_columns
+            )
+
+        load_to_staging.update_status(conn, file_info["id"], id_config, file_info["time"], "RUNNING")
+        table = file_info["destination_table_staging"]
+        partition_manager.ensure_partition(conn, table, date)
+        row_count = load_to_staging.load_rows(
+            conn,
+            table,
+            headers + load_to_staging.EXTRA_COLUMNS,
+            make_rows,
+            staging_config["load_method"],
+            staging_config["batch_size"],
+            batch=(id_config, date),
+        )
+        conn.commit()
+        print(f"Đã nạp lại {file_info['file_name']} vào {table} ({row_count} dòng).")
+        load_to_staging.update_status(conn, file_info["id"], id_config, file_info["time"], "LS")
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Lỗi khi nạp lại ID Config {id_config} ngày {date}: {e}")
+        if file_info:
+            # Trả file log về trạng thái trước khi backfill
+            load_to_staging.update_status(conn, file_info["id"], id_config, file_info["time"], file_info["status"])
+        return False
+    finally:
+        for handle in handles:
+            handle.close()
+        conn.close()
+
+
+def run_backfill(path_config, db_config, id_configs, dates, source, workers, b2_client=None):
+    """
+    Backfill một khoảng ngày:
+    - Nạp staging song song (tải/đọc file và parse CSV chạy đồng thời, mỗi worker một kết nối).
+    - Merge SCD2 vào dw tuần tự theo thứ tự ngày, để lịch sử các phiên bản đúng như khi chạy hằng ngày.
+      Ngày không có file được bỏ qua (như ngày không chạy pipeline); nếu một ngày của id_config
+      nạp staging hoặc merge lỗi thì các ngày sau của id_config đó không được merge
+      (file log của chúng ở lại LS để chạy lại).
+
+    :return: Danh sách kết quả {id_config, date, stage, ok, seconds} như pipeline.run_pipeline.
+    """
+    staging_config = load_to_staging.load_staging_config(path_config)
+    tracked_columns = row_hash.load_tracked_columns(path_config)
+
+    def stage(id_config, day):
+        started = time.perf_counter()
+        ok = stage_day(db_config, id_config, day, source, b2_client, staging_config, tracked_columns)
+        return ok, time.perf_counter() - started
+
+    staged = {}
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(stage, id_config, day): (id_config, day)
+            for day in dates
+            for id_config in id_configs
+        }
+        for future in as_completed(futures):
+            id_config, day = futures[future]
+            ok, seconds = future.result()
+            staged[(id_config, day)] = ok
+            if ok is None:
+                continue
+            results.append({"id_config": id_config, "date": day, "stage": "staging", "ok": ok, "seconds": seconds})
+
+    conn = load_to_dw.connect_to_database(db_config)
+    try:
+        stopped = set()
+        for day in dates:
+            for id_config in id_configs:
+                if id_config in stopped:
+                    continue
+                if staged[(id_config, day)] is None:
+                    continue
+                if not staged[(id_config, day)]:
+                    print(f"ID Config {id_config} nạp lỗi ngày {day}, dừng merge các ngày sau.")
+                    stopped.add(id_config)
+                    continue
+                print(f"=== dw | ID Config: {id_config} | Date: {day} ===")
+                started = time.perf_counter()
+                try:
+                    ok = bool(load_to_dw.run_load_to_dw(conn, id_config, path_config, day))
+                except Exception as e:
+                    print(f"Lỗi ở bước dw: {e}")
+                    conn.rollback()
+                    ok = False
+                if not ok:
+                    # Merge lỗi (kể cả merge_scd2_into_dw trả về None): các phiên bản của
+                    # ngày sau phụ thuộc ngày này nên không được merge
+                    print(f"ID Config {id_config} merge lỗi ngày {day}, dừng merge các ngày sau.")
+                    stopped.add(id_config)
+                results.append(
+                    {"id_config": id_config, "date": day, "stage": "dw", "ok": ok, "seconds": time.perf_counter() - started}
+                )
+    finally:
+        conn.close()
+    return sorted(results, key=lambda result: (result["stage"] != "staging", result["date"], int(result["id_config"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Nạp lại file .csv đã lưu của một khoảng ngày vào staging và dw."
+    )
+    parser.add_argument("id_configs", help="Một hoặc nhiều id_config, cách nhau bởi dấu phẩy (ví dụ 1,2)")
+    parser.add_argument("path_config", help="Đường dẫn file config.xml")
+    parser.add_argument("dates", help="Ngày YYYY-MM-DD hoặc khoảng YYYY-MM-DD:YYYY-MM-DD")
+    parser.add_argument(
+        "--source",
+        choices=SOURCES,
+        default="local",
+        help="Lấy file từ thư mục source_file_location (local) hoặc từ B2 (mặc định local)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help=f"Số file nạp song song (mặc định {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--rewind",
+        action="store_true",
+        help="Xóa các phiên bản trong dw được load từ ngày đầu khoảng trở đi trước khi merge lại",
+    )
+    args = parser.parse_args()
+
+    try:
+        dates = pipeline.parse_dates(args.dates)
+    except ValueError as e:
+        print(f"Lỗi: {e}")
+        sys.exit(1)
+    id_configs = [value.strip() for value in args.id_configs.split(",") if value.strip()]
+
+    print(f"ID Config: {', '.join(id_configs)}")
+    print(f"Date: {dates[0]} -> {dates[-1]} | nguồn: {args.source} | {args.workers} worker")
+
+    started = time.perf_counter()
+    http_client.configure_from_file(args.path_config)
+    db_config = load_to_dw.load_database_config("dw", args.path_config)
+    conn = load_to_dw.connect_to_database(db_config)
+    try:
+        # Merge một ngày cũ lên trên dữ liệu mới hơn sẽ làm sai lịch sử SCD2
+        latest = latest_dw_load(conn)
+        if latest is not None and latest >= partition_manager.to_date(dates[0]):
+            if not args.rewind:
+                print(
+                    f"Lỗi: dw đã có dữ liệu load tới {latest}, không nhỏ hơn ngày {dates[0]}. "
+                    "Dùng --rewind để xóa các phiên bản từ ngày đó và merge lại theo thứ tự."
+                )
+                sys.exit(1)
+            if latest > partition_manager.to_date(dates[-1]):
+                print(f"Lỗi: dw đã có dữ liệu load tới {latest}, khoảng backfill phải kéo dài tới ngày đó.")
+                sys.exit(1)
+            missing = sorted(set(configs_loaded_since(conn, dates[0])) - set(id_configs), key=int)
+            if missing:
+                print(f"Lỗi: --rewind xóa cả dữ liệu của ID Config {', '.join(missing)}, hãy thêm vào danh sách.")
+                sys.exit(1)
+            rewind_dw(conn, dates[0])
+            # Bản ghi cũ được mở lại có thể chưa có row_hash
+            migrate.backfill_row_hash(conn, row_hash.load_tracked_columns(args.path_config))
+    finally:
+        conn.close()
+
+    b2_client = b2_client_module.get_client(args.path_config) if args.source == "b2" else None
+    results = run_backfill(
+        args.path_config, db_config, id_configs, dates, args.source, max(1, args.workers), b2_client
+    )
+    pipeline.print_timings(results)
+    print(f"Thời gian thực tế: {time.perf_counter() - started:.2f}s")
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+
+
+class CheckpointJournal:
+    """
+    Nhật ký các sản phẩm đã cào xong của một lượt extract (một id_config, một ngày).
+    Mỗi dòng là một JSON {"url": ..., "row": {...}} được ghi ngay khi sản phẩm cào xong,
+    nên nếu tiến trình lỗi giữa chừng, lần chạy lại chỉ cần cào các URL còn thiếu.
+
+    :param journal_path: Đường dẫn file nhật ký.
+    """
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.rows = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(journal_path, mode="a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, mode="rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # Dòng cuối bị ghi dở khi tiến trình dừng đột ngột: cắt bỏ, nếu không dòng
+            # ghi tiếp theo sẽ bị nối vào nó và mất khi đọc lại
+            with open(self.journal_path, mode="r+b") as f:
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue
+            self.rows[entry["url"]] = entry["row"]
+        if self.rows:
+            print(f"Tiếp tục từ checkpoint: {len(self.rows)} sản phẩm đã cào trước đó.")
+
+    def get(self, url):
+        return self.rows.get(url)
+
+    def record(self, url, row):
+        line = json.dumps({"url": url, "row": row}, ensure_ascii=False)
+        with self._lock:
+            self.rows[url] = row
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def remove(self):
+        """
+        Đóng và xóa nhật ký (gọi khi file đầu ra đã được commit thành công).
+        """
+        self.close()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
@@ -0,0 +1,185 @@
+import csv
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+import xml.etree.ElementTree as ET
+
+# Ngày có id = 1 trong date_dim; vị trí trong mảng là số ngày tính từ ngày này
+EPOCH = date(2005, 1, 1)
+# Xử lý khi một ngày chưa có trong date_dim:
+# extend: sinh thêm lịch tới hết năm của ngày đó rồi nạp vào date_dim | null: dt_dim để NULL | error: báo lỗi
+MISS_POLICIES = ("extend", "null", "error")
+DEFAULT_MISS_POLICY = "extend"
+# Giá trị trong mảng cho ngày chưa có id
+MISSING = 0
+
+
+def load_miss_policy(config_path):
+    """
+    Hàm đọc thẻ <date_dim><on_miss> trong file config.xml.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Một trong MISS_POLICIES.
+    """
+    node = ET.parse(config_path).getroot().find("./date_dim/on_miss")
+    policy = node.text.strip() if node is not None and node.text else DEFAULT_MISS_POLICY
+    if policy not in MISS_POLICIES:
+        raise ValueError(f"on_miss phải là một trong: {', '.join(MISS_POLICIES)}.")
+    return policy
+
+
+def to_date(value):
+    """
+    Chuyển chuỗi 'YYYY-MM-DD', datetime hoặc date thành date.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+class DateKeyCache:
+    """
+    Bảng tra ngày -> date_dim.id trong bộ nhớ: một mảng số nguyên 32 bit, vị trí là số ngày
+    tính từ EPOCH (khoảng 4 byte mỗi ngày, 20 năm chưa tới 30 KB), tra cứu không cần truy vấn.
+    Một tiến trình chỉ cần nạp một lần (xem get_shared_cache); có thể dùng chung giữa các luồng.
+
+    :param miss_policy: Xử lý khi ngày chưa có trong date_dim (MISS_POLICIES).
+    :param config_path: File config.xml để đọc ngày lễ khi sinh thêm lịch.
+    """
+
+    def __init__(self, miss_policy=DEFAULT_MISS_POLICY, config_path=None):
+        if miss_policy not in MISS_POLICIES:
+            raise ValueError(f"miss_policy phải là một trong: {', '.join(MISS_POLICIES)}.")
+        self.miss_policy = miss_policy
+        self.config_path = config_path
+        self._ids = array("i")
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(1 for key in self._ids if key != MISSING)
+
+    def add(self, day, key):
+        """
+        Ghi id của một ngày vào mảng (mảng tự nới ra khi cần).
+        """
+        offset = (to_date(day) - EPOCH).days
+        if offset < 0:
+            raise ValueError(f"Ngày {day} trước {EPOCH}, không nằm trong date_dim.")
+        if offset >= len(self._ids):
+            self._ids.extend([MISSING] * (offset + 1 - len(self._ids)))
+        self._ids[offset] = int(key)
+
+    def add_rows(self, rows):
+        """
+        Ghi nhiều dòng (full_date, id).
+
+        :return: Số dòng đã ghi.
+        """
+        count = 0
+        for day, key in rows:
+            self.add(day, key)
+            count += 1
+        return count
+
+    def load_database(self, conn, start=None, end=None):
+        """
+        Nạp (full_date, id) từ bảng date_dim, có thể giới hạn trong khoảng ngày [start, end].
+
+        :return: Số dòng đã nạp.
+        """
+        query = "SELECT full_date, id FROM date_dim WHERE full_date >= %s"
+        params = [start or EPOCH]
+        if end is not None:
+            query += " AND full_date <= %s"
+            params.append(end)
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return self.add_rows(cur.fetchall())
+
+    def load_csv(self, csv_path):
+        """
+        Nạp từ file date_dim.csv (không có dòng tiêu đề, cột 1 là id, cột 2 là full_date).
+
+        :return: Số dòng đã nạp.
+        """
+        with open(csv_path, mode="r", encoding="utf-8", newline="") as f:
+            return self.add_rows((row[1], row[0]) for row in csv.reader(f) if row)
+
+    def get(self, day):
+        """
+        Tra id của một ngày, không áp dụng miss_policy.
+
+        :return: id hoặc None nếu chưa có.
+        """
+        offset = (to_date(day) - EPOCH).days
+        if 0 <= offset < len(self._ids) and self._ids[offset] != MISSING:
+            return self._ids[offset]
+        return None
+
+    def lookup(self, day, conn=None):
+        """
+        Tra id của một ngày; nếu chưa có thì xử lý theo miss_policy.
+
+        :param day: Ngày cần tra (chuỗi 'YYYY-MM-DD', date hoặc datetime).
+        :param conn: Kết nối PostgreSQL, bắt buộc với miss_policy 'extend'.
+        :return: id hoặc None (miss_policy 'null', hoặc ngày trước EPOCH).
+        """
+        key = self.get(day)
+        if key is not None:
+            return key
+
+        day = to_date(day)
+        if self.miss_policy == "error":
+            raise KeyError(f"Ngày {day} chưa có trong date_dim.")
+        if self.miss_policy == "null" or day < EPOCH:
+            return None
+        if conn is None:
+            raise ValueError("Cần kết nối cơ sở dữ liệu để sinh thêm lịch cho date_dim.")
+
+        with self._lock:
+            # Luồng khác có thể vừa sinh thêm lịch
+            if self.get(day) is None:
+                self.extend(conn, day)
+        return self.get(day)
+
+    def extend(self, conn, day):
+        """
+        Sinh lịch từ ngày cuối cùng đã có (hoặc từ `day` nếu sớm hơn) tới hết năm của `day`,
+        nạp vào date_dim (chỉ những ngày chưa có) rồi nạp lại khoảng đó vào mảng.
+        """
+        # Chỉ cần pandas khi thật sự phải sinh thêm lịch
+        import insert_date_dim
+
+        start = min(day, EPOCH + timedelta(days=len(self._ids)))
+        end = date(day.year, 12, 31)
+        holidays = insert_date_dim.load_holidays(self.config_path) if self.config_path else (set(), set())
+        frame = insert_date_dim.build_date_dim(start, end, holidays)
+        if insert_date_dim.insert_date_dim(conn, frame) is None:
+            raise RuntimeError(f"Không thể sinh thêm lịch date_dim từ {start} tới {end}.")
+        self.load_database(conn, start, end)
+
+
+# Bảng tra dùng chung trong tiến trình (pipeline, scheduler, backfill gọi load_to_dw nhiều lần)
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache(conn, config_path):
+    """
+    Trả về bảng tra dùng chung của tiến trình, nạp từ date_dim ở lần gọi đầu tiên.
+
+    :param conn: Kết nối PostgreSQL.
+    :param config_path: Đường dẫn file config.xml (đọc on_miss và ngày lễ).
+    :return: DateKeyCache.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            cache = DateKeyCache(load_miss_policy(config_path), config_path)
+            count = cache.load_database(conn)
+            conn.commit()
+            print(f"Đã nạp {count} ngày từ date_dim vào bộ nhớ.")
+            _shared_cache = cache
+        return _shared_cache
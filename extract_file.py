@@ -1,6 +1,3 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import re
 from datetime import datetime
 import sys
@@ -12,100 +9,296 @@ import psycopg2
 import time
 from psycopg2 import extras
 import csv
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlparse
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from b2sdk.v2 import InMemoryAccountInfo, B2Api
+import http_client
+import product_parser
+import page_cache as page_cache_module
+import b2_client as b2_client_module
+import output_writer
+from checkpoint import CheckpointJournal
 
 EMAIL = os.getenv("MY_EMAIL_DW_VAR")
 
+# Cấu hình mặc định cho việc cào dữ liệu (có thể ghi đè trong thẻ <scraper> của config.xml)
+DEFAULT_BASE_URL = "https://kinhmatviettin.vn/product-categories/gong-kinh?pages="
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_START_PAGE = 1
+DEFAULT_MAX_PAGES = 0  # 0: không giới hạn, dừng theo phân trang hoặc trang rỗng/trùng đầu tiên
+# Giới hạn cứng số trang danh mục của một lần cào (kể cả khi max_pages = 0)
+MAX_CRAWL_PAGES = 1000
+DEFAULT_PARSER_BACKEND = product_parser.DEFAULT_BACKEND
 
-# Hàm lấy danh sách link sản phẩm từ trang danh mục
-def get_product_links(page_url):
-    response = requests.get(page_url)
-    soup = BeautifulSoup(response.content, "html.parser")
 
-    # Tìm tất cả liên kết sản phẩm trong trang danh mục
-    product_links = []
-    for link in soup.find_all("a", class_="ps-product__title"):
-        product_url = link.get("href")
-        if product_url:
-            product_links.append(f"{product_url}")
+class HostLimiter:
+    """
+    Giới hạn số request đồng thời tới cùng một host khi cào song song.
+
+    :param per_host_limit: Số request tối đa được chạy cùng lúc cho mỗi host.
+    """
+
+    def __init__(self, per_host_limit):
+        self.per_host_limit = max(1, int(per_host_limit))
+        self._lock = threading.Lock()
+        self._semaphores = {}
 
-    return product_links
+    def for_url(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+
+# Hàm tải nội dung một trang, dùng cache trên đĩa nếu có
+def fetch_page(url, page_cache=None):
+    if page_cache is None:
+        response = http_client.get(url)
+        # Trang lỗi (404, ...) làm lượt cào thất bại, không bị parse thành dòng sản phẩm rỗng
+        response.raise_for_status()
+        return response.content
+    return page_cache.fetch(url)
+
+
+# Hàm lấy danh sách link sản phẩm và số trang cuối từ trang danh mục
+def get_listing_page(
+    page_url, parser_backend=DEFAULT_PARSER_BACKEND, page_cache=None, page_param="pages"
+):
+    content = fetch_page(page_url, page_cache)
+
+    # Tìm tất cả liên kết sản phẩm và link phân trang trong trang danh mục
+    return product_parser.parse_listing_page(content, parser_backend, page_param)
 
 
 # Hàm lấy thông tin chi tiết sản phẩm từ trang chi tiết
-def get_product_details(product_url):
-    response = requests.get(product_url)
-    soup = BeautifulSoup(response.content, "html.parser")
+def get_product_details(
+    product_url,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    description_spec=product_parser.DEFAULT_DESCRIPTION_SPEC,
+    page_cache=None,
+):
+    content = fetch_page(product_url, page_cache)
+    # Mỗi selector chỉ được duyệt một lần trên cây HTML
+    page = product_parser.parse_product_page(content, parser_backend)
 
     # Trích xuất thông tin chi tiết sản phẩm
-    product_name = soup.find("h1").text.strip() if soup.find("h1") else None
+    product_name = page["product_name"].strip() if page["product_name"] is not None else None
 
     # Xử lý giá để loại bỏ phần "/ 1 chiếc"
     price_text = (
-        soup.find("h4", class_="ps-product__price").text.strip().split("/")[0]
-        if soup.find("h4", class_="ps-product__price")
-        else None
+        page["price"].strip().split("/")[0] if page["price"] is not None else None
     )
     price = re.sub(r"[₫,]", "", price_text) if price_text else None
-    brand = (
-        soup.find("a", href=lambda href: href and "brands" in href).text.strip()
-        if soup.find("a", href=lambda href: href and "brands" in href)
-        else None
-    )
+    brand = page["brand"].strip() if page["brand"] is not None else None
 
-    # Các thuộc tính bổ sung từ phần mô tả chi tiết
-    description_items = soup.find("div", class_="ps-product__desc")
-    sku = material = shape = dimension = origin = None
-    if description_items:
-        desc_text = format_description_text(description_items.text.strip())
-        # Tìm các thông tin cụ thể theo từ khóa
-        if "Mã sản phẩm" in desc_text:
-            sku = desc_text.split("Mã sản phẩm:")[1].split("•")[0].strip()
-        if "Chất liệu" in desc_text:
-            material = desc_text.split("Chất liệu:")[1].split("•")[0].strip()
-        if "Hình dạng" in desc_text:
-            shape = desc_text.split("Hình dạng:")[1].split("•")[0].strip()
-        if "Thông số" in desc_text:
-            dimension = desc_text.split("Thông số:")[1].split("•")[0].strip()
-
-        # Xử lý xuất xứ chỉ lấy tên quốc gia
-        if "Xuất xứ" in desc_text:
-            origin = desc_text.split("Xuất xứ:")[1].split("•")[0].split()[0].strip()
+    # Các thuộc tính bổ sung từ phần mô tả chi tiết, lấy trong một lần quét
+    attributes = (
+        product_parser.extract_description_fields(page["description"], description_spec)
+        if page["description"] is not None
+        else {field["name"]: None for field in description_spec["fields"].values()}
+    )
     # Lấy số lượng sản phẩm có sẵn, chỉ giữ lại số
-    quantity = soup.find("div", class_="number-items-available")
+    quantity = page["quantity"]
     quantity_available = (
-        "".join(filter(str.isdigit, quantity.text)) if quantity else None
+        "".join(filter(str.isdigit, quantity)) if quantity is not None else None
     )
     if not quantity_available:
         quantity_available = "0"
-    return {
-        "sku": sku,
+    product = {
+        "sku": attributes.pop("sku", None),
         "product_name": product_name,
         "price": price,
         "brand": brand,
-        "material": material,
-        "shape": shape,
-        "dimension": dimension,
-        "origin": origin,
-        "quantity_available": quantity_available,
-        "product_url": product_url,
     }
+    product.update(attributes)
+    product["quantity_available"] = quantity_available
+    product["product_url"] = product_url
+    return product
+
+
+# Hàm duyệt toàn bộ danh mục: tải song song các trang danh mục và chi tiết sản phẩm
+def crawl_catalog(
+    base_url,
+    max_workers=DEFAULT_MAX_WORKERS,
+    per_host_limit=DEFAULT_PER_HOST_LIMIT,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    description_spec=product_parser.DEFAULT_DESCRIPTION_SPEC,
+    page_cache=None,
+    start_page=DEFAULT_START_PAGE,
+    max_pages=DEFAULT_MAX_PAGES,
+    checkpoint=None,
+    host_limiter=None,
+):
+    """
+    Duyệt các trang danh mục bắt đầu từ start_page. Số trang cuối được lấy từ phần
+    phân trang của trang đầu tiên; nếu không có, các trang được tải lần lượt theo
+    từng đợt cho tới trang đầu tiên không có link sản phẩm mới (trang rỗng, hoặc trang
+    lặp lại sản phẩm đã gặp như khi website trả về trang cuối cho số trang vượt quá).
+    Không bao giờ duyệt quá MAX_CRAWL_PAGES trang. Link sản phẩm được đưa ngay vào hàng đợi
+    tải chi tiết khi trang danh mục chứa nó vừa tải xong, nên hai giai đoạn chạy chồng lên nhau.
+
+    Link trùng giữa các trang chỉ được cào một lần. Kết quả luôn theo thứ tự
+    (trang, vị trí trong trang) nên file CSV ổn định giữa các lần chạy.
+
+    :param base_url: URL danh mục, kết thúc bằng tham số số trang (ví dụ '...?pages=').
+    :param max_workers: Số thread tối đa cho mỗi giai đoạn.
+    :param per_host_limit: Số request đồng thời tối đa cho mỗi host.
+    :param parser_backend: Backend parse HTML (xem product_parser.BACKENDS).
+    :param description_spec: Spec thuộc tính mô tả đã biên dịch.
+    :param page_cache: PageCache dùng để tải có điều kiện (None nếu không dùng cache).
+    :param start_page: Trang đầu tiên cần duyệt.
+    :param max_pages: Số trang tối đa (0 là chỉ giới hạn bởi MAX_CRAWL_PAGES).
+    :param checkpoint: CheckpointJournal; sản phẩm đã có trong nhật ký không bị cào lại,
+                       sản phẩm cào xong được ghi ngay vào nhật ký.
+    :param host_limiter: HostLimiter dùng chung giữa các lượt cào chạy song song (ví dụ
+                         nhiều id_config của scheduler); mặc định tạo mới theo per_host_limit.
+    :return: Generator trả về thông tin từng sản phẩm theo thứ tự ổn định.
+    """
+    limiter = host_limiter or HostLimiter(per_host_limit)
+    # Thống kê request chỉ tính cho lượt cào này (scheduler chạy nhiều lượt trong một tiến trình)
+    http_client.reset_retry_stats()
+    query = parse_qsl(urlparse(base_url).query, keep_blank_values=True)
+    page_param = query[-1][0] if query else "pages"
+    max_workers = max(1, max_workers)
+
+    def fetch_listing(page):
+        page_url = f"{base_url}{page}"
+        with limiter.for_url(page_url):
+            print(f"Lấy thông tin sản phẩm từ trang: {page_url}")
+            return get_listing_page(page_url, parser_backend, page_cache, page_param)
+
+    def fetch_detail(product_url):
+        with limiter.for_url(product_url):
+            print(f"Lấy thông tin sản phẩm từ: {product_url}")
+            product = get_product_details(
+                product_url, parser_backend, description_spec, page_cache
+            )
+        if checkpoint is not None:
+            checkpoint.record(product_url, product)
+        return product
+
+    listing_pool = ThreadPoolExecutor(max_workers=max_workers)
+    detail_pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Trang đầu tiên cho biết số trang cuối (nếu có phần phân trang)
+        first = fetch_listing(start_page)
+        # stop_page: trang đầu tiên KHÔNG được duyệt
+        page_limit = min(max_pages, MAX_CRAWL_PAGES) if max_pages > 0 else MAX_CRAWL_PAGES
+        stop_page = start_page + page_limit
+        # Không có phân trang: tải trước từng đợt và dừng ở trang không có sản phẩm mới
+        windowed = first["last_page"] is None or first["last_page"] < start_page
+        if not windowed:
+            stop_page = min(stop_page, first["last_page"] + 1)
+
+        listings = {start_page: first["product_links"]}
+        seen_links = set(first["product_links"])
+        # Trang danh mục đã tải xong nhưng chưa được xét (các trang được xét theo thứ tự số trang)
+        completed = {}
+        checked_page = start_page + 1
+        pending = {}
+        detail_futures = {}
+        next_page = start_page + 1
+
+        def submit_details(product_links):
+            for product_url in product_links:
+                if product_url in detail_futures:
+                    continue
+                done = checkpoint.get(product_url) if checkpoint is not None else None
+                if done is not None:
+                    # Sản phẩm đã cào ở lần chạy trước, lấy lại từ nhật ký
+                    future = Future()
+                    future.set_result(done)
+                    detail_futures[product_url] = future
+                else:
+                    detail_futures[product_url] = detail_pool.submit(fetch_detail, product_url)
+
+        def schedule_listings():
+            # Khi biết trang cuối thì gửi hết, nếu không thì chỉ tải trước một đợt
+            nonlocal next_page
+            while next_page < stop_page and (not windowed or len(pending) < max_workers):
+                pending[listing_pool.submit(fetch_listing, next_page)] = next_page
+                next_page += 1
+
+        def collect_listings(block):
+            nonlocal stop_page, checked_page
+            if not pending:
+                return
+            done, _ = wait(list(pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                completed[pending.pop(future)] = future.result()["product_links"]
+            # Xét theo thứ tự trang, để trang lặp lại trang trước được nhận ra đúng
+            while checked_page < stop_page and checked_page in completed:
+                product_links = completed.pop(checked_page)
+                if not product_links or (windowed and seen_links.issuperset(product_links)):
+                    # Trang rỗng hoặc không có sản phẩm mới: dừng duyệt ở đây
+                    stop_page = checked_page
+                    break
+                listings[checked_page] = product_links
+                seen_links.update(product_links)
+                submit_details(product_links)
+                checked_page += 1
+            schedule_listings()
+
+        if not first["product_links"]:
+            stop_page = start_page + 1
+        submit_details(first["product_links"])
+        schedule_listings()
+
+        emitted = set()
+        emit_page = start_page
+        while emit_page < stop_page:
+            if emit_page not in listings:
+                collect_listings(block=True)
+                continue
+            for product_url in listings.pop(emit_page):
+                if product_url in emitted:
+                    continue
+                emitted.add(product_url)
+                # Nhận thêm trang danh mục đã xong trước khi chờ chi tiết sản phẩm
+                collect_listings(block=False)
+                yield detail_futures[product_url].result()
+            emit_page += 1
+        if windowed and stop_page == start_page + MAX_CRAWL_PAGES:
+            print(f"Đã dừng ở giới hạn {MAX_CRAWL_PAGES} trang danh mục.")
+    finally:
+        listing_pool.shutdown(wait=True, cancel_futures=True)
+        detail_pool.shutdown(wait=True, cancel_futures=True)
 
 
 # Hàm chính để duyệt qua các trang danh mục và cào dữ liệu tất cả sản phẩm
-def scrape_all_products_to_csv(source_file_location, name, id_config):
-    all_products = []
-    base_url = "https://kinhmatviettin.vn/product-categories/gong-kinh?pages="
-    total_pages = 4  # Số trang cần duyệt
-    # Lấy ngày hiện tại để tạo tên file
-    current_date = datetime.now().strftime("%Y-%m-%d")
+def scrape_all_products_to_csv(
+    source_file_location,
+    name,
+    id_config,
+    base_url=DEFAULT_BASE_URL,
+    max_workers=DEFAULT_MAX_WORKERS,
+    per_host_limit=DEFAULT_PER_HOST_LIMIT,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    description_fields=product_parser.DESCRIPTION_FIELDS,
+    page_cache=None,
+    start_page=DEFAULT_START_PAGE,
+    max_pages=DEFAULT_MAX_PAGES,
+    date=None,
+    output_format=output_writer.DEFAULT_OUTPUT_FORMAT,
+    host_limiter=None,
+):
+    parser_backend = product_parser.resolve_backend(parser_backend)
+    # Biên dịch spec thuộc tính mô tả một lần cho cả lượt cào
+    description_spec = product_parser.compile_description_spec(description_fields)
+    # Lấy ngày chạy (mặc định hôm nay) để tạo tên file
+    current_date = date or datetime.now().strftime("%Y-%m-%d")
     # Lấy phần domain của base_url cho tên file
     domain_name = base_url.split("//")[1].split("/")[0]
-    # Tạo tên file theo format yêu cầu
-    csv_filename = f"data_{id_config}_{name}_{current_date}_{domain_name}.csv"
+    # Tạo tên file theo format yêu cầu, phần mở rộng theo định dạng đầu ra (.csv, .csv.gz, .parquet)
+    csv_filename = (
+        f"data_{id_config}_{name}_{current_date}_{domain_name}"
+        + output_writer.OUTPUT_FORMATS[output_format]
+    )
 
     # Đảm bảo rằng thư mục lưu file tồn tại, nếu không tạo mới
     if not os.path.exists(source_file_location):
@@ -114,34 +307,53 @@ def scrape_all_products_to_csv(source_file_location, name, id_config):
     # Tạo đường dẫn đầy đủ cho file CSV
     csv_filepath = os.path.join(source_file_location, csv_filename)
 
-    # Lặp qua từng trang danh mục
-    for page in range(4, total_pages + 1):
-        page_url = f"{base_url}{page}"
-        print(f"Lấy thông tin sản phẩm từ trang: {page_url}")
-
-        product_links = get_product_links(page_url)
-        # Lặp qua từng link sản phẩm để lấy thông tin chi tiết
-        # for product_url in product_links[:10]:
-        for product_url in product_links:
-            print(f"Lấy thông tin sản phẩm từ: {product_url}")
-            product_details = get_product_details(product_url)
-            all_products.append(product_details)
+    # Nhật ký checkpoint theo file đầu ra (id_config + ngày): lần chạy lại sau lỗi
+    # chỉ cào những URL chưa có trong nhật ký
+    checkpoint = CheckpointJournal(csv_filepath + ".journal")
+    try:
+        # Duyệt toàn bộ các trang danh mục và ghi từng sản phẩm ra file ngay khi cào xong
+        with output_writer.open_writer(
+            csv_filepath, product_fieldnames(description_spec), output_format
+        ) as writer:
+            for product in crawl_catalog(
+                base_url,
+                max_workers,
+                per_host_limit,
+                parser_backend,
+                description_spec,
+                page_cache,
+                start_page,
+                max_pages,
+                checkpoint,
+                host_limiter,
+            ):
+                writer.write_row(product)
+            file_stats = writer.commit()
+    finally:
+        checkpoint.close()
+    # File đã hoàn chỉnh, không cần nhật ký nữa
+    checkpoint.remove()
 
-    # Lưu dữ liệu vào file CSV
-    df = pd.DataFrame(all_products)
-    df.to_csv(csv_filepath, index=False, encoding="utf-8")
     print(f"Dữ liệu được lưu vào {csv_filepath}")
-    print(f"Tổng số dữ liệu: {len(all_products)}")
+    print(f"Tổng số dữ liệu: {file_stats['line_count']}")
+    http_client.print_retry_stats()
+    if page_cache is not None:
+        page_cache.print_stats()
 
-    # Trả về đường dẫn đầy đủ của file đã lưu
-    return csv_filename
+    # Trả về tên file đã lưu và số dòng, dung lượng lấy từ writer
+    return csv_filename, file_stats
 
 
-def format_description_text(text):
-    # Biểu thức chính quy kiểm tra và thêm "•" trước "Thông tinNK và PP:" nếu chưa có
-    pattern = r"(•\s*)?Thông tin"
-    formatted_text = re.sub(pattern, r"• Thông tin", text)
-    return formatted_text
+def product_fieldnames(description_spec=product_parser.DEFAULT_DESCRIPTION_SPEC):
+    """
+    Danh sách cột của file CSV, cùng thứ tự với dictionary trả về từ get_product_details.
+    """
+    names = [field["name"] for field in description_spec["fields"].values()]
+    return (
+        ["sku", "product_name", "price", "brand"]
+        + [name for name in names if name != "sku"]
+        + ["quantity_available", "product_url"]
+    )
 
 
 def load_database_config(db_name, config_path):
@@ -173,6 +385,54 @@ def load_database_config(db_name, config_path):
     raise ValueError(f"Không tìm thấy database với tên '{db_name}' trong file config.")
 
 
+def load_scraper_config(config_path):
+    """
+    Hàm đọc thẻ <scraper> trong file config.xml. Các giá trị thiếu sẽ dùng mặc định.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary gồm base_url, max_workers, per_host_limit, start_page, max_pages,
+             parser_backend, description_fields, output_format.
+    """
+    root = ET.parse(config_path).getroot()
+    scraper = root.find("./scraper")
+
+    def get(tag, default):
+        node = scraper.find(tag) if scraper is not None else None
+        return node.text.strip() if node is not None and node.text else default
+
+    return {
+        "base_url": get("base_url", DEFAULT_BASE_URL),
+        "max_workers": int(get("max_workers", DEFAULT_MAX_WORKERS)),
+        "per_host_limit": int(get("per_host_limit", DEFAULT_PER_HOST_LIMIT)),
+        "start_page": int(get("start_page", DEFAULT_START_PAGE)),
+        "max_pages": int(get("max_pages", DEFAULT_MAX_PAGES)),
+        "parser_backend": get("parser_backend", DEFAULT_PARSER_BACKEND),
+        "description_fields": load_description_fields(scraper),
+        "output_format": get("output_format", output_writer.DEFAULT_OUTPUT_FORMAT),
+    }
+
+
+def load_description_fields(scraper):
+    """
+    Hàm đọc danh sách thuộc tính mô tả trong thẻ <scraper><description_fields>.
+
+    :param scraper: Phần tử XML <scraper> (có thể là None).
+    :return: Danh sách dictionary gồm name, label, transform.
+    """
+    fields_node = scraper.find("description_fields") if scraper is not None else None
+    if fields_node is None:
+        return product_parser.DESCRIPTION_FIELDS
+
+    return [
+        {
+            "name": field.get("name"),
+            "label": field.get("label"),
+            "transform": field.get("transform", "strip"),
+        }
+        for field in fields_node.findall("field")
+    ]
+
+
 def connect_to_database(db_config):
     """
     Hàm kết nối tới cơ sở dữ liệu PostgreSQL dựa trên thông tin cấu hình.
@@ -222,12 +482,14 @@ def fetch_file_config_by_id(conn, id_config):
         return None
 
 
-def get_csv_file_info(folder_path, file_name):
+def get_csv_file_info(folder_path, file_name, file_stats=None):
     """
-    Hàm lấy thông tin của một file .csv.
+    Hàm lấy thông tin của một file đầu ra (.csv, .csv.gz hoặc .parquet).
 
     :param folder_path: Đường dẫn thư mục chứa file.
-    :param file_name: Tên file .csv.
+    :param file_name: Tên file.
+    :param file_stats: Số dòng và dung lượng do writer trong output_writer trả về. Nếu có thì
+                       không cần đọc lại toàn bộ file để đếm dòng.
     :return: Dictionary chứa số dòng, dung lượng file (KB), và thời gian tạo file.
     """
     # Kết hợp đường dẫn thư mục và tên file
@@ -238,23 +500,24 @@ def get_csv_file_info(folder_path, file_name):
         raise FileNotFoundError(f"File '{file_path}' không tồn tại.")
 
     try:
-        # Lấy dung lượng file (KB)
-        file_size_bytes = os.path.getsize(file_path)
-        file_size_kb = file_size_bytes / 1024  # Chuyển đổi sang KB
-
         # Lấy thời gian tạo file
         creation_time = os.path.getctime(file_path)
         creation_time_str = datetime.fromtimestamp(creation_time).strftime(
             "%Y-%m-%d %H:%M:%S"
         )
 
-        # Đếm số dòng trong file .csv
-        with open(file_path, mode="r", encoding="utf-8") as csv_file:
-            reader = csv.reader(csv_file)
-            line_count = sum(1 for _ in reader)  # Đếm số dòng
+        if file_stats is not None:
+            line_count = file_stats["line_count"]
+            file_size_bytes = file_stats["file_size_bytes"]
+        else:
+            # Lấy dung lượng file và đếm số dòng dữ liệu (trừ dòng tiêu đề) theo định dạng file
+            file_size_bytes = os.path.getsize(file_path)
+            line_count = output_writer.count_rows(file_path)
+
+        file_size_kb = file_size_bytes / 1024  # Chuyển đổi sang KB
 
         return {
-            "line_count": line_count - 1,
+            "line_count": line_count,
             "file_size_kb": round(file_size_kb, 2),  # Làm tròn 2 chữ số thập phân
             "creation_time": creation_time_str,
         }
@@ -299,7 +562,7 @@ def insert_file_log(
         return None
 
 
-def update_file_log(conn, id, status, file_name, count, file_size_kb, dt_update):
+def update_file_log(conn, id, status, file_name, count, file_size_kb, dt_update, content_sha1=None):
     """
     Hàm cập nhật một bản ghi trong bảng `file_logs` dựa trên ID.
 
@@ -310,16 +573,19 @@ def update_file_log(conn, id, status, file_name, count, file_size_kb, dt_update)
     :param count: Số dòng mới.
     :param file_size_kb: Kích thước file mới (KB).
     :param dt_update: Thời gian cập nhật mới.
+    :param content_sha1: SHA-1 (hex) của file đã upload lên B2.
     :return: True nếu cập nhật thành công, False nếu có lỗi xảy ra.
     """
     query = """
     UPDATE file_logs
-    SET status = %s, file_name = %s, count = %s, file_size_kb = %s, dt_update = %s
+    SET status = %s, file_name = %s, count = %s, file_size_kb = %s, dt_update = %s, content_sha1 = %s
     WHERE id = %s
     """
     try:
         with conn.cursor() as cur:
-            cur.execute(query, (status, file_name, count, file_size_kb, dt_update, id))
+            cur.execute(
+                query, (status, file_name, count, file_size_kb, dt_update, content_sha1, id)
+            )
             conn.commit()
             print(f"Cập nhật bản ghi ID {id} thành công.")
             return True
@@ -394,36 +660,27 @@ def send_email(to_email, subject, body):
         print(f"Đã xảy ra lỗi khi gửi email: {e}")
 
 
-def upload_csv_to_b2(config_file, bucket_name, folder_name, csv_file_path):
+def upload_csv_to_b2(
+    config_file, bucket_name, folder_name, csv_file_path, b2_client=None, id_config=None
+):
     """
-    Upload a CSV file to a folder in a bucket on Backblaze B2.
+    Upload a CSV file to a folder in a bucket on Backblaze B2. Large files are uploaded
+    in parallel parts; what B2 reports back is checked against the local file
+    (see B2Client.upload_file).
 
     Args:
         config_file (str): Path to the XML configuration file.
         bucket_name (str): Name of the B2 bucket.
         folder_name (str): Folder path within the bucket where the file will be uploaded.
         csv_file_path (str): Path to the CSV file to upload.
+        b2_client (B2Client, optional): Client to use; the shared client of the process if omitted.
+        id_config (str, optional): ID of the file_config, stored in the file info.
 
     Returns:
-        str: The URL of the uploaded file.
+        str: The SHA-1 (hex) of the uploaded file.
     """
-    # Parse the config file to extract Backblaze credentials
-    tree = ET.parse(config_file)
-    root = tree.getroot()
-
-    # Extract credentials from the XML
-    key_id = root.find("./backblaze/key_id").text
-    application_key = root.find("./backblaze/application_key").text
-
-    # Initialize B2 API
-    info = InMemoryAccountInfo()
-    b2_api = B2Api(info)
-
-    # Authorize with B2
-    b2_api.authorize_account("production", key_id, application_key)
-
-    # Get the bucket
-    bucket = b2_api.get_bucket_by_name(bucket_name)
+    if b2_client is None:
+        b2_client = b2_client_module.get_client(config_file)
 
     # Ensure folder name ends with a slash
     if not folder_name.endswith("/"):
@@ -433,24 +690,135 @@ def upload_csv_to_b2(config_file, bucket_name, folder_name, csv_file_path):
     file_name = folder_name + os.path.basename(csv_file_path)
 
     # Upload the file
-    bucket.upload_local_file(
-        local_file=csv_file_path,
-        file_name=file_name,
-        file_infos={"id_config": "1"},
+    file_infos = {"id_config": str(id_config)} if id_config is not None else {}
+    return b2_client.upload_file(bucket_name, file_name, csv_file_path, file_infos)
+
+
+def run_extract(
+    conn, id_config, path_config, date, b2_client=None, host_limiter=None, page_cache=None
+):
+    """
+    Chạy bước extract cho một id_config: cào dữ liệu ra file .csv, upload lên B2
+    và ghi file log (RUNNING -> ES, hoặc EF nếu lỗi).
+
+    :param conn: Kết nối PostgreSQL (dùng lại giữa các bước).
+    :param id_config: ID cấu hình.
+    :param path_config: Đường dẫn file config.xml.
+    :param date: Ngày chạy (chuỗi 'YYYY-MM-DD').
+    :param b2_client: B2Client dùng chung (mặc định client chung của tiến trình).
+    :param host_limiter: HostLimiter dùng chung giữa các id_config (mặc định mỗi lượt cào một limiter).
+    :param page_cache: PageCache dùng chung giữa các id_config (mặc định mở theo config.xml).
+    :return: True nếu file log được cập nhật sang ES, ngược lại False.
+    """
+    # 1.3. Kiểm tra file logs có tiến trình đã chạy hoặc đang chạy hay không
+    exists = check_file_log(conn, id_config, date)
+    if exists:
+        # 1.3.1. Gửi mail thông báo có tiến trình đã/đang chạy
+        send_email(
+            EMAIL,
+            f"LỖI TRONG QUÁ TRÌNH EXTRACT_FILE: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: Đã có tiến trình đang/đã chạy",
+        )
+        return False
+
+    # 1.4.Lấy thông tin file config
+    file_config = fetch_file_config_by_id(conn, id_config)
+    # 1.5.Insert 1 dòng vào file log có status RUNNING
+    inserted_id = insert_file_log(
+        conn=conn,
+        id_config=id_config,
+        status="RUNNING",
+        file_name=None,
+        time=date,
+        count=None,
+        file_size_kb=None,
+        dt_update=None,
     )
+    try:
+        # 1.6.Tiến hành cào dữ liệu
+        scraper_config = load_scraper_config(path_config)
+        http_client.configure_from_file(path_config)
+        if page_cache is None:
+            page_cache = page_cache_module.open_cache(path_config)
+        file_name, file_stats = scrape_all_products_to_csv(
+            file_config["source_file_location"],
+            file_config["destination_table_staging"],
+            id_config,
+            base_url=scraper_config["base_url"],
+            max_workers=scraper_config["max_workers"],
+            per_host_limit=scraper_config["per_host_limit"],
+            parser_backend=scraper_config["parser_backend"],
+            description_fields=scraper_config["description_fields"],
+            page_cache=page_cache,
+            start_page=scraper_config["start_page"],
+            max_pages=scraper_config["max_pages"],
+            date=date,
+            output_format=output_writer.resolve_output_format(scraper_config["output_format"]),
+            host_limiter=host_limiter,
+        )
+        # 1.7.Lấy thông tin file vào cào về
+        info_file_csv = get_csv_file_info(
+            file_config["source_file_location"], file_name, file_stats
+        )
+        # 1.8.Upload file vừa cào về lên Backblaze B2 (kiểm tra SHA-1 của file trên B2)
+        content_sha1 = upload_csv_to_b2(
+            path_config,
+            file_config["bucket_name"],
+            file_config["folder_b2_name"],
+            os.path.join(file_config["source_file_location"], file_name),
+            b2_client,
+            id_config,
+        )
+        # 1.9.Cập nhật file log sang trạng thái ES
+        update_file_log(
+            conn,
+            inserted_id,
+            "ES",
+            file_name,
+            info_file_csv["line_count"],
+            info_file_csv["file_size_kb"],
+            info_file_csv["creation_time"],
+            content_sha1,
+        )
+        return True
+    except Exception as e:
+        # 1.6.1.Cập nhật file log sang trạng thái EF
+        update_file_log(
+            conn=conn,
+            id=inserted_id,
+            status="EF",
+            file_name=None,
+            count=None,
+            file_size_kb=None,
+            dt_update=None,
+        )
+        # 1.6.2.Gửi mail thông báo cào thất bại
+        send_email(
+            EMAIL,
+            f"LỖI KẾT TRONG QUÁ TRÌNH CÀO DỮ LIỆU: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: {e}",
+        )
+        return False
 
 
 def main():
     # Kiểm tra số lượng tham số đầu vào
-    if len(sys.argv) < 2:
-        print("Vui lòng nhập 2 tham số: id_config, path_config")
-        print("Cú pháp: python script.py <id_config> <path_config>")
+    if len(sys.argv) < 3:
+        print("Vui lòng nhập ít nhất 2 tham số: id_config, path_config")
+        print("Cú pháp: python script.py <id_config> <path_config> [date]")
         sys.exit(1)
 
     # Nhận tham số đầu vào
     id_config = sys.argv[1]
     path_config = sys.argv[2]
-    date = datetime.today().strftime("%Y-%m-%d")
+    if len(sys.argv) > 3:
+        try:
+            date = datetime.strptime(sys.argv[3], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            print("Lỗi: Ngày không đúng định dạng YYYY-MM-DD.")
+            sys.exit(1)
+    else:
+        date = datetime.today().strftime("%Y-%m-%d")
 
     # In thông tin
     print(f"ID Config: {id_config}")
@@ -463,13 +831,14 @@ def main():
         # 1.2. Kết nối cơ sở dữ liệu controls
         conn = connect_to_database(db_config)
     except Exception as e:
-        attemps = 0
-        while attemps < 5:
+        attempts = 0
+        while attempts < 5:
             try:
                 conn = connect_to_database(db_config)
+                break
             except psycopg2.OperationalError as e:
                 attempts += 1
-                print('kết nối l')
+                print(f"Kết nối thất bại lần {attempts}: {e}")
                 if attempts < 5:
                     print('thử kết nối lại')
                     time.sleep(10)
@@ -479,74 +848,8 @@ def main():
                     sys.exit(1)
                     return
 
-    # 1.3. Kiểm tra file logs có tiến trình đã chạy hoặc đang chạy hay không
-    exists = check_file_log(conn, id_config, date)
-    if exists:
-        # 1.3.1. Gửi mail thông báo có tiến trình đã/đang chạy
-        send_email(
-            EMAIL,
-            f"LỖI TRONG QUÁ TRÌNH EXTRACT_FILE: NGÀY {date} | ID CONFIG: {id_config}",
-            f"Lỗi phát hiện: Đã có tiến trình đang/đã chạy",
-        )
-    else:
-        # 1.4.Lấy thông tin file config
-        file_config = fetch_file_config_by_id(conn, id_config)
-        # 1.5.Insert 1 dòng vào file log có status RUNNING
-        inserted_id = insert_file_log(
-            conn=conn,
-            id_config=id_config,
-            status="RUNNING",
-            file_name=None,
-            time=date,
-            count=None,
-            file_size_kb=None,
-            dt_update=None,
-        )
-        try:
-            # 1.6.Tiến hành cào dữ liệu
-            file_name = scrape_all_products_to_csv(
-                file_config["source_file_location"],
-                file_config["destination_table_staging"],
-                id_config
-            )
-            # 1.7.Lấy thông tin file vào cào về
-            info_file_csv = get_csv_file_info(
-                file_config["source_file_location"], file_name
-            )
-            # 1.8.Upload file vừa cào về lên Backblaze B2
-            upload_csv_to_b2(
-                path_config,
-                file_config["bucket_name"],
-                file_config["folder_b2_name"],
-                file_config["source_file_location"] + "\\" + file_name,
-            )
-            # 1.9.Cập nhật file log sang trạng thái ES
-            update_file_log(
-                conn,
-                inserted_id,
-                "ES",
-                file_name,
-                info_file_csv["line_count"],
-                info_file_csv["file_size_kb"],
-                info_file_csv["creation_time"],
-            )
-        except Exception as e:
-            # 1.6.1.Cập nhật file log sang trạng thái EF
-            update_file_log(
-                conn=conn,
-                id=inserted_id,
-                status="EF",
-                file_name=None,
-                count=None,
-                file_size_kb=None,
-                dt_update=None,
-            )
-            # 1.6.2.Gửi mail thông báo cào thất bại
-            send_email(
-                EMAIL,
-                f"LỖI KẾT TRONG QUÁ TRÌNH CÀO DỮ LIỆU: NGÀY {date} | ID CONFIG: {id_config}",
-                f"Lỗi phát hiện: {e}",
-            )
+    # 1.3 - 1.9. Cào dữ liệu, upload lên B2 và cập nhật file log
+    run_extract(conn, id_config, path_config, date)
     # 1.10. Đóng kết nối csdl
     conn.close()
 
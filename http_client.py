@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Cấu hình mặc định cho HTTP client (có thể ghi đè trong thẻ <http> của config.xml)
+DEFAULT_HTTP_CONFIG = {
+    "pool_size": 10,
+    "timeout": 30.0,
+    "max_retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 30.0,
+}
+
+# Các mã lỗi HTTP sẽ được thử lại
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Chỉ các phương thức idempotent mới được thử lại mặc định (POST phải tự bật retry=True)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_config = dict(DEFAULT_HTTP_CONFIG)
+_session = None
+_session_lock = threading.Lock()
+
+_stats = {
+    "requests": 0,
+    "retries": 0,
+    "failures": 0,
+    "retry_wait_seconds": 0.0,
+    "refetch_seconds": 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def load_http_config(config_path):
+    """
+    Hàm đọc thẻ <http> trong file config.xml. Các giá trị thiếu sẽ dùng mặc định.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary gồm pool_size, timeout, max_retries, backoff_base, backoff_max.
+    """
+    root = ET.parse(config_path).getroot()
+    http = root.find("./http")
+    config = dict(DEFAULT_HTTP_CONFIG)
+    if http is None:
+        return config
+
+    for key, default in DEFAULT_HTTP_CONFIG.items():
+        node = http.find(key)
+        if node is not None and node.text:
+            config[key] = type(default)(node.text.strip())
+    return config
+
+
+def configure(**options):
+    """
+    Thay đổi cấu hình HTTP client. Session hiện tại sẽ được tạo lại ở lần gọi tiếp theo.
+
+    :param options: Các khóa trong DEFAULT_HTTP_CONFIG.
+    """
+    global _session
+    unknown = set(options) - set(DEFAULT_HTTP_CONFIG)
+    if unknown:
+        raise ValueError(f"Tham số HTTP không hợp lệ: {', '.join(sorted(unknown))}")
+
+    with _session_lock:
+        if all(_config[key] == value for key, value in options.items()):
+            # Cấu hình không đổi: giữ Session đang được các luồng khác sử dụng
+            return
+        _config.update(options)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def configure_from_file(config_path):
+    """
+    Đọc thẻ <http> từ config.xml và áp dụng cho HTTP client.
+
+    :param config_path: Đường dẫn file config.xml.
+    """
+    configure(**load_http_config(config_path))
+
+
+def get_session():
+    """
+    Trả về Session dùng chung (keep-alive, connection pool) cho toàn bộ tiến trình.
+
+    :return: requests.Session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_config["pool_size"],
+                pool_maxsize=_config["pool_size"],
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _backoff_delay(attempt, response=None):
+    # Ưu tiên header Retry-After nếu server trả về dạng số giây
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), _config["backoff_max"])
+
+    # Full jitter: ngẫu nhiên trong khoảng [0, base * 2^attempt]
+    ceiling = min(_config["backoff_max"], _config["backoff_base"] * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _record(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def request(method, url, retry=None, **kwargs):
+    """
+    Gửi HTTP request qua Session dùng chung, tự động thử lại với backoff có jitter
+    khi gặp lỗi kết nối, timeout hoặc các mã 429/5xx.
+
+    :param method: Phương thức HTTP ('GET', 'POST', ...).
+    :param url: Địa chỉ cần gọi.
+    :param retry: True/False để bật/tắt thử lại; mặc định chỉ thử lại các phương thức
+                  trong IDEMPOTENT_METHODS (POST gửi lại có thể tạo dữ liệu trùng).
+    :param kwargs: Tham số truyền thẳng cho requests.Session.request.
+    :return: requests.Response của lần gọi cuối cùng.
+    :raises requests.HTTPError: Nếu lần gọi cuối vẫn trả 429/5xx.
+    """
+    kwargs.setdefault("timeout", _config["timeout"])
+    session = get_session()
+    if retry is None:
+        retry = method.upper() in IDEMPOTENT_METHODS
+    max_retries = _config["max_retries"] if retry else 0
+
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            elapsed = time.perf_counter() - started
+            _record(requests=1, refetch_seconds=elapsed if attempt else 0.0)
+            if attempt >= max_retries:
+                _record(failures=1)
+                raise
+            delay = _backoff_delay(attempt)
+        else:
+            elapsed = time.perf_counter() - started
+            _record(requests=1, refetch_seconds=elapsed if attempt else 0.0)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if attempt >= max_retries:
+                # Hết lượt thử lại: báo lỗi thay vì trả về trang lỗi như trang bình thường
+                _record(failures=1)
+                response.raise_for_status()
+            delay = _backoff_delay(attempt, response)
+            response.close()
+
+        print(f"Thử lại {method} {url} (lần {attempt + 1}) sau {delay:.2f}s")
+        _record(retries=1, retry_wait_seconds=delay)
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, retry=False, **kwargs):
+    return request("POST", url, retry=retry, **kwargs)
+
+
+def get_retry_stats():
+    """
+    Trả về bản sao các bộ đếm: tổng số request, số lần thử lại, số request thất bại,
+    thời gian chờ backoff và thời gian dành cho các lần tải lại.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_retry_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0.0 if isinstance(_stats[key], float) else 0
+
+
+def print_retry_stats():
+    stats = get_retry_stats()
+    print(
+        f"HTTP: {stats['requests']} request, {stats['retries']} lần thử lại, "
+        f"{stats['failures']} thất bại, chờ backoff {stats['retry_wait_seconds']:.2f}s, "
+        f"tải lại {stats['refetch_seconds']:.2f}s"
+    )
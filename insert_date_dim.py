@@ -1,10 +1,40 @@
+import argparse
 import sys
 import os
-from datetime import datetime
+from datetime import date
+from io import StringIO
 import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
 import psycopg2
-from psycopg2 import extras
-import csv
+
+# Các cột của bảng date_dim theo đúng thứ tự trong date_dim.csv (file không có dòng tiêu đề).
+# Tên cột theo bảng đã tạo; giá trị theo date_dim.csv, ví dụ day_of_month là số thứ tự ngày,
+# start_of_week là 'YYYY-Mon', iso_week là tuần bắt đầu từ Chủ nhật, iso_week_alt là tuần ISO.
+DATE_DIM_COLUMNS = [
+    "id",
+    "full_date",
+    "day_of_month",
+    "month",
+    "day_name",
+    "month_name",
+    "year",
+    "start_of_week",
+    "day_of_week",
+    "day_of_year",
+    "iso_week",
+    "iso_week_year",
+    "start_of_iso_week",
+    "iso_week_alt",
+    "iso_week_year_alt",
+    "start_of_iso_alt",
+    "quarter",
+    "quarter_num",
+    "holiday_flag",
+    "is_weekend",
+]
+# Ngày có id = 1; số thứ tự ngày, tháng, quý đều tính từ ngày này
+EPOCH = date(2005, 1, 1)
 
 
 def load_database_config(db_name, config_path):
@@ -54,81 +84,231 @@ def connect_to_database(db_config):
     print("Kết nối cơ sở dữ liệu thành công.")
     return conn
 
-def insert_date_dim(conn, csv_path):
+
+def load_holidays(config_path):
+    """
+    Hàm đọc danh sách ngày lễ trong thẻ <date_dim><holidays> của file config.xml.
+    Mỗi thẻ <holiday> là 'MM-DD' (lặp lại hằng năm) hoặc 'YYYY-MM-DD' (một ngày cụ thể,
+    ví dụ các ngày Tết âm lịch).
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: (tập 'MM-DD', tập 'YYYY-MM-DD').
+    """
+    root = ET.parse(config_path).getroot()
+    recurring, fixed = set(), set()
+    for node in root.findall("./date_dim/holidays/holiday"):
+        value = (node.text or "").strip()
+        if len(value) == 5:
+            recurring.add(value)
+        elif len(value) == 10:
+            fixed.add(value)
+        elif value:
+            raise ValueError(f"Ngày lễ '{value}' phải có dạng MM-DD hoặc YYYY-MM-DD.")
+    return recurring, fixed
+
+
+def build_date_dim(start, end, holidays=(set(), set())):
+    """
+    Sinh các dòng date_dim cho mọi ngày từ start tới end (gồm cả hai đầu), tính theo cột
+    trên toàn bộ khoảng ngày thay vì từng ngày. Kết quả giống hệt định dạng date_dim.csv.
+
+    :param start: Ngày bắt đầu (date).
+    :param end: Ngày kết thúc (date).
+    :param holidays: (tập 'MM-DD', tập 'YYYY-MM-DD') như load_holidays trả về.
+    :return: DataFrame với các cột DATE_DIM_COLUMNS.
+    """
+    days = pd.date_range(start, end, freq="D")
+    epoch = pd.Timestamp(EPOCH)
+    one_day = pd.Timedelta(days=1)
+    year = days.year.to_numpy()
+    month = days.month.to_numpy()
+    quarter = days.quarter.to_numpy()
+
+    # Tuần bắt đầu từ Chủ nhật: tuần 1 của năm bắt đầu vào Chủ nhật đầu tiên từ ngày 02/01
+    week_start = days - pd.to_timedelta((days.dayofweek + 1) % 7, unit="D")
+
+    def first_week_start(years):
+        jan_2 = pd.to_datetime(pd.DataFrame({"year": years, "month": 1, "day": 2}))
+        return jan_2 + pd.to_timedelta((6 - jan_2.dt.dayofweek) % 7, unit="D")
+
+    week_year = pd.Series(week_start.year, index=days)
+    week_year -= (week_start < first_week_start(week_year).to_numpy()).astype(int)
+    week = (week_start - first_week_start(week_year).to_numpy()).days // 7 + 1
+
+    # Tuần ISO (bắt đầu từ thứ Hai); năm trong nhãn là năm của ngày đầu tuần
+    iso_week = days.isocalendar().week.to_numpy()
+    iso_week_start = days - pd.to_timedelta(days.dayofweek, unit="D")
+
+    recurring, fixed = holidays
+    is_holiday = np.isin(days.strftime("%m-%d"), list(recurring)) | np.isin(
+        days.strftime("%Y-%m-%d"), list(fixed)
+    )
+
+    frame = pd.DataFrame(
+        {
+            "id": (days - epoch).days + 1,
+            "full_date": days.strftime("%Y-%m-%d"),
+            "day_of_month": (days - epoch).days + 1,
+            "month": (year - EPOCH.year) * 12 + month,
+            "day_name": days.day_name(),
+            "month_name": days.month_name(),
+            "year": year,
+            "start_of_week": days.strftime("%Y-%b"),
+            "day_of_week": days.day,
+            "day_of_year": days.dayofyear,
+            "iso_week": week,
+            "iso_week_year": week_year.astype(str).to_numpy() + np.char.mod("-W%02d", week),
+            "start_of_iso_week": week_start.strftime("%Y-%m-%d"),
+            "iso_week_alt": iso_week,
+            "iso_week_year_alt": iso_week_start.year.astype(str) + np.char.mod("-W%02d", iso_week),
+            "start_of_iso_alt": iso_week_start.strftime("%Y-%m-%d"),
+            "quarter": year.astype(str) + np.char.mod("-Q%02d", quarter),
+            "quarter_num": (year - EPOCH.year) * 4 + quarter,
+            "holiday_flag": np.where(is_holiday, "Holiday", "Non-Holiday"),
+            "is_weekend": np.where(days.dayofweek >= 5, "Weekend", "Weekday"),
+        },
+        columns=DATE_DIM_COLUMNS,
+    )
+    return frame.reset_index(drop=True)
+
+
+def read_date_dim_csv(csv_path):
     """
-    Đọc dữ liệu từ file CSV và chèn vào bảng date_dim.
+    Đọc file date_dim.csv (không có dòng tiêu đề, 20 cột theo DATE_DIM_COLUMNS).
+
+    :param csv_path: Đường dẫn tới file CSV.
+    :return: DataFrame với các cột DATE_DIM_COLUMNS.
+    """
+    frame = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+    if frame.shape[1] != len(DATE_DIM_COLUMNS):
+        raise ValueError(
+            f"File CSV phải có {len(DATE_DIM_COLUMNS)} cột, file hiện có {frame.shape[1]} cột."
+        )
+    frame.columns = DATE_DIM_COLUMNS
+    return frame
+
+
+def insert_date_dim(conn, frame, update_holidays=False):
+    """
+    Nạp các dòng date_dim bằng COPY vào bảng tạm rồi chỉ chèn những ngày chưa có,
+    nên chạy lại nhiều lần hoặc chạy với khoảng ngày chồng lên dữ liệu cũ vẫn an toàn.
 
     Args:
         conn: Kết nối psycopg2 tới PostgreSQL.
-        csv_path: Đường dẫn tới file CSV.
+        frame: DataFrame với các cột DATE_DIM_COLUMNS (build_date_dim hoặc read_date_dim_csv).
+        update_holidays: True để cập nhật holiday_flag của các ngày đã có theo frame.
+
+    Returns:
+        (số ngày đã chèn, số ngày được cập nhật holiday_flag) hoặc None nếu có lỗi.
     """
+    columns = ", ".join(DATE_DIM_COLUMNS)
+    buffer = StringIO()
+    frame.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
     try:
-        # Mở file CSV
-        with open(csv_path, mode='r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            headers = next(reader)  # Đọc dòng tiêu đề
-
-            # Kiểm tra cột của file CSV
-            expected_columns = {
-                'full_date', 'day_of_month', 'month', 'day_name', 'month_name', 'year',
-                'start_of_week', 'day_of_week', 'day_of_year', 'iso_week', 'iso_week_year',
-                'start_of_iso_week', 'iso_week_alt', 'iso_week_year_alt', 'start_of_iso_alt',
-                'quarter', 'quarter_num', 'holiday_flag', 'is_weekend'
-            }
-            
-            if not set(headers).issubset(expected_columns):
-                raise ValueError("File CSV không đúng định dạng hoặc thiếu cột cần thiết.")
-            
-            # Tạo câu lệnh INSERT
-            insert_query = sql.SQL("""
-                INSERT INTO date_dim (
-                    full_date, day_of_month, month, day_name, month_name, year,
-                    start_of_week, day_of_week, day_of_year, iso_week, iso_week_year,
-                    start_of_iso_week, iso_week_alt, iso_week_year_alt, start_of_iso_alt,
-                    quarter, quarter_num, holiday_flag, is_weekend
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE date_dim_load (LIKE date_dim INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.copy_expert(f"COPY date_dim_load ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"""
+                INSERT INTO date_dim ({columns})
+                SELECT {columns}
+                FROM date_dim_load l
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM date_dim d WHERE d.full_date = l.full_date
                 )
-                VALUES (
-                    %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s
+                ORDER BY l.full_date
+                """
+            )
+            inserted = cursor.rowcount
+            updated = 0
+            if update_holidays:
+                cursor.execute(
+                    """
+                    UPDATE date_dim d
+                    SET holiday_flag = l.holiday_flag
+                    FROM date_dim_load l
+                    WHERE d.full_date = l.full_date
+                      AND d.holiday_flag IS DISTINCT FROM l.holiday_flag
+                    """
                 )
-            """)
+                updated = cursor.rowcount
+            # id được tính sẵn từ ngày nên phải đẩy sequence của cột serial theo
+            cursor.execute(
+                """
+                SELECT setval(pg_get_serial_sequence('date_dim', 'id'), MAX(id))
+                FROM date_dim
+                WHERE pg_get_serial_sequence('date_dim', 'id') IS NOT NULL
+                HAVING MAX(id) IS NOT NULL
+                """
+            )
 
-            # Chèn dữ liệu vào bảng
-            with conn.cursor() as cursor:
-                for row in reader:
-                    cursor.execute(insert_query, row)
-            
-            # Lưu thay đổi
-            conn.commit()
-            print("Dữ liệu đã được chèn thành công vào bảng date_dim.")
+        # Lưu thay đổi
+        conn.commit()
+        print(f"Đã chèn {inserted} ngày vào bảng date_dim, cập nhật ngày lễ cho {updated} ngày.")
+        return inserted, updated
 
     except Exception as e:
         conn.rollback()
         print(f"Đã xảy ra lỗi: {e}")
-        
+        return None
+
+
+def parse_range(value):
+    """
+    Chuyển 'YYYY-MM-DD:YYYY-MM-DD' thành (ngày bắt đầu, ngày kết thúc).
+    """
+    start_text, _, end_text = value.partition(":")
+    start = date.fromisoformat(start_text)
+    end = date.fromisoformat(end_text) if end_text else start
+    if end < start:
+        raise ValueError("Ngày kết thúc phải không nhỏ hơn ngày bắt đầu.")
+    return start, end
+
 
 def main():
-    if len(sys.argv) < 3:
-        print("Vui lòng nhập ít nhất 3 tham số: path_config, và csv_path.")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Nạp bảng date_dim từ file date_dim.csv hoặc sinh lịch cho một khoảng ngày."
+    )
+    parser.add_argument("path_config", help="Đường dẫn file config.xml")
+    parser.add_argument("csv_path", nargs="?", help="Đường dẫn file date_dim.csv")
+    parser.add_argument(
+        "--range",
+        dest="date_range",
+        help="Sinh lịch cho khoảng ngày YYYY-MM-DD:YYYY-MM-DD thay vì đọc file CSV",
+    )
+    args = parser.parse_args()
+    if bool(args.csv_path) == bool(args.date_range):
+        parser.error("cần đúng một trong hai: csv_path hoặc --range.")
 
-    # Nhận tham số đầu vào
-    path_config = sys.argv[1]
-    csv_path = sys.argv[2]
+    try:
+        if args.date_range:
+            start, end = parse_range(args.date_range)
+            frame = build_date_dim(start, end, load_holidays(args.path_config))
+        else:
+            frame = read_date_dim_csv(args.csv_path)
+    except ValueError as e:
+        print(f"Lỗi: {e}")
+        sys.exit(1)
 
     # 2.1. Load file config.xml
-    db_config = load_database_config("dw", path_config)
+    db_config = load_database_config("dw", args.path_config)
     try:
         # 2.2.Kết nối cơ sở dữ liệu dw
         conn = connect_to_database(db_config)
     except Exception as e:
+        print(f"Lỗi kết nối cơ sở dữ liệu: {e}")
         sys.exit(1)
-        return
 
-    insert_date_dim(conn, csv_path)
+    try:
+        # Lịch sinh ra mang ngày lễ theo config, nên cập nhật luôn ngày lễ của các ngày đã có
+        if insert_date_dim(conn, frame, update_holidays=bool(args.date_range)) is None:
+            sys.exit(1)
+    finally:
+        conn.close()
+
 
 if __name__ == "__main__":
     main()
-
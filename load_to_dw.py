@@ -8,6 +8,9 @@ import csv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import date_key_cache
+import partition_manager
+import row_hash
 
 EMAIL = os.getenv("MY_EMAIL_DW_VAR")
 
@@ -86,6 +89,8 @@ def fetch_file_info(conn, id_config, date):
     FROM file_logs fl
         INNER JOIN file_config fc ON fl.id_config = fc.id
     WHERE fl.id_config = %s AND fl.time::date = %s AND fl.status = 'LS'
+    ORDER BY fl.id DESC
+    LIMIT 1
     """
 
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
@@ -98,294 +103,215 @@ def fetch_file_info(conn, id_config, date):
         return {}
 
 
-def truncate_table(conn, table_name):
+def work_table_name(id_config, date):
     """
-    Hàm để truncate (xóa toàn bộ dữ liệu) từ một bảng trong cơ sở dữ liệu.
-
-    :param conn: Kết nối PostgreSQL.
-    :param table_name: Tên bảng cần truncate.
-    :return: None
+    Tên bảng tạm của một lượt load: work_dw_<id_config>_<YYYYMMDD>.
     """
-    try:
-        with conn.cursor() as cur:
-            query = f"TRUNCATE TABLE {table_name} RESTART IDENTITY"
-            cur.execute(query)
-            conn.commit()
-            print(f"Bảng '{table_name}' đã được truncate thành công.")
-    except Exception as e:
-        print(f"Lỗi khi truncate bảng '{table_name}': {e}")
-        conn.rollback()
+    return f"work_dw_{int(id_config)}_{partition_manager.to_date(date):%Y%m%d}"
 
 
-def insert_into_temp_dw(conn, id_config, date, table_staging):
+def create_work_table(
+    conn, id_config, date, table_staging, tracked_columns=row_hash.DEFAULT_TRACKED_COLUMNS
+):
     """
-    Hàm này chèn dữ liệu từ bảng staging vào bảng temp_dw với điều kiện `id_config` và `dt_load`.
+    Hàm này tạo bảng tạm (TEMP) chứa dữ liệu từ bảng staging với điều kiện `id_config` và `dt_load`,
+    rồi ANALYZE để planner có thống kê cho bước merge. Bảng tạm chỉ thuộc phiên kết nối hiện tại
+    và không ghi WAL, nên nhiều id_config có thể load vào dw song song.
 
     :param conn: Kết nối PostgreSQL.
     :param id_config: Giá trị `id_config` cần kiểm tra.
     :param date: Ngày `dt_load` cần kiểm tra (dạng chuỗi 'YYYY-MM-DD').
     :param table_staging: Tên bảng staging để lấy dữ liệu nguồn.
-    :return: True nếu chèn thành công, False nếu có lỗi.
+    :param tracked_columns: Các cột thuộc tính được theo dõi (xem row_hash).
+    :return: Tên bảng tạm nếu thành công, None nếu có lỗi.
     """
+    work_table = work_table_name(id_config, date)
+    columns = ", ".join(
+        ["natural_key"] + tracked_columns + ["id_config", "dt_extract", "dt_load", "row_hash"]
+    )
     query = f"""
-    INSERT INTO temp_dw (natural_key, sku, product_name, 
-            price, brand, material, shape, dimension, origin, 
-            quantity_available, product_url, id_config, dt_extract, dt_load) 
-    SELECT natural_key, sku, product_name, 
-            price, brand, material, shape, dimension, origin, 
-            quantity_available, product_url, id_config, dt_extract, dt_load                
+    CREATE TEMP TABLE {work_table} AS
+    SELECT {columns}
     FROM {table_staging}
     WHERE id_config = %s
       AND dt_load = %s
     """
     try:
         with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS pg_temp.{work_table}")
             cur.execute(query, (id_config, date))
+            row_count = cur.rowcount
+            cur.execute(f"ANALYZE {work_table}")
             conn.commit()
-            print("Dữ liệu đã được chèn vào temp_dw thành công.")
-            return True
+            print(f"Dữ liệu đã được chèn vào bảng tạm {work_table} thành công ({row_count} dòng).")
+            return work_table
     except Exception as e:
-        print(f"Lỗi khi chèn dữ liệu vào temp_dw: {e}")
+        print(f"Lỗi khi tạo bảng tạm {work_table}: {e}")
         conn.rollback()
-        return False
+        return None
 
 
-def insert_news_into_dw(conn, dt_load_to_dw):
+def drop_work_table(conn, work_table):
     """
-    Chèn dữ liệu mới từ bảng `temp_dw` vào bảng `dw` với điều kiện và giá trị `dt_load_to_dw` được truyền vào.
+    Xóa bảng tạm của lượt load (bảng tạm cũng tự mất khi đóng kết nối).
 
-    :param conn: Kết nối cơ sở dữ liệu PostgreSQL.
-    :param dt_load_to_dw: Ngày (chuỗi) để sử dụng làm giá trị cho cột `dt_load_to_dw`.
+    :param conn: Kết nối PostgreSQL.
+    :param work_table: Tên bảng tạm.
     """
-    try:
-        # Tạo con trỏ
-        cursor = conn.cursor()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS pg_temp.{work_table}")
+    conn.commit()
 
-        # Câu lệnh SQL
-        insert_query = f"""
-        INSERT INTO dw (
-            natural_key,
-            sku,
-            product_name,
-            price,
-            brand,
-            material,
-            shape,
-            dimension,
-            origin,
-            quantity_available,
-            product_url,
-            id_config,
-            dt_extract,
-            dt_load,
-            dt_load_to_dw,
-            dt_last_update
-        )
-        SELECT 
-            natural_key,
-            sku,
-            product_name,
-            price,
-            brand,
-            material,
-            shape,
-            dimension,
-            origin,
-            quantity_available,
-            product_url,
-            id_config,
-            dt_extract,
-            dt_load,
-            %s AS dt_load_to_dw,
-            '9999-12-31' AS dt_last_update
-        FROM temp_dw t
-        WHERE t.natural_key NOT IN (SELECT d.natural_key FROM dw d);
-        """
-
-        # Thực thi câu lệnh SQL
-        cursor.execute(insert_query, (dt_load_to_dw,))
 
-        # Xác nhận thay đổi
-        conn.commit()
-        print(f"Insert into dw successful with dt_load_to_dw = {dt_load_to_dw}.")
+def fetch_extract_days(conn, work_table):
+    """
+    Lấy các ngày dt_extract khác nhau trong bảng tạm của lượt load.
 
-    except psycopg2.Error as e:
-        print(f"An error occurred during insertion: {e}")
-        conn.rollback()  # Hoàn tác nếu có lỗi xảy ra
-    finally:
-        # Đóng con trỏ
-        if cursor:
-            cursor.close()
+    :param conn: Kết nối PostgreSQL.
+    :param work_table: Tên bảng tạm của lượt load.
+    :return: Danh sách ngày (date).
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT DISTINCT dt_extract FROM {work_table} WHERE dt_extract IS NOT NULL")
+        return [row[0] for row in cur.fetchall()]
 
 
-def insert_changed_into_dw(conn, dt_load_to_dw):
+def ensure_dw_partitions(conn, days):
     """
-    Chèn dữ liệu mới từ bảng `temp_dw` vào bảng `dw` với điều kiện và giá trị `dt_load_to_dw` được truyền vào.
+    Tạo các phân vùng tháng của dw cho các ngày dt_extract của lượt load (nếu dw đã được phân vùng).
 
-    :param conn: Kết nối cơ sở dữ liệu PostgreSQL.
-    :param dt_load_to_dw: Ngày (chuỗi) để sử dụng làm giá trị cho cột `dt_load_to_dw`.
+    :param conn: Kết nối PostgreSQL.
+    :param days: Các ngày dt_extract (fetch_extract_days).
     """
-    try:
-        # Tạo con trỏ
-        cursor = conn.cursor()
-
-        # Câu lệnh SQL
-        insert_query = f"""
-        INSERT INTO dw (
-    natural_key,
-    sku,
-    product_name,
-    price,
-    brand,
-    material,
-    shape,
-    dimension,
-    origin,
-    quantity_available,
-    product_url,
-    id_config,
-    dt_extract,
-    dt_load,
-    dt_load_to_dw,
-    dt_last_update
-)
-SELECT 
-    t.natural_key,
-    t.sku,
-    t.product_name,
-    t.price,
-    t.brand,
-    t.material,
-    t.shape,
-    t.dimension,
-    t.origin,
-    t.quantity_available,
-    t.product_url,
-    t.id_config,
-    t.dt_extract,
-    t.dt_load,
-    %s AS dt_load_to_dw,
-    '9999-12-31' AS dt_last_update
-FROM temp_dw t
-JOIN dw d ON t.natural_key = d.natural_key
-WHERE 
-    d.sku <> t.sku OR
-    d.product_name <> t.product_name OR
-    d.price <> t.price OR
-    d.brand <> t.brand OR
-    d.material <> t.material OR
-    d.shape <> t.shape OR
-    d.dimension <> t.dimension OR
-    d.origin <> t.origin OR
-    d.quantity_available <> t.quantity_available OR
-    d.product_url <> t.product_url;
+    for day in days:
+        partition_manager.ensure_partition(conn, "dw", day)
+    conn.commit()
 
-        """
 
-        # Thực thi câu lệnh SQL
-        cursor.execute(insert_query, (dt_load_to_dw,))
-
-        # Xác nhận thay đổi
-        conn.commit()
-        print(f"Insert into dw successful with dt_load_to_dw = {dt_load_to_dw}.")
+def resolve_date_keys(conn, days, cache):
+    """
+    Tra date_dim.id cho các ngày dt_extract của lượt load bằng bảng tra trong bộ nhớ.
 
-    except psycopg2.Error as e:
-        print(f"An error occurred during insertion: {e}")
-        conn.rollback()  # Hoàn tác nếu có lỗi xảy ra
-    finally:
-        # Đóng con trỏ
-        if cursor:
-            cursor.close()
+    :param conn: Kết nối PostgreSQL (dùng khi phải sinh thêm lịch cho date_dim).
+    :param days: Các ngày dt_extract.
+    :param cache: date_key_cache.DateKeyCache.
+    :return: Dictionary ngày -> id (None nếu không có).
+    """
+    return {day: cache.lookup(day, conn) for day in days}
 
 
-def update_news_dt_last_update(conn, date):
+def build_merge_query(work_table, tracked_columns=row_hash.DEFAULT_TRACKED_COLUMNS):
     """
-    Cập nhật cột dt_last_update trong bảng dw với giá trị ngày được cung cấp.
+    Tạo câu lệnh merge SCD2 (xem merge_scd2_into_dw) cho bảng tạm của lượt load.
+    Câu lệnh nhận các tham số dt_load_to_dw, days và keys.
 
-    :param conn: Kết nối cơ sở dữ liệu (psycopg2 connection object).
-    :param date_param: Giá trị ngày cần cập nhật (str hoặc datetime, format 'YYYY-MM-DD').
+    :param work_table: Tên bảng tạm tạo bởi create_work_table.
+    :param tracked_columns: Các cột thuộc tính được sao chép sang dw.
+    :return: Câu lệnh SQL.
     """
-    try:
-        # Tạo cursor để thực hiện truy vấn
-        cursor = conn.cursor()
-
-        # Câu lệnh SQL UPDATE
-        update_query = """
+    tracked = ", ".join(tracked_columns)
+    tracked_t = ", ".join(f"t.{column}" for column in tracked_columns)
+    tracked_c = ", ".join(f"c.{column}" for column in tracked_columns)
+    return f"""
+    WITH changes AS (
+        -- Bản ghi mới: anti-join trên các bản ghi hiện hành (dùng partial index dw_current_idx)
+        SELECT
+            t.natural_key, {tracked_t},
+            t.id_config, t.dt_extract, t.dt_load, t.row_hash,
+            TRUE AS is_new
+        FROM {work_table} t
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM dw d
+            WHERE d.natural_key = t.natural_key
+              AND d.dt_last_update = '9999-12-31'
+        )
+        UNION ALL
+        -- Bản ghi thay đổi: có bản ghi hiện hành nhưng row_hash khác
+        SELECT
+            t.natural_key, {tracked_t},
+            t.id_config, t.dt_extract, t.dt_load, t.row_hash,
+            FALSE AS is_new
+        FROM {work_table} t
+        JOIN dw d
+          ON d.natural_key = t.natural_key
+         AND d.dt_last_update = '9999-12-31'
+        WHERE d.row_hash IS DISTINCT FROM t.row_hash
+    ),
+    closed AS (
         UPDATE dw
-        SET dt_last_update = %s
-        FROM temp_dw t
-        WHERE dw.natural_key = t.natural_key
+        SET dt_last_update = %(dt_load_to_dw)s
+        FROM changes c
+        WHERE dw.natural_key = c.natural_key
           AND dw.dt_last_update = '9999-12-31'
-          AND (
-            dw.sku <> t.sku OR
-            dw.product_name <> t.product_name OR
-            dw.price <> t.price OR
-            dw.brand <> t.brand OR
-            dw.material <> t.material OR
-            dw.shape <> t.shape OR
-            dw.dimension <> t.dimension OR
-            dw.origin <> t.origin OR
-            dw.quantity_available <> t.quantity_available OR
-            dw.product_url <> t.product_url
-          );
-        """
-
-        # Thực thi câu truy vấn với tham số ngày
-        cursor.execute(update_query, (date,))
-
-        # Commit thay đổi
-        conn.commit()
-
-        # In kết quả thành công
-        print(f"Update completed. dt_last_update set to {date}.")
-
-    except Exception as e:
-        # In thông báo lỗi nếu có
-        print(f"Error occurred: {e}")
-        # Rollback thay đổi nếu lỗi xảy ra
-        conn.rollback()
-
-    finally:
-        # Đóng cursor
-        cursor.close()
+          AND NOT c.is_new
+        RETURNING dw.natural_key
+    ),
+    inserted AS (
+        INSERT INTO dw (
+            natural_key, {tracked},
+            id_config, dt_extract, dt_load, row_hash, dt_load_to_dw, dt_last_update, dt_dim
+        )
+        SELECT
+            c.natural_key, {tracked_c},
+            c.id_config, c.dt_extract, c.dt_load, c.row_hash, %(dt_load_to_dw)s, '9999-12-31',
+            dk.id
+        FROM changes c
+        LEFT JOIN unnest(%(days)s::date[], %(keys)s::integer[]) AS dk (day, id)
+          ON dk.day = c.dt_extract
+        RETURNING natural_key
+    )
+    SELECT
+        (SELECT COUNT(*) FROM inserted) - (SELECT COUNT(*) FROM closed),
+        (SELECT COUNT(*) FROM closed);
+    """
 
 
-def update_dt_dim(conn):
+def merge_scd2_into_dw(
+    conn, work_table, dt_load_to_dw, tracked_columns=row_hash.DEFAULT_TRACKED_COLUMNS, date_keys=None
+):
     """
-    Cập nhật giá trị cột dt_dim trong bảng dw với giá trị id từ bảng date_dim
-    khi dt_extract trong bảng dw khớp với full_date trong bảng date_dim.
+    Áp dụng SCD type 2 từ bảng tạm của lượt load vào `dw` bằng một câu lệnh duy nhất (data-modifying CTE):
+    - Bản ghi mới (chưa có bản ghi hiện hành trong dw) được chèn với dt_last_update '9999-12-31'.
+    - Bản ghi thay đổi: bản ghi hiện hành được đóng (dt_last_update = dt_load_to_dw)
+      và phiên bản mới được chèn.
+    dt_dim của các bản ghi được chèn được gán ngay theo dt_extract từ `date_keys` (tra sẵn
+    trong bộ nhớ), nên không cần join với date_dim hay cập nhật lại các bản ghi lịch sử trong dw.
+    Bản ghi mới được tìm bằng NOT EXISTS (anti-join) chỉ trên các bản ghi hiện hành, nên
+    không phụ thuộc vào lượng lịch sử trong dw và đúng cả khi natural_key là NULL.
+    Thay đổi được phát hiện bằng một phép so sánh row_hash (tính lúc nạp staging trên các
+    cột được theo dõi, có phân biệt NULL). Toàn bộ chạy trong một transaction.
 
-    :param conn: Kết nối cơ sở dữ liệu (psycopg2 connection object).
+    :param conn: Kết nối cơ sở dữ liệu PostgreSQL.
+    :param work_table: Tên bảng tạm tạo bởi create_work_table.
+    :param dt_load_to_dw: Ngày (chuỗi) dùng cho cột `dt_load_to_dw` và ngày đóng bản ghi cũ.
+    :param tracked_columns: Các cột thuộc tính được sao chép sang dw.
+    :param date_keys: Dictionary ngày dt_extract -> date_dim.id (resolve_date_keys).
+    :return: (số bản ghi mới, số bản ghi thay đổi) hoặc None nếu có lỗi.
     """
+    merge_query = build_merge_query(work_table, tracked_columns)
     try:
-        # Tạo cursor để thực thi câu truy vấn
-        cursor = conn.cursor()
-
-        # Câu lệnh SQL UPDATE
-        update_query = """
-        UPDATE dw
-        SET dt_dim = date_dim.id
-        FROM date_dim
-        WHERE dw.dt_extract = date_dim.full_date;
-        """
-
-        # Thực thi câu lệnh SQL
-        cursor.execute(update_query)
-
-        # Commit thay đổi vào cơ sở dữ liệu
+        with conn.cursor() as cursor:
+            date_keys = date_keys or {}
+            cursor.execute(
+                merge_query,
+                {
+                    "dt_load_to_dw": dt_load_to_dw,
+                    "days": list(date_keys),
+                    "keys": list(date_keys.values()),
+                },
+            )
+            new_count, changed_count = cursor.fetchone()
         conn.commit()
-
-        # In thông báo thành công
-        print("Cập nhật dt_dim thành công.")
-
-    except Exception as e:
-        # Xử lý lỗi nếu có và rollback giao dịch
-        print(f"Lỗi khi cập nhật: {e}")
-        conn.rollback()
-
-    finally:
-        # Đảm bảo đóng cursor sau khi thực thi
-        cursor.close()
+        print(
+            f"Merge SCD2 vào dw thành công với dt_load_to_dw = {dt_load_to_dw}: "
+            f"{new_count} bản ghi mới, {changed_count} bản ghi thay đổi."
+        )
+        return new_count, changed_count
+    except psycopg2.Error as e:
+        print(f"An error occurred during SCD2 merge: {e}")
+        conn.rollback()  # Hoàn tác nếu có lỗi xảy ra
+        return None
 
 
 def update_status(conn, record_id, status, id_config, time_value):
@@ -488,6 +414,71 @@ def send_email(to_email, subject, body):
         print(f"Đã xảy ra lỗi khi gửi email: {e}")
 
 
+def run_load_to_dw(conn, id_config, path_config, date):
+    """
+    Chạy bước load_to_dw cho một id_config: merge dữ liệu ngày tương ứng từ staging
+    vào dw (SCD2) và cập nhật file log (RUNNING -> LWS).
+
+    :param conn: Kết nối PostgreSQL (dùng lại giữa các bước).
+    :param id_config: ID cấu hình.
+    :param path_config: Đường dẫn file config.xml.
+    :param date: Ngày chạy (chuỗi 'YYYY-MM-DD').
+    :return: True nếu file log được cập nhật sang LWS, ngược lại False (nếu tạo bảng tạm
+        hoặc merge lỗi thì file log được trả về LS để chạy lại).
+    """
+    # 3.3.Kiểm tra có tiến trình đang/đã chạy hoặc không có dữ liệu sẵn sàng đưa vào dw hay không
+    exists = check_file_log(conn, id_config, date)
+    if exists:
+        # 3.3.1.Gửi mail thông báo có tiến trình đang/đã chạy hoặc không có dữ liệu sẵn sàng đưa vào dw(status 'LS')
+        send_email(
+            EMAIL,
+            f"LỖI TRONG QUÁ TRÌNH LOAD_TO_DW: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: Đã có tiến trình đang/đã chạy hoặc không có file sẵn sàng đưa vào data warehouse",
+        )
+        return False
+
+    # 3.4.Lấy thông tin file log
+    file_info = fetch_file_info(conn, id_config, date)
+    # 3.5.Cập nhật file log sang trạng thái 'RUNNING'
+    update_status(conn, file_info["id"], "RUNNING", id_config, date)
+    tracked_columns = row_hash.load_tracked_columns(path_config)
+    # 3.6.Tạo bảng tạm của lượt load từ dữ liệu ngày tương ứng trong bảng staging
+    work_table = create_work_table(
+        conn, id_config, date, file_info["destination_table_staging"], tracked_columns
+    )
+    merged = None
+    if work_table:
+        try:
+            # Tạo phân vùng tháng của dw cho các ngày dt_extract trong lô
+            days = fetch_extract_days(conn, work_table)
+            ensure_dw_partitions(conn, days)
+            # dt_dim của các ngày dt_extract được tra trong bộ nhớ (date_dim nạp một lần cho mỗi tiến trình)
+            date_keys = resolve_date_keys(
+                conn, days, date_key_cache.get_shared_cache(conn, path_config)
+            )
+            # 3.7.Merge SCD2 trong một câu lệnh: insert dữ liệu mới, đóng bản ghi thay đổi
+            # (dt_last_update = ngày load) và insert phiên bản mới với dt_last_update là '9999-12-31',
+            # dt_dim gán theo date_keys
+            merged = merge_scd2_into_dw(conn, work_table, date, tracked_columns, date_keys)
+        except Exception as e:
+            print(f"Lỗi khi chuẩn bị merge vào dw: {e}")
+            conn.rollback()
+        # 3.8.Xóa bảng tạm
+        drop_work_table(conn, work_table)
+    if merged is None:
+        # 3.7.1.Trả file log về LS để chạy lại và gửi mail thông báo merge thất bại
+        update_status(conn, file_info["id"], "LS", id_config, date)
+        send_email(
+            EMAIL,
+            f"LỖI TRONG QUÁ TRÌNH LOAD_TO_DW: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: Không merge được dữ liệu của file {file_info['file_name']} vào data warehouse",
+        )
+        return False
+    # 3.9.Cập nhật file log sang trạng thái 'LWS'
+    update_status(conn, file_info["id"], "LWS", id_config, date)
+    return True
+
+
 def main():
     # Kiểm tra số lượng tham số đầu vào
     if len(sys.argv) < 3:
@@ -526,37 +517,9 @@ def main():
         sys.exit(1)
         return
 
-    # 3.3.Kiểm tra có tiến trình đang/đã chạy hoặc không có dữ liệu sẵn sàng đưa vào dw hay không
-    exists = check_file_log(conn, id_config, date)
-    if exists:
-        # 3.3.1.Gửi mail thông báo có tiến trình đang/đã chạy hoặc không có dữ liệu sẵn sàng đưa vào dw(status 'LS')
-        send_email(
-            EMAIL,
-            f"LỖI TRONG QUÁ TRÌNH LOAD_TO_DW: NGÀY {date} | ID CONFIG: {id_config}",
-            f"Lỗi phát hiện: Đã có tiến trình đang/đã chạy hoặc không có file sẵn sàng đưa vào data warehouse",
-        )
-    else:
-        # 3.4.Lấy thông tin file log
-        file_info = fetch_file_info(conn, id_config, date)
-        # 3.5.Cập nhật file log sang trạng thái 'RUNNING'
-        update_status(conn, file_info["id"], "RUNNING", id_config, date)
-        # 3.6.Insert dữ liệu ngày tương ứng từ bảng staging sang temp_dw
-        insert_into_temp_dw(
-            conn, id_config, date, file_info["destination_table_staging"]
-        )
-        # 3.7.Insert dữ liệu mới (chưa có bên dw) từ bảng temp_dw vào dw với dt_last_update là '9999-12-31'
-        insert_news_into_dw(conn, date)
-        # 3.8.Cập nhật dt_last_update các record có giá trị thay đổi
-        update_news_dt_last_update(conn, date)
-        # 3.9.Insert các dữ liệu thay đổi từ bảng temp_dw vào dw với dt_last_udpate là '9999-12-31'
-        insert_changed_into_dw(conn, date)
-        # 3.10.Update cột dt_dim theo ngày của date_dim
-        update_dt_dim(conn)
-        # 3.11.Truncate bảng temp_dw
-        truncate_table(conn, "temp_dw")
-        # 3.12.Cập nhật file log sang trạng thái 'LWS'
-        update_status(conn, file_info["id"], "LWS", id_config, date)
-    # 3.13.Đóng kết nối
+    # 3.3 - 3.9. Merge dữ liệu từ staging vào dw và cập nhật file log
+    run_load_to_dw(conn, id_config, path_config, date)
+    # 3.10.Đóng kết nối
     conn.close()
 
 
@@ -1,5 +1,4 @@
 import requests
-import pandas as pd
 import re
 from datetime import datetime
 import sys
@@ -8,16 +7,69 @@ import subprocess
 from datetime import datetime
 import xml.etree.ElementTree as ET
 import psycopg2
+import psycopg2.errors
 from psycopg2 import extras
 import csv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from b2sdk.v2 import InMemoryAccountInfo, B2Api
+from b2sdk.v2.exception import B2Error
 from io import StringIO
+import b2_client as b2_client_module
+import http_client
+import output_writer
+import partition_manager
+import row_hash
 
 EMAIL = os.getenv("MY_EMAIL_DW_VAR")
 
+# Cách nạp dữ liệu vào staging: 'copy' (COPY ... FROM STDIN) hoặc 'execute_values'
+DEFAULT_LOAD_METHOD = "copy"
+# Số dòng mỗi câu INSERT khi dùng execute_values
+DEFAULT_BATCH_SIZE = 1000
+# Các cột được thêm vào mỗi dòng CSV khi nạp vào staging
+EXTRA_COLUMNS = ["natural_key", "id_config", "dt_extract", "dt_load", "row_hash"]
+# Giá trị thay cho ô rỗng: -1 cho các cột số, 'N/A' cho các cột còn lại
+NUMERIC_COLUMNS = ("price", "quantity_available")
+NULL_NUMERIC_DEFAULT = "-1"
+NULL_TEXT_DEFAULT = "N/A"
+
+
+class RowStream:
+    """
+    File-like object chỉ đọc, chuyển các dòng (list giá trị) thành text CSV theo từng
+    đoạn để truyền cho cursor.copy_expert mà không giữ toàn bộ dữ liệu trong bộ nhớ.
+    Giá trị None được ghi thành ô rỗng không có dấu nháy, tức NULL trong COPY CSV.
+
+    :param rows: Iterable các dòng cần ghi.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._exhausted = False
+        self.row_count = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 65536
+        # Ghi thêm dòng vào bộ đệm cho tới khi đủ size ký tự hoặc hết dữ liệu
+        while not self._exhausted and self._buffer.tell() < size:
+            row = next(self._rows, None)
+            if row is None:
+                self._exhausted = True
+                break
+            self._writer.writerow(row)
+            self.row_count += 1
+
+        data = self._buffer.getvalue()
+        chunk, rest = data[:size], data[size:]
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffer.write(rest)
+        return chunk
+
 
 def load_database_config(db_name, config_path):
     """
@@ -90,6 +142,7 @@ def fetch_file_info(conn, id_config, date):
         fl.count,
         fl.file_size_kb,
         fl.dt_update,
+        fl.content_sha1,
         fc.source_file_location,
         fc.destination_table_staging,
         fc.bucket_name,
@@ -98,6 +151,8 @@ def fetch_file_info(conn, id_config, date):
     FROM file_logs fl
         INNER JOIN file_config fc ON fl.id_config = fc.id
     WHERE fl.id_config = %s AND fl.time::date = %s AND fl.status = 'ES'
+    ORDER BY fl.id DESC
+    LIMIT 1
     """
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
@@ -115,11 +170,202 @@ def fetch_file_info(conn, id_config, date):
         return {}
 
 
+def load_staging_config(config_path):
+    """
+    Hàm đọc thẻ <staging> trong file config.xml. Các giá trị thiếu sẽ dùng mặc định.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary gồm load_method, batch_size.
+    """
+    root = ET.parse(config_path).getroot()
+    staging = root.find("./staging")
+
+    def get(tag, default):
+        node = staging.find(tag) if staging is not None else None
+        return node.text.strip() if node is not None and node.text else default
+
+    return {
+        "load_method": get("load_method", DEFAULT_LOAD_METHOD),
+        "batch_size": int(get("batch_size", DEFAULT_BATCH_SIZE)),
+    }
+
+
+def extend_rows(
+    reader,
+    headers,
+    id_config,
+    dt_extract,
+    dt_load,
+    tracked_columns=row_hash.DEFAULT_TRACKED_COLUMNS,
+):
+    """
+    Sinh các dòng đã thêm natural_key, id_config, dt_extract, dt_load và row_hash từ csv.reader.
+    Phép transform được làm ngay trên luồng dữ liệu, chỉ với lô đang nạp:
+    - Giá trị được bỏ khoảng trắng hai đầu (như row_hash.canonical_value), ô rỗng được
+      thay bằng -1 (cột số) hoặc 'N/A' (cột chuỗi).
+    - Dòng trùng natural_key chỉ giữ lại dòng xuất hiện đầu tiên.
+    row_hash được tính trên đúng giá trị được lưu, nên thay đổi nào làm đổi hash cũng
+    làm đổi dữ liệu lưu trong dw và ngược lại. natural_key vẫn ghép từ giá trị gốc
+    để khớp với các bản ghi đã có trong dw.
+
+    :param reader: csv.reader đã đọc qua dòng tiêu đề.
+    :param headers: Danh sách cột của file CSV.
+    :param tracked_columns: Các cột dùng để tính row_hash (cột không có trong CSV xem như NULL).
+    :return: Generator các dòng (list).
+    """
+    # Vị trí của product_name, sku và các cột theo dõi chỉ cần tìm một lần
+    product_name_index = headers.index("product_name")
+    sku_index = headers.index("sku")
+    tracked_indexes = [
+        headers.index(column) if column in headers else None for column in tracked_columns
+    ]
+    defaults = [
+        NULL_NUMERIC_DEFAULT if column in NUMERIC_COLUMNS else NULL_TEXT_DEFAULT
+        for column in headers
+    ]
+    seen_keys = set()
+    for row in reader:
+        # Tạo giá trị natural_key và bỏ qua dòng trùng trong lô
+        natural_key = f"{row[product_name_index]}-{row[sku_index]}"
+        if natural_key in seen_keys:
+            continue
+        seen_keys.add(natural_key)
+
+        values = [value.strip() or default for value, default in zip(row, defaults)]
+        hash_value = row_hash.compute_row_hash(
+            values[index] if index is not None else None for index in tracked_indexes
+        )
+        yield values + [natural_key, id_config, dt_extract, dt_load, hash_value]
+
+
+def copy_rows(conn, table_name, columns, rows):
+    """
+    Nạp dữ liệu bằng COPY ... FROM STDIN (một lần gửi cho toàn bộ file).
+
+    :return: Số dòng đã nạp.
+    """
+    stream = RowStream(rows)
+    query = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    with conn.cursor() as cursor:
+        cursor.copy_expert(query, stream)
+    return stream.row_count
+
+
+def insert_rows_batched(conn, table_name, columns, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Nạp dữ liệu bằng INSERT nhiều dòng (execute_values), dùng khi server không cho COPY.
+
+    :return: Số dòng đã nạp.
+    """
+    counted = []
+
+    def counting(rows):
+        for row in rows:
+            counted.append(None)
+            yield row
+
+    query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s"
+    with conn.cursor() as cursor:
+        extras.execute_values(cursor, query, counting(rows), page_size=batch_size)
+    return len(counted)
+
+
+def delete_batch(conn, table_name, id_config, dt_load):
+    """
+    Xóa dữ liệu staging đã nạp trước đó của lô (id_config, dt_load). Hàm không commit.
+
+    :return: Số dòng đã xóa.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table_name} WHERE id_config = %s AND dt_load = %s", (id_config, dt_load)
+        )
+        return cursor.rowcount
+
+
+def load_rows(
+    conn,
+    table_name,
+    columns,
+    make_rows,
+    load_method=DEFAULT_LOAD_METHOD,
+    batch_size=DEFAULT_BATCH_SIZE,
+    batch=None,
+):
+    """
+    Nạp dữ liệu vào bảng, ưu tiên COPY; nếu server không cho phép COPY thì rollback
+    và nạp lại bằng execute_values. Hàm không commit.
+    Nếu có batch, dữ liệu cũ của lô được xóa trong cùng transaction trước mỗi lần nạp,
+    nên nạp lại một lô không để lại natural_key trùng trong staging.
+
+    :param make_rows: Hàm không tham số trả về iterable các dòng (được gọi lại khi fallback).
+    :param batch: (id_config, dt_load) của lô đang nạp.
+    :return: Số dòng đã nạp.
+    """
+    if load_method == "copy":
+        try:
+            if batch:
+                delete_batch(conn, table_name, *batch)
+            return copy_rows(conn, table_name, columns, make_rows())
+        except (psycopg2.errors.InsufficientPrivilege, psycopg2.errors.FeatureNotSupported) as e:
+            print(f"Không thể dùng COPY ({e}), chuyển sang execute_values.")
+            conn.rollback()
+    if batch:
+        delete_batch(conn, table_name, *batch)
+    return insert_rows_batched(conn, table_name, columns, make_rows(), batch_size)
+
+
+def open_csv_stream(url, file_name="", refresh_url=None, expected_sha1=None):
+    """
+    Mở kết nối tải file dạng stream: CSV (có thể nén gzip) được giải mã UTF-8 dần theo
+    từng đoạn, parquet được giải mã theo từng lô cột (xem output_writer.open_reader).
+
+    :param url: Dictionary gồm download_url_base và authorization_token.
+    :param file_name: Tên file, phần mở rộng quyết định định dạng (.csv, .csv.gz, .parquet).
+    :param refresh_url: Hàm trả về url với token mới, được gọi một lần nếu token bị từ chối (401).
+    :param expected_sha1: SHA-1 của file trong file log; nếu có thì được kiểm tra ngay trên luồng tải.
+    :return: (response, iterator các dòng, danh sách cột tiêu đề). Người gọi phải đóng response.
+    """
+    response = http_client.get(
+        url["download_url_base"],
+        headers={"Authorization": url["authorization_token"]},
+        stream=True,
+    )
+    if response.status_code == 401 and refresh_url is not None:
+        # Token tải xuống đã hết hạn hoặc bị thu hồi: xin token mới và tải lại
+        response.close()
+        url.update(refresh_url())
+        response = http_client.get(
+            url["download_url_base"],
+            headers={"Authorization": url["authorization_token"]},
+            stream=True,
+        )
+    response.raise_for_status()  # Kiểm tra lỗi HTTP
+    # Giải nén (nếu server dùng Content-Encoding) và giải mã ngay trên luồng socket
+    response.raw.decode_content = True
+    # Không để urllib3 tự đóng luồng khi đọc hết nội dung (TextIOWrapper sẽ báo lỗi file đã đóng)
+    response.raw.auto_close = False
+    reader, headers = output_writer.open_reader(response.raw, file_name, expected_sha1=expected_sha1)
+    return response, reader, headers
+
+
 def insert_csv_to_table(
-    conn, url, bucket_name, file_name, table_name, id_config, dt_extract, dt_load
+    conn,
+    url,
+    bucket_name,
+    file_name,
+    table_name,
+    id_config,
+    dt_extract,
+    dt_load,
+    load_method=DEFAULT_LOAD_METHOD,
+    batch_size=DEFAULT_BATCH_SIZE,
+    tracked_columns=row_hash.DEFAULT_TRACKED_COLUMNS,
+    refresh_url=None,
+    expected_sha1=None,
 ):
     """
-    Đọc file CSV từ URL và chèn dữ liệu vào bảng PostgreSQL.
+    Đọc file (CSV, CSV nén hoặc parquet theo phần mở rộng của file_name) từ URL và chèn dữ liệu vào bảng PostgreSQL.
 
     Args:
         conn: Kết nối đến PostgreSQL (psycopg2 connection).
@@ -128,121 +374,73 @@ def insert_csv_to_table(
         id_config: ID cấu hình cần thêm vào mỗi dòng.
         dt_extract: Thời điểm extract dữ liệu.
         dt_load: Thời điểm load dữ liệu.
+        load_method: 'copy' hoặc 'execute_values'.
+        batch_size: Số dòng mỗi câu INSERT khi dùng execute_values.
+        tracked_columns: Các cột dùng để tính row_hash.
+        refresh_url: Hàm lấy lại url với token mới khi token bị từ chối (xem open_csv_stream).
+        expected_sha1: SHA-1 của file; nếu nội dung tải về khác thì dữ liệu không được commit.
 
     Returns:
-        None
+        True nếu dữ liệu đã được commit, ngược lại False.
     """
+    responses = []
     try:
-        response = requests.get(
-            url["download_url_base"],
-            headers={"Authorization": url["authorization_token"]}
-        )
-        response.raise_for_status()  # Kiểm tra lỗi HTTP
+        # Đọc file theo luồng: dữ liệu đi thẳng từ HTTP vào COPY, bộ nhớ không phụ thuộc kích thước file
+        response, reader, headers = open_csv_stream(url, file_name, refresh_url, expected_sha1)
+        responses.append(response)
         print(url)
-        # Chuyển nội dung CSV thành StringIO
-        csv_content = response.content.decode("utf-8")  # Giả định encoding là UTF-8
-        csv_file = StringIO(csv_content)
-
-        # Đọc file CSV bằng csv.reader
-        reader = csv.reader(csv_file)
-        headers = next(reader)
 
         # Kiểm tra cột product_name và sku
         if "product_name" not in headers or "sku" not in headers:
             raise ValueError("CSV thiếu cột 'product_name' hoặc 'sku'.")
 
         # Thêm các cột bổ sung
-        extended_headers = headers + ["natural_key", "id_config", "dt_extract", "dt_load"]
+        extended_headers = headers + EXTRA_COLUMNS
+        readers = [reader]
 
-        # Tạo chuỗi truy vấn SQL
-        placeholders = ", ".join(["%s"] * len(extended_headers))
-        query = f"""
-            INSERT INTO {table_name} ({", ".join(extended_headers)})
-            VALUES ({placeholders})
-        """
+        def make_rows():
+            # Lần đầu dùng luồng đã mở; nếu phải fallback thì tải lại file
+            if readers:
+                current = readers.pop()
+            else:
+                retry_response, current, _ = open_csv_stream(
+                    url, file_name, refresh_url, expected_sha1
+                )
+                responses.append(retry_response)
+            return extend_rows(
+                current, headers, id_config, dt_extract, dt_load, tracked_columns
+            )
 
         # Chèn dữ liệu vào bảng
-        cursor = conn.cursor()
-        for row in reader:
-            # Tìm vị trí của product_name và sku
-            product_name_index = headers.index("product_name")
-            sku_index = headers.index("sku")
-            
-            # Tạo giá trị natural_key
-            natural_key = f"{row[product_name_index]}-{row[sku_index]}"
-            
-            # Mở rộng hàng với giá trị mới
-            extended_row = row + [natural_key, id_config, dt_extract, dt_load]
-            cursor.execute(query, extended_row)
+        # Dữ liệu của lần nạp trước cho cùng lô được thay thế
+        row_count = load_rows(
+            conn,
+            table_name,
+            extended_headers,
+            make_rows,
+            load_method,
+            batch_size,
+            batch=(id_config, dt_load),
+        )
 
         # Lưu thay đổi
         conn.commit()
-        print(f"Dữ liệu đã được chèn thành công vào bảng {table_name}.")
+        print(f"Dữ liệu đã được chèn thành công vào bảng {table_name} ({row_count} dòng).")
+        return True
 
     except requests.exceptions.RequestException as e:
         print(f"Lỗi khi tải file CSV từ URL: {e}")
+        conn.rollback()
     except psycopg2.DatabaseError as e:
         print(f"Lỗi cơ sở dữ liệu: {e}")
         conn.rollback()  # Hoàn tác nếu có lỗi xảy ra
     except Exception as e:
+        # Ví dụ SHA-1 của file tải về không khớp với file log: hủy dữ liệu đã nạp dở
         print(f"Lỗi khác: {e}")
-
-
-def transform_data(conn, table_name):
-    """
-    Hàm thực hiện hai chức năng trên bảng:
-    1. Thay thế tất cả các giá trị NULL trong bảng thành:
-       - 'N/A' cho các cột kiểu chuỗi.
-       - -1 cho các cột kiểu số.
-    2. Loại bỏ các dòng trùng lặp dựa trên natural_key, chỉ giữ lại một dòng.
-
-    :param conn: Kết nối PostgreSQL.
-    :param table_name: Tên bảng cần xử lý.
-    :param natural_key: Cột dùng để xác định trùng lặp.
-    """
-    # Câu truy vấn thay thế NULL
-    query_replace_null = f"""
-    UPDATE {table_name}
-    SET 
-        sku = COALESCE(sku, 'N/A'),
-        product_name = COALESCE(product_name, 'N/A'),
-        price = COALESCE(price, -1),
-        brand = COALESCE(brand, 'N/A'),
-        material = COALESCE(material, 'N/A'),
-        shape = COALESCE(shape, 'N/A'),
-        dimension = COALESCE(dimension, 'N/A'),
-        origin = COALESCE(origin, 'N/A'),
-        quantity_available = COALESCE(quantity_available, -1),
-        product_url = COALESCE(product_url, 'N/A');
-    """
-    
-    # Câu truy vấn loại bỏ trùng lặp
-    query_remove_duplicates = f"""
-    DELETE FROM {table_name}
-    WHERE ctid NOT IN (
-        SELECT MIN(ctid)
-        FROM {table_name}
-        GROUP BY natural_key
-    );
-    """
-
-    try:
-        with conn.cursor() as cur:
-            # Bước 1: Thay thế giá trị NULL
-            print(f"Đang thay thế giá trị NULL trong bảng '{table_name}'...")
-            cur.execute(query_replace_null)
-            print(f"Hoàn tất thay thế giá trị NULL trong bảng '{table_name}'.")
-
-            # Bước 2: Loại bỏ dòng trùng lặp
-            print(f"Đang loại bỏ các dòng trùng lặp trong bảng '{table_name}'...")
-            cur.execute(query_remove_duplicates)
-            print(f"Hoàn tất loại bỏ dòng trùng lặp trong bảng '{table_name}'.")
-
-            # Ghi nhận thay đổi
-            conn.commit()
-    except Exception as e:
-        print(f"Lỗi khi xử lý bảng '{table_name}': {e}")
-        conn.rollback()  # Quay lại trạng thái trước đó nếu có lỗi
+        conn.rollback()
+    finally:
+        for response in responses:
+            response.close()
 
 
 def update_status(conn, record_id, id_config, time_value, status):
@@ -313,7 +511,7 @@ def check_file_log(conn, id_config, date):
         return False
 
 
-def check_csv_existed_in_b2(config_file, bucket_name, folder_name, csv_file_name):
+def check_csv_existed_in_b2(config_file, bucket_name, folder_name, csv_file_name, b2_client=None):
     """
     Check if a CSV file exists in a specific folder within a Backblaze B2 bucket.
 
@@ -322,76 +520,31 @@ def check_csv_existed_in_b2(config_file, bucket_name, folder_name, csv_file_name
         bucket_name (str): Name of the B2 bucket.
         folder_name (str): Folder path within the bucket to check.
         csv_file_name (str): Name of the CSV file to check.
+        b2_client (B2Client, optional): Client to use; the shared client of the process if omitted.
 
     Returns:
         bool: True if the file exists, False otherwise.
     """
-    # Parse the config file to extract Backblaze credentials
-    tree = ET.parse(config_file)
-    root = tree.getroot()
-
-    # Extract credentials from the XML
-    key_id = root.find("./backblaze/key_id").text
-    application_key = root.find("./backblaze/application_key").text
-
-    # Initialize B2 API
-    info = InMemoryAccountInfo()
-    b2_api = B2Api(info)
-
-    # Authorize with B2
-    b2_api.authorize_account("production", key_id, application_key)
-
-    # Get the bucket
-    bucket = b2_api.get_bucket_by_name(bucket_name)
+    if b2_client is None:
+        b2_client = b2_client_module.get_client(config_file)
 
     # Ensure folder name ends with a slash
     if not folder_name.endswith("/"):
         folder_name += "/"
 
-    # Construct the full file path
-    file_path = folder_name + csv_file_name
-
     # Check if the file exists in the bucket
     try:
-        bucket.get_file_info_by_name(file_path)
-        return True
-    except Exception:
+        return b2_client.file_exists(bucket_name, folder_name + csv_file_name)
+    except B2Error as e:
+        print(f"Lỗi khi kiểm tra file trên B2: {e}")
         return False
 
 
-def get_download_url(account_id, application_key, bucket_id, bucket_name, file_name_prefix, valid_duration_in_seconds=3600):
+def get_download_url(b2_client, bucket_name, file_name, refresh=False):
     try:
-        # Bước 1: Authorize tài khoản
-        auth_response = requests.get(
-            "https://api.backblazeb2.com/b2api/v2/b2_authorize_account",
-            auth=(account_id, application_key)
-        )
-        auth_response.raise_for_status()
-        auth_data = auth_response.json()
-
-        # Lấy API URL và token
-        download_url_base = auth_data['downloadUrl']
-        auth_token = auth_data['authorizationToken']
-
-        # Bước 2: Lấy Download Authorization Token
-        download_auth_response = requests.post(
-            f"{auth_data['apiUrl']}/b2api/v2/b2_get_download_authorization",
-            headers={"Authorization": auth_token},
-            json={
-                "bucketId": bucket_id,
-                "fileNamePrefix": file_name_prefix,
-                "validDurationInSeconds": valid_duration_in_seconds
-            }
-        )
-        download_auth_response.raise_for_status()
-        download_auth_data = download_auth_response.json()
-
-        # Trả về URL cơ sở và token để dùng trong Header
-        return {
-            "download_url_base": f"{download_url_base}/file/{bucket_name}/{file_name_prefix}",
-            "authorization_token": download_auth_data['authorizationToken']
-        }
-    except requests.exceptions.RequestException as e:
+        # Token tải xuống được cache theo thư mục trong B2Client, chỉ xin lại khi sắp hết hạn
+        return b2_client.download_url(bucket_name, file_name, refresh)
+    except B2Error as e:
         print(f"Lỗi khi lấy URL tải xuống: {e}")
         return None
 
@@ -439,6 +592,11 @@ def insert_to_table_from_b2(
     id_config,
     dt_extract,
     dt_load,
+    load_method=DEFAULT_LOAD_METHOD,
+    batch_size=DEFAULT_BATCH_SIZE,
+    tracked_columns=row_hash.DEFAULT_TRACKED_COLUMNS,
+    b2_client=None,
+    expected_sha1=None,
 ):
     """
     Download a CSV file from a specific folder in a Backblaze B2 bucket to a local directory.
@@ -449,30 +607,117 @@ def insert_to_table_from_b2(
         folder_name (str): Folder path within the bucket where the file is located.
         csv_file_name (str): Name of the CSV file to download.
         download_directory (str): Local directory to save the downloaded file.
+        b2_client (B2Client, optional): Client to use; the shared client of the process if omitted.
+        expected_sha1 (str, optional): SHA-1 recorded at upload; the content is checked while streaming.
 
     Returns:
-        str: Path to the downloaded file if successful.
+        bool: True if the rows were loaded and committed.
     """
-    # Parse the config file to extract Backblaze credentials
-    tree = ET.parse(config_file)
-    root = tree.getroot()
+    if b2_client is None:
+        b2_client = b2_client_module.get_client(config_file)
+
+    file_path = folder_name + "/" + file_name
+    url = get_download_url(b2_client, bucket_name, file_path)
+    return insert_csv_to_table(
+        conn,
+        url,
+        bucket_name,
+        file_name,
+        table_name,
+        id_config,
+        dt_extract,
+        dt_load,
+        load_method,
+        batch_size,
+        tracked_columns,
+        lambda: b2_client.download_url(bucket_name, file_path, refresh=True),
+        expected_sha1,
+    )
 
-    key_id = root.find("./backblaze/key_id").text
-    application_key = root.find("./backblaze/application_key").text
 
-    # Initialize B2 API
-    info = InMemoryAccountInfo()
-    b2_api = B2Api(info)
+def run_load_to_staging(conn, id_config, path_config, date, b2_client=None):
+    """
+    Chạy bước load_to_staging cho một id_config: nạp file .csv (trạng thái ES) từ B2
+    vào bảng staging và cập nhật file log (RUNNING -> LS).
+
+    :param conn: Kết nối PostgreSQL (dùng lại giữa các bước).
+    :param id_config: ID cấu hình.
+    :param path_config: Đường dẫn file config.xml.
+    :param date: Ngày chạy (chuỗi 'YYYY-MM-DD').
+    :param b2_client: B2Client dùng chung (mặc định client chung của tiến trình).
+    :return: True nếu file log được cập nhật sang LS, ngược lại False.
+    """
+    # 2.3.Kiểm tra file log có tiến trình đang hoặc đã chạy hoặc không có file nào có trạng thái ES chưa
+    exists = check_file_log(conn, id_config, date)
+    if exists:
+        # 2.3.1.Gửi mail thông báo có tiến trình đã/đang chạy hoặc không có file nào có status ES(sẵn sàng load)
+        send_email(
+            EMAIL,
+            f"LỖI TRONG QUÁ TRÌNH LOAD_TO_STAGING: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: Đã có tiến trình đang/đã chạy hoặc không có file sẵn sàng đưa vào staging",
+        )
+        return False
 
-    # Authorize with B2
-    b2_api.authorize_account("production", key_id, application_key)
+    # 2.4.Lấy thông tin file config
+    file_info = fetch_file_info(conn, id_config, date)
+    print(f"data: {file_info}")
+    if b2_client is None:
+        b2_client = b2_client_module.get_client(path_config)
+    # 2.5.Kiểm tra có tồn tại file .csv trên B2 theo thông tin của file config hay không
+    if not check_csv_existed_in_b2(
+        path_config,
+        file_info["bucket_name"],
+        file_info["folder_b2_name"],
+        file_info["file_name"],
+        b2_client,
+    ):
+        # 2.5.1.Gửi mail thông báo không tồn tại file theo file log
+        send_email(
+            EMAIL,
+            f"LỖI KẾT TRONG QUÁ TRÌNH LOAD_TO_STAGING: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: Không tìm thấy file {file_info['file_name']} trên Bucket {file_info['bucket_name']}",
+        )
+        return False
 
-    url = get_download_url(
-        key_id, application_key, bucket_id,bucket_name, folder_name + "/" + file_name
+    # 2.6.Update file log sang status 'RUNNING'
+    update_status(
+        conn, file_info["id"], id_config, file_info["time"], "RUNNING"
     )
-    insert_csv_to_table(
-        conn, url, bucket_name, file_name, table_name, id_config, dt_extract, dt_load
+    # Tạo phân vùng tháng của dt_load nếu bảng staging đã được phân vùng
+    partition_manager.ensure_partition(conn, file_info["destination_table_staging"], date)
+    conn.commit()
+    # 2.7. Insert từ file .csv  trên B2 vào bảng staging tương ứng theo file log,
+    # các cột còn thiếu được transform thành N/A và các dòng trùng bị bỏ ngay khi nạp
+    staging_config = load_staging_config(path_config)
+    loaded = insert_to_table_from_b2(
+        conn,
+        path_config,
+        file_info["bucket_id"],
+        file_info["bucket_name"],
+        file_info["folder_b2_name"],
+        file_info["file_name"],
+        file_info["destination_table_staging"],
+        id_config,
+        file_info["time"],
+        date,
+        staging_config["load_method"],
+        staging_config["batch_size"],
+        row_hash.load_tracked_columns(path_config),
+        b2_client,
+        file_info["content_sha1"],
     )
+    if not loaded:
+        # 2.7.1.Trả file log về ES để chạy lại và gửi mail thông báo nạp thất bại
+        update_status(conn, file_info["id"], id_config, file_info["time"], "ES")
+        send_email(
+            EMAIL,
+            f"LỖI TRONG QUÁ TRÌNH LOAD_TO_STAGING: NGÀY {date} | ID CONFIG: {id_config}",
+            f"Lỗi phát hiện: Không nạp được file {file_info['file_name']} vào staging",
+        )
+        return False
+    # 2.8. Update file log sang status là LS
+    update_status(conn, file_info["id"], id_config, file_info["time"], "LS")
+    return True
 
 
 def main():
@@ -503,6 +748,7 @@ def main():
 
     # 2.1. Load file config.xml
     db_config = load_database_config("dw", path_config)
+    http_client.configure_from_file(path_config)
     try:
         # 2.2.Kết nối cơ sở dữ liệu dw
         conn = connect_to_database(db_config)
@@ -512,55 +758,9 @@ def main():
         sys.exit(1)
         return
 
-    # 2.3.Kiểm tra file log có tiến trình đang hoặc đã chạy hoặc không có file nào có trạng thái ES chưa
-    exists = check_file_log(conn, id_config, date)
-    if exists:
-        # 2.3.1.Gửi mail thông báo có tiến trình đã/đang chạy hoặc không có file nào có status ES(sẵn sàng load)
-        send_email(
-            EMAIL,
-            f"LỖI TRONG QUÁ TRÌNH LOAD_TO_STAGING: NGÀY {date} | ID CONFIG: {id_config}",
-            f"Lỗi phát hiện: Đã có tiến trình đang/đã chạy hoặc không có file sẵn sàng đưa vào staging",
-        )
-    else:
-        # 2.4.Lấy thông tin file config
-        file_info = fetch_file_info(conn, id_config, date)
-        print(f"data: {file_info}")
-        # 2.5.Kiểm tra có tồn tại file .csv trên B2 theo thông tin của file config hay không
-        if not check_csv_existed_in_b2(
-            path_config,
-            file_info["bucket_name"],
-            file_info["folder_b2_name"],
-            file_info["file_name"],
-        ):
-            # 2.5.1.Gửi mail thông báo không tồn tại file theo file log
-            send_email(
-                EMAIL,
-                f"LỖI KẾT TRONG QUÁ TRÌNH LOAD_TO_STAGING: NGÀY {date} | ID CONFIG: {id_config}",
-                f"Lỗi phát hiện: Không tìm thấy file {file_info['file_name']} trên Bucket {file_info['bucket_name']}",
-            )
-        else:
-            # 2.6.Update file log sang status 'RUNNING'
-            update_status(
-                conn, file_info["id"], id_config, file_info["time"], "RUNNING"
-            )
-            # 2.7. Insert từ file .csv  trên B2 vào bảng staging tương ứng theo file log
-            insert_to_table_from_b2(
-                conn,
-                path_config,
-                file_info["bucket_id"],
-                file_info["bucket_name"],
-                file_info["folder_b2_name"],
-                file_info["file_name"],
-                file_info["destination_table_staging"],
-                id_config,
-                file_info["time"],
-                date,
-            )
-            # 2.8. Tiến hành transform các cột còn thiếu thành N/A và bỏ các dòng trùng
-            transform_data(conn, file_info["destination_table_staging"])
-            # 2.9. Update file log sang status là LS
-            update_status(conn, file_info["id"], id_config, file_info["time"], "LS")
-    # 2.10. Đóng kết nối csdl
+    # 2.3 - 2.8. Nạp file .csv từ B2 vào staging và cập nhật file log
+    run_load_to_staging(conn, id_config, path_config, date)
+    # 2.9. Đóng kết nối csdl
     conn.close()
 
 
@@ -0,0 +1,198 @@
+import sys
+import os
+import glob
+import xml.etree.ElementTree as ET
+import psycopg2
+from psycopg2 import extras
+import row_hash
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Chuỗi được thay bằng tên từng bảng staging trong file_config
+STAGING_TABLE_PLACEHOLDER = "{staging_table}"
+
+
+def load_database_config(db_name, config_path):
+    """
+    Hàm đọc file config.xml và lấy thông tin kết nối cho database có tên cụ thể.
+
+    :param db_name: Tên cơ sở dữ liệu cần kết nối.
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary chứa thông tin kết nối.
+    """
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"File config tại '{config_path}' không tồn tại.")
+
+    # Parse file XML
+    tree = ET.parse(config_path)
+    root = tree.getroot()
+
+    # Tìm thông tin database theo tên
+    for db in root.findall(".//database"):
+        if db.get("name") == db_name:
+            return {
+                "hostname": db.find("hostname").text,
+                "port": db.find("port").text,
+                "database": db.find("database").text,
+                "username": db.find("username").text,
+                "password": db.find("password").text,
+            }
+
+    raise ValueError(f"Không tìm thấy database với tên '{db_name}' trong file config.")
+
+
+def connect_to_database(db_config):
+    """
+    Hàm kết nối tới cơ sở dữ liệu PostgreSQL dựa trên thông tin cấu hình.
+
+    :param db_config: Dictionary chứa thông tin kết nối.
+    :return: Kết nối PostgreSQL (psycopg2 connection object).
+    """
+
+    conn = psycopg2.connect(
+        host=db_config["hostname"],
+        port=db_config["port"],
+        database=db_config["database"],
+        user=db_config["username"],
+        password=db_config["password"],
+    )
+    print("Kết nối cơ sở dữ liệu thành công.")
+    return conn
+
+
+def fetch_staging_tables(conn):
+    """
+    Lấy danh sách các bảng staging đang được khai báo trong file_config.
+
+    :param conn: Kết nối PostgreSQL.
+    :return: Danh sách tên bảng staging.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT destination_table_staging
+            FROM file_config
+            WHERE destination_table_staging IS NOT NULL
+            ORDER BY destination_table_staging
+            """
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def apply_migrations(conn):
+    """
+    Chạy lần lượt các file migrations/*.sql chưa được áp dụng. Mỗi migration chạy
+    trong một transaction và được ghi lại trong bảng schema_migrations.
+
+    :param conn: Kết nối PostgreSQL.
+    :return: Danh sách migration vừa được áp dụng.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name text PRIMARY KEY,
+                applied_at timestamp NOT NULL DEFAULT now()
+            )
+            """
+        )
+        cur.execute("SELECT name FROM schema_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+    conn.commit()
+
+    staging_tables = fetch_staging_tables(conn)
+    newly_applied = []
+    for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+        name = os.path.basename(path)
+        if name in applied:
+            continue
+
+        with open(path, mode="r", encoding="utf-8") as f:
+            sql = f.read()
+
+        # Migration dùng cho bảng staging được chạy một lần cho mỗi bảng
+        if STAGING_TABLE_PLACEHOLDER in sql:
+            statements = [sql.replace(STAGING_TABLE_PLACEHOLDER, table) for table in staging_tables]
+        else:
+            statements = [sql]
+
+        try:
+            with conn.cursor() as cur:
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            conn.commit()
+            print(f"Đã áp dụng migration {name}.")
+            newly_applied.append(name)
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Lỗi khi áp dụng migration {name}: {e}")
+            raise
+
+    return newly_applied
+
+
+def backfill_row_hash(conn, tracked_columns, rehash=False, batch_size=5000):
+    """
+    Tính row_hash cho các bản ghi hiện hành trong dw (dt_last_update = '9999-12-31').
+    Hash được tính bằng row_hash.compute_row_hash giống hệt lúc nạp staging.
+
+    :param conn: Kết nối PostgreSQL.
+    :param tracked_columns: Các cột được theo dõi.
+    :param rehash: True để tính lại cả các bản ghi đã có row_hash (khi đổi tracked_columns).
+    :param batch_size: Số bản ghi mỗi lần cập nhật.
+    :return: Số bản ghi đã cập nhật.
+    """
+    condition = "" if rehash else "AND row_hash IS NULL"
+    select_query = f"""
+    SELECT natural_key, {", ".join(tracked_columns)}
+    FROM dw
+    WHERE dt_last_update = '9999-12-31' {condition}
+    """
+    update_query = """
+    UPDATE dw
+    SET row_hash = v.row_hash
+    FROM (VALUES %s) AS v (natural_key, row_hash)
+    WHERE dw.natural_key = v.natural_key
+      AND dw.dt_last_update = '9999-12-31'
+    """
+    updated = 0
+    try:
+        with conn.cursor(name="backfill_row_hash") as reader, conn.cursor() as writer:
+            reader.itersize = batch_size
+            reader.execute(select_query)
+            while True:
+                rows = reader.fetchmany(batch_size)
+                if not rows:
+                    break
+                values = [(row[0], row_hash.compute_row_hash(row[1:])) for row in rows]
+                extras.execute_values(writer, update_query, values, page_size=batch_size)
+                updated += len(values)
+        conn.commit()
+        print(f"Đã tính row_hash cho {updated} bản ghi hiện hành trong dw.")
+        return updated
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Lỗi khi tính row_hash: {e}")
+        raise
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Vui lòng nhập tham số path_config.")
+        print("Cú pháp: python migrate.py <path_config> [--rehash]")
+        sys.exit(1)
+
+    path_config = sys.argv[1]
+    rehash = "--rehash" in sys.argv[2:]
+
+    db_config = load_database_config("dw", path_config)
+    conn = connect_to_database(db_config)
+    try:
+        apply_migrations(conn)
+        backfill_row_hash(conn, row_hash.load_tracked_columns(path_config), rehash)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
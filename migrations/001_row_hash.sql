@@ -0,0 +1,7 @@
+-- Cột row_hash: MD5 của các cột được theo dõi (xem row_hash.py), tính lúc nạp staging.
+-- {staging_table} được thay bằng từng bảng staging trong file_config.
+ALTER TABLE {staging_table} ADD COLUMN IF NOT EXISTS row_hash char(32);
+ALTER TABLE temp_dw ADD COLUMN IF NOT EXISTS row_hash char(32);
+ALTER TABLE dw ADD COLUMN IF NOT EXISTS row_hash char(32);
+
+CREATE INDEX IF NOT EXISTS dw_natural_key_row_hash_idx ON dw (natural_key, row_hash);
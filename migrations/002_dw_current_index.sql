@@ -0,0 +1,8 @@
+-- Partial index trên các bản ghi hiện hành của dw, phục vụ anti-join tìm bản ghi mới,
+-- phép so sánh row_hash và câu lệnh đóng bản ghi cũ trong merge SCD2.
+-- Index chỉ chứa bản ghi hiện hành nên kích thước không tăng theo lịch sử.
+CREATE INDEX IF NOT EXISTS dw_current_idx
+    ON dw (natural_key, row_hash)
+    WHERE dt_last_update = '9999-12-31';
+
+DROP INDEX IF EXISTS dw_natural_key_row_hash_idx;
@@ -0,0 +1,7 @@
+-- dt_dim giờ được gán ngay khi merge vào dw. Điền một lần cho các bản ghi cũ còn thiếu
+-- (trước đây được cập nhật lại toàn bảng sau mỗi lần load).
+UPDATE dw
+SET dt_dim = date_dim.id
+FROM date_dim
+WHERE dw.dt_extract = date_dim.full_date
+  AND dw.dt_dim IS NULL;
@@ -0,0 +1,34 @@
+-- Chuyển bảng staging sang phân vùng theo dt_load (range, mỗi tháng một phân vùng).
+-- Bảng cũ được đổi tên thành {staging_table}_legacy và gắn vào làm phân vùng lịch sử
+-- tới hết tháng của dt_load lớn nhất; các phân vùng tháng sau do partition_manager.py tạo.
+-- Dòng có dt_load NULL không thuộc khoảng nào nên được chuyển trước sang phân vùng DEFAULT
+-- {staging_table}_null, chỉ nhận dt_load NULL (ngày ngoài các phân vùng vẫn bị từ chối).
+ALTER TABLE {staging_table} RENAME TO {staging_table}_legacy;
+
+CREATE TABLE {staging_table} (LIKE {staging_table}_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (dt_load);
+
+DO $$
+DECLARE
+    upper_bound date;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MAX(dt_load), CURRENT_DATE)) + INTERVAL '1 month'
+    INTO upper_bound
+    FROM {staging_table}_legacy;
+
+    IF EXISTS (SELECT 1 FROM {staging_table}_legacy WHERE dt_load IS NULL) THEN
+        CREATE TABLE {staging_table}_null PARTITION OF {staging_table} (
+            CONSTRAINT {staging_table}_null_dt_load CHECK (dt_load IS NULL)
+        ) DEFAULT;
+
+        WITH moved AS (
+            DELETE FROM {staging_table}_legacy WHERE dt_load IS NULL RETURNING *
+        )
+        INSERT INTO {staging_table}_null SELECT * FROM moved;
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE {staging_table} ATTACH PARTITION {staging_table}_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+        upper_bound
+    );
+END $$;
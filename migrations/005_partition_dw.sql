@@ -0,0 +1,47 @@
+-- Chuyển dw sang phân vùng theo dt_extract (range, mỗi tháng một phân vùng).
+-- Bảng cũ được đổi tên thành dw_legacy và gắn vào làm phân vùng lịch sử tới hết tháng
+-- của dt_extract lớn nhất; các phân vùng tháng sau do partition_manager.py tạo.
+-- Bản ghi có dt_extract NULL được chuyển trước sang phân vùng DEFAULT dw_null, chỉ nhận
+-- dt_extract NULL (giữ nguyên id và lịch sử SCD2 của chúng).
+ALTER INDEX IF EXISTS dw_current_idx RENAME TO dw_legacy_current_idx;
+ALTER TABLE dw RENAME TO dw_legacy;
+
+CREATE TABLE dw (LIKE dw_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (dt_extract);
+
+DO $$
+DECLARE
+    upper_bound date;
+    id_sequence text;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MAX(dt_extract), CURRENT_DATE)) + INTERVAL '1 month'
+    INTO upper_bound
+    FROM dw_legacy;
+
+    IF EXISTS (SELECT 1 FROM dw_legacy WHERE dt_extract IS NULL) THEN
+        CREATE TABLE dw_null PARTITION OF dw (
+            CONSTRAINT dw_null_dt_extract CHECK (dt_extract IS NULL)
+        ) DEFAULT;
+
+        WITH moved AS (
+            DELETE FROM dw_legacy WHERE dt_extract IS NULL RETURNING *
+        )
+        INSERT INTO dw_null SELECT * FROM moved;
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE dw ATTACH PARTITION dw_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+        upper_bound
+    );
+
+    -- Sequence của cột id chuyển sang thuộc bảng cha, để việc xóa phân vùng cũ không xóa theo
+    id_sequence := pg_get_serial_sequence('dw_legacy', 'id');
+    IF id_sequence IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY dw.id', id_sequence);
+    END IF;
+END $$;
+
+-- Index trên bảng cha được tạo tự động cho mọi phân vùng (index cũ của dw_legacy được gắn lại)
+CREATE INDEX IF NOT EXISTS dw_current_idx
+    ON dw (natural_key, row_hash)
+    WHERE dt_last_update = '9999-12-31';
@@ -0,0 +1,2 @@
+-- load_to_dw dùng bảng tạm (TEMP) riêng cho mỗi lượt load, bảng temp_dw dùng chung không còn cần thiết.
+DROP TABLE IF EXISTS temp_dw;
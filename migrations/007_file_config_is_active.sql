@@ -0,0 +1,2 @@
+-- Cờ bật/tắt nguồn dữ liệu cho scheduler.py (chỉ chạy các dòng is_active = true).
+ALTER TABLE file_config ADD COLUMN IF NOT EXISTS is_active boolean NOT NULL DEFAULT true;
@@ -0,0 +1,2 @@
+-- SHA-1 của file đã upload lên B2 (hex), để bước staging kiểm tra file tải về mà không cần đếm lại dòng.
+ALTER TABLE file_logs ADD COLUMN IF NOT EXISTS content_sha1 char(40);
@@ -0,0 +1,299 @@
+import csv
+import gzip
+import hashlib
+import os
+from decimal import Decimal, InvalidOperation
+from io import BufferedReader, BytesIO, RawIOBase, TextIOWrapper
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow là tùy chọn, chỉ cần cho định dạng parquet
+    pa = None
+    pq = None
+
+# Định dạng file đầu ra và phần mở rộng tương ứng
+OUTPUT_FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "parquet": ".parquet",
+}
+DEFAULT_OUTPUT_FORMAT = "csv"
+# Kiểu của các cột số trong file parquet, các cột còn lại là chuỗi
+NUMERIC_COLUMNS = ("price", "quantity_available")
+# Số dòng mỗi row group của file parquet (cũng là số dòng mỗi lô khi đọc lại)
+PARQUET_ROW_GROUP_SIZE = 10000
+
+
+def resolve_output_format(name):
+    """
+    Kiểm tra định dạng đầu ra, nếu chọn parquet mà chưa cài pyarrow thì dùng csv.gz.
+
+    :param name: 'csv', 'csv.gz' hoặc 'parquet'.
+    :return: Định dạng sẽ được sử dụng.
+    """
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Định dạng đầu ra không hợp lệ: '{name}'.")
+    if name == "parquet" and pq is None:
+        print("pyarrow chưa được cài đặt, sử dụng 'csv.gz'.")
+        return "csv.gz"
+    return name
+
+
+def detect_format(file_name):
+    """
+    Xác định định dạng của file theo phần mở rộng (mặc định csv).
+    """
+    for output_format, extension in sorted(OUTPUT_FORMATS.items(), key=lambda item: -len(item[1])):
+        if file_name.endswith(extension):
+            return output_format
+    return DEFAULT_OUTPUT_FORMAT
+
+
+def to_number(value):
+    """
+    Chuyển giá trị cào được (ví dụ '7900000 ') thành số nguyên, None nếu rỗng hoặc không phải số.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return int(Decimal(text))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+class CsvStreamWriter:
+    """
+    Ghi từng dòng CSV ra file tạm ngay khi có dữ liệu, rồi đổi tên (atomic) thành
+    file đích khi commit. File đích không bao giờ ở trạng thái ghi dở.
+
+    :param file_path: Đường dẫn file CSV đích.
+    :param fieldnames: Danh sách tên cột (dòng tiêu đề).
+    :param compress: True để nén gzip (file .csv.gz).
+    """
+
+    def __init__(self, file_path, fieldnames, compress=False):
+        self.file_path = file_path
+        self.temp_path = file_path + ".part"
+        self.fieldnames = list(fieldnames)
+        self.row_count = 0
+        self.size_bytes = 0
+        if compress:
+            # Header gzip không chứa tên file và thời điểm ghi (mtime=0), nên cùng dữ liệu
+            # luôn cho cùng một file (và cùng SHA-1)
+            self._raw = open(self.temp_path, mode="wb")
+            self._file = TextIOWrapper(
+                gzip.GzipFile(filename="", fileobj=self._raw, mode="wb", mtime=0),
+                encoding="utf-8",
+                newline="",
+            )
+        else:
+            self._raw = None
+            self._file = open(self.temp_path, mode="w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, lineterminator="\n")
+        self._writer.writeheader()
+
+    def write_row(self, row):
+        self._writer.writerow(row)
+        self.row_count += 1
+
+    def commit(self):
+        """
+        Đóng file tạm và đổi tên thành file đích.
+
+        :return: Dictionary gồm line_count (không tính tiêu đề) và file_size_bytes.
+        """
+        self._close()
+        self.size_bytes = os.path.getsize(self.temp_path)
+        os.replace(self.temp_path, self.file_path)
+        return {"line_count": self.row_count, "file_size_bytes": self.size_bytes}
+
+    def abort(self):
+        """
+        Đóng và xóa file tạm (dùng khi quá trình cào bị lỗi).
+        """
+        self._close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def _close(self):
+        # GzipFile không đóng file mà nó ghi vào
+        if not self._file.closed:
+            self._file.close()
+        if self._raw is not None and not self._raw.closed:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        return False
+
+
+class ParquetStreamWriter(CsvStreamWriter):
+    """
+    Ghi file parquet (nén zstd) theo từng row group với schema cố định: các cột trong
+    NUMERIC_COLUMNS là int64 (giá '7900000 ' được lưu thành 7900000), các cột khác là chuỗi.
+    Giống CsvStreamWriter, dữ liệu được ghi ra file tạm rồi đổi tên khi commit.
+
+    :param file_path: Đường dẫn file parquet đích.
+    :param fieldnames: Danh sách tên cột.
+    :param row_group_size: Số dòng mỗi row group.
+    """
+
+    def __init__(self, file_path, fieldnames, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        if pq is None:
+            raise ValueError("Cần cài đặt pyarrow để ghi file parquet.")
+        self.file_path = file_path
+        self.temp_path = file_path + ".part"
+        self.fieldnames = list(fieldnames)
+        self.row_count = 0
+        self.size_bytes = 0
+        self.row_group_size = row_group_size
+        self.schema = pa.schema(
+            [
+                (name, pa.int64() if name in NUMERIC_COLUMNS else pa.string())
+                for name in self.fieldnames
+            ]
+        )
+        self._columns = {name: [] for name in self.fieldnames}
+        self._file = pq.ParquetWriter(self.temp_path, self.schema, compression="zstd")
+
+    def write_row(self, row):
+        for name in self.fieldnames:
+            value = row.get(name)
+            if name in NUMERIC_COLUMNS:
+                value = to_number(value)
+            elif value is not None:
+                value = str(value)
+            self._columns[name].append(value)
+        self.row_count += 1
+        if len(self._columns[self.fieldnames[0]]) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._columns[self.fieldnames[0]]:
+            self._file.write_table(pa.table(self._columns, schema=self.schema))
+            self._columns = {name: [] for name in self.fieldnames}
+
+    def commit(self):
+        self._flush()
+        return super().commit()
+
+    def _close(self):
+        if self._file.is_open:
+            self._file.close()
+
+
+def open_writer(file_path, fieldnames, output_format=DEFAULT_OUTPUT_FORMAT):
+    """
+    Tạo writer theo định dạng đầu ra.
+
+    :param file_path: Đường dẫn file đích (đã có phần mở rộng của định dạng).
+    :param fieldnames: Danh sách tên cột.
+    :param output_format: 'csv', 'csv.gz' hoặc 'parquet'.
+    :return: CsvStreamWriter hoặc ParquetStreamWriter.
+    """
+    if output_format == "parquet":
+        return ParquetStreamWriter(file_path, fieldnames)
+    return CsvStreamWriter(file_path, fieldnames, compress=output_format == "csv.gz")
+
+
+class HashingReader(RawIOBase):
+    """
+    Bọc một luồng bytes và tính SHA-1 của mọi byte đọc qua, để kiểm tra file ngay trong
+    lúc đọc mà không phải tải hoặc đọc lại file lần nữa.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha1 = hashlib.sha1()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        buffer[: len(data)] = data
+        self.sha1.update(data)
+        return len(data)
+
+    def hexdigest(self):
+        """
+        Đọc nốt phần còn lại của luồng (nếu có) rồi trả về SHA-1 (hex) của toàn bộ nội dung.
+        """
+        for chunk in iter(lambda: self.raw.read(1024 * 1024), b""):
+            self.sha1.update(chunk)
+        return self.sha1.hexdigest()
+
+
+def verify_rows(rows, hashing_reader, expected_sha1, file_name):
+    """
+    Trả lại các dòng của rows; khi đã đọc hết thì so SHA-1 của file với expected_sha1 và
+    báo lỗi nếu khác, để transaction đang nạp dữ liệu bị hủy trước khi commit.
+    """
+    yield from rows
+    actual = hashing_reader.hexdigest()
+    if actual != expected_sha1.strip().lower():
+        raise ValueError(f"SHA-1 của {file_name} là {actual}, khác với {expected_sha1} trong file log.")
+
+
+def open_reader(binary_file, file_name, batch_size=PARQUET_ROW_GROUP_SIZE, expected_sha1=None):
+    """
+    Đọc file đầu ra (định dạng theo phần mở rộng của file_name) từ một luồng bytes.
+    CSV và CSV nén được đọc dần theo luồng; parquet được giải mã theo từng lô cột.
+    Mọi định dạng đều trả về dòng là list chuỗi như csv.reader (giá trị NULL thành chuỗi rỗng).
+
+    :param binary_file: File hoặc luồng bytes (file mở chế độ 'rb', response.raw, ...).
+    :param file_name: Tên file, dùng để xác định định dạng.
+    :param expected_sha1: SHA-1 (hex) của file nếu cần kiểm tra; iterator báo ValueError
+        sau dòng cuối cùng nếu nội dung đọc được không khớp.
+    :return: (iterator các dòng, danh sách cột tiêu đề).
+    """
+    if expected_sha1:
+        hashing_reader = HashingReader(binary_file)
+        rows, headers = open_reader(BufferedReader(hashing_reader), file_name, batch_size)
+        return verify_rows(rows, hashing_reader, expected_sha1, file_name), headers
+
+    output_format = detect_format(file_name)
+    if output_format == "parquet":
+        if pq is None:
+            raise ValueError("Cần cài đặt pyarrow để đọc file parquet.")
+        # Parquet cần đọc footer ở cuối file nên luồng mạng phải được tải hết vào bộ nhớ
+        if not (hasattr(binary_file, "seekable") and binary_file.seekable()):
+            binary_file = BytesIO(binary_file.read())
+        parquet_file = pq.ParquetFile(binary_file)
+        headers = parquet_file.schema_arrow.names
+
+        def rows():
+            for batch in parquet_file.iter_batches(batch_size=batch_size):
+                columns = [
+                    ["" if value is None else str(value) for value in column.to_pylist()]
+                    for column in batch.columns
+                ]
+                yield from (list(row) for row in zip(*columns))
+
+        return rows(), headers
+
+    if output_format == "csv.gz":
+        binary_file = gzip.GzipFile(fileobj=binary_file, mode="rb")
+    reader = csv.reader(TextIOWrapper(binary_file, encoding="utf-8", newline=""))
+    return reader, next(reader, [])
+
+
+def count_rows(file_path):
+    """
+    Đếm số dòng dữ liệu (không tính tiêu đề) của file đầu ra.
+    """
+    if detect_format(file_path) == "parquet":
+        if pq is None:
+            raise ValueError("Cần cài đặt pyarrow để đọc file parquet.")
+        return pq.ParquetFile(file_path).metadata.num_rows
+    with open(file_path, mode="rb") as f:
+        reader, _ = open_reader(f, file_path)
+        return sum(1 for _ in reader)
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import http_client
+
+# Cấu hình mặc định cho cache trang (có thể ghi đè trong thẻ <cache> của config.xml)
+DEFAULT_CACHE_CONFIG = {
+    "enabled": True,
+    "directory": ".cache/pages",
+    "max_size_mb": 200,
+}
+
+
+class PageCache:
+    """
+    Cache response HTTP trên đĩa theo URL. Mỗi URL gồm một file .body chứa nội dung
+    và một file .json chứa ETag, Last-Modified, mã băm nội dung và kích thước.
+    Khi tổng dung lượng vượt max_bytes, các mục ít được dùng gần đây nhất bị xóa.
+
+    :param directory: Thư mục lưu cache.
+    :param max_bytes: Dung lượng tối đa của phần nội dung (byte).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> [thời điểm dùng gần nhất, kích thước]
+        self._index = {}
+        self._total_bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated_changed": 0,
+            "unchanged_200": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".body"):
+                stat = entry.stat()
+                self._index[entry.name[: -len(".body")]] = [stat.st_mtime, stat.st_size]
+                self._total_bytes += stat.st_size
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return key, base + ".json", base + ".body"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def lookup(self, url):
+        """
+        Đọc metadata và nội dung đã cache của URL.
+
+        :return: (metadata, nội dung) hoặc None nếu không có hoặc file bị hỏng.
+        """
+        _, meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # Bỏ qua mục cache nếu nội dung không khớp mã băm đã lưu
+        if hashlib.sha256(content).hexdigest() != meta.get("content_hash"):
+            return None
+        return meta, content
+
+    def touch(self, url):
+        key, _, body_path = self._paths(url)
+        now = time.time()
+        try:
+            os.utime(body_path, (now, now))
+        except OSError:
+            return
+        with self._lock:
+            if key in self._index:
+                self._index[key][0] = now
+
+    def store(self, url, response, content):
+        """
+        Lưu response (chỉ khi có ETag hoặc Last-Modified) và dọn cache nếu vượt dung lượng.
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        key, meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": hashlib.sha256(content).hexdigest(),
+            "size": len(content),
+        }
+        # Ghi ra file tạm rồi đổi tên để không bao giờ để lại file ghi dở
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(content)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+
+        with self._lock:
+            previous = self._index.get(key)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._index[key] = [time.time(), len(content)]
+            self._total_bytes += len(content)
+            self.stats["stores"] += 1
+        self.evict()
+
+    def evict(self):
+        """
+        Xóa các mục dùng lâu nhất cho tới khi tổng dung lượng không vượt max_bytes.
+        """
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            for key, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                base = os.path.join(self.directory, key)
+                for path in (base + ".body", base + ".json"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                del self._index[key]
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+
+    def fetch(self, url):
+        """
+        Tải URL qua http_client, gửi If-None-Match/If-Modified-Since nếu đã có cache.
+        Khi server trả 304 thì dùng nội dung đã lưu mà không tải lại.
+
+        :param url: Địa chỉ cần tải.
+        :return: Nội dung response (bytes).
+        :raises requests.HTTPError: Nếu server trả mã lỗi 4xx/5xx.
+        """
+        cached = self.lookup(url)
+        headers = {}
+        if cached:
+            meta, _ = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = http_client.get(url, headers=headers)
+        if cached and response.status_code == 304:
+            self._count("hits")
+            self.touch(url)
+            return cached[1]
+
+        # Trang lỗi (404, ...) không được cache và làm lượt cào thất bại
+        response.raise_for_status()
+        content = response.content
+        if response.status_code != 200:
+            self._count("misses")
+            return content
+
+        if not cached:
+            self._count("misses")
+        elif hashlib.sha256(content).hexdigest() == cached[0]["content_hash"]:
+            # Server không hỗ trợ 304 nhưng nội dung không đổi
+            self._count("unchanged_200")
+        else:
+            self._count("revalidated_changed")
+        self.store(url, response, content)
+        return content
+
+    def print_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            total_mb = self._total_bytes / (1024 * 1024)
+        lookups = stats["hits"] + stats["misses"] + stats["revalidated_changed"] + stats["unchanged_200"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+        print(
+            f"Cache: {stats['hits']} hit (304), {stats['misses']} miss, "
+            f"{stats['revalidated_changed']} thay đổi, {stats['unchanged_200']} không đổi (200), "
+            f"tỉ lệ hit {hit_rate:.1f}%, {stats['evictions']} mục bị xóa, dung lượng {total_mb:.2f} MB"
+        )
+
+
+def load_cache_config(config_path):
+    """
+    Hàm đọc thẻ <cache> trong file config.xml. Các giá trị thiếu sẽ dùng mặc định.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary gồm enabled, directory, max_size_mb.
+    """
+    root = ET.parse(config_path).getroot()
+    cache = root.find("./cache")
+    config = dict(DEFAULT_CACHE_CONFIG)
+    if cache is None:
+        return config
+
+    for key in config:
+        node = cache.find(key)
+        if node is None or not node.text:
+            continue
+        value = node.text.strip()
+        if key == "enabled":
+            config[key] = value.lower() in ("1", "true", "yes")
+        elif key == "max_size_mb":
+            config[key] = int(value)
+        else:
+            config[key] = value
+    return config
+
+
+def open_cache(config_path):
+    """
+    Tạo PageCache theo config.xml.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: PageCache hoặc None nếu cache bị tắt.
+    """
+    config = load_cache_config(config_path)
+    if not config["enabled"]:
+        return None
+    return PageCache(config["directory"], config["max_size_mb"] * 1024 * 1024)
@@ -0,0 +1,287 @@
+import sys
+import os
+import re
+from datetime import date, datetime
+import xml.etree.ElementTree as ET
+import psycopg2
+import psycopg2.errors
+
+# Cấu hình mặc định (có thể ghi đè trong thẻ <partitions> của config.xml)
+DEFAULT_PARTITION_CONFIG = {
+    "months_ahead": 2,
+    "staging_retention_months": 0,
+    "dw_retention_months": 0,
+    "retention_action": "detach",
+}
+# Phân vùng theo tháng được đặt tên <bảng>_pYYYYMM
+PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def load_database_config(db_name, config_path):
+    """
+    Hàm đọc file config.xml và lấy thông tin kết nối cho database có tên cụ thể.
+
+    :param db_name: Tên cơ sở dữ liệu cần kết nối.
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary chứa thông tin kết nối.
+    """
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"File config tại '{config_path}' không tồn tại.")
+
+    # Parse file XML
+    tree = ET.parse(config_path)
+    root = tree.getroot()
+
+    # Tìm thông tin database theo tên
+    for db in root.findall(".//database"):
+        if db.get("name") == db_name:
+            return {
+                "hostname": db.find("hostname").text,
+                "port": db.find("port").text,
+                "database": db.find("database").text,
+                "username": db.find("username").text,
+                "password": db.find("password").text,
+            }
+
+    raise ValueError(f"Không tìm thấy database với tên '{db_name}' trong file config.")
+
+
+def connect_to_database(db_config):
+    """
+    Hàm kết nối tới cơ sở dữ liệu PostgreSQL dựa trên thông tin cấu hình.
+
+    :param db_config: Dictionary chứa thông tin kết nối.
+    :return: Kết nối PostgreSQL (psycopg2 connection object).
+    """
+
+    conn = psycopg2.connect(
+        host=db_config["hostname"],
+        port=db_config["port"],
+        database=db_config["database"],
+        user=db_config["username"],
+        password=db_config["password"],
+    )
+    print("Kết nối cơ sở dữ liệu thành công.")
+    return conn
+
+
+def load_partition_config(config_path):
+    """
+    Hàm đọc thẻ <partitions> trong file config.xml. Các giá trị thiếu sẽ dùng mặc định.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary gồm months_ahead, staging_retention_months, dw_retention_months, retention_action.
+    """
+    root = ET.parse(config_path).getroot()
+    partitions = root.find("./partitions")
+    config = dict(DEFAULT_PARTITION_CONFIG)
+    if partitions is None:
+        return config
+
+    for key, default in DEFAULT_PARTITION_CONFIG.items():
+        node = partitions.find(key)
+        if node is None or not node.text:
+            continue
+        value = node.text.strip()
+        config[key] = int(value) if isinstance(default, int) else value
+
+    if config["retention_action"] not in ("detach", "drop"):
+        raise ValueError("retention_action phải là 'detach' hoặc 'drop'.")
+    return config
+
+
+def to_date(value):
+    """
+    Chuyển chuỗi 'YYYY-MM-DD', datetime hoặc date thành date.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def add_months(month_start, months):
+    """
+    Cộng (hoặc trừ) số tháng vào ngày đầu tháng.
+    """
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table_name, month_start):
+    return f"{table_name}_p{month_start:%Y%m}"
+
+
+def is_partitioned(conn, table_name):
+    """
+    Kiểm tra bảng đã được chuyển sang phân vùng (migration 004/005) hay chưa.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+            (table_name,),
+        )
+        row = cur.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def ensure_partition(conn, table_name, day):
+    """
+    Tạo phân vùng tháng chứa ngày `day` nếu chưa có. Nếu khoảng ngày đã nằm trong
+    phân vùng khác (ví dụ phân vùng _legacy) thì bỏ qua. Hàm không commit.
+
+    :param conn: Kết nối PostgreSQL.
+    :param table_name: Bảng cha đã phân vùng (bảng chưa phân vùng được bỏ qua).
+    :param day: Ngày cần có phân vùng (chuỗi 'YYYY-MM-DD', date hoặc datetime).
+    :return: Tên phân vùng hoặc None nếu không cần tạo.
+    """
+    if not is_partitioned(conn, table_name):
+        return None
+
+    month_start = to_date(day).replace(day=1)
+    name = partition_name(table_name, month_start)
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT ensure_partition")
+        try:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                (month_start, add_months(month_start, 1)),
+            )
+        except psycopg2.errors.InvalidObjectDefinition:
+            # Khoảng ngày chồng lên một phân vùng đã có
+            cur.execute("ROLLBACK TO SAVEPOINT ensure_partition")
+            return None
+        cur.execute("RELEASE SAVEPOINT ensure_partition")
+    return name
+
+
+def ensure_future_partitions(conn, table_name, months_ahead, today):
+    """
+    Tạo phân vùng cho tháng hiện tại và `months_ahead` tháng tiếp theo.
+
+    :return: Danh sách phân vùng đã có hoặc vừa tạo.
+    """
+    month_start = to_date(today).replace(day=1)
+    names = []
+    for offset in range(months_ahead + 1):
+        name = ensure_partition(conn, table_name, add_months(month_start, offset))
+        if name:
+            names.append(name)
+    conn.commit()
+    return names
+
+
+def list_monthly_partitions(conn, table_name):
+    """
+    Liệt kê các phân vùng tháng (<bảng>_pYYYYMM) của bảng, kèm ngày đầu tháng.
+    Phân vùng _legacy không nằm trong danh sách nên không bao giờ bị gỡ tự động.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            (table_name,),
+        )
+        names = [row[0] for row in cur.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match and name == partition_name(table_name, date(int(match[1]), int(match[2]), 1)):
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return partitions
+
+
+def apply_retention(conn, table_name, retention_months, action, today, keep_current=False):
+    """
+    Gỡ (detach) hoặc xóa (drop) các phân vùng tháng cũ hơn `retention_months` tháng.
+
+    :param retention_months: Số tháng giữ lại, 0 là giữ tất cả.
+    :param action: 'detach' (giữ lại thành bảng độc lập để lưu trữ) hoặc 'drop'.
+    :param keep_current: True với dw: bỏ qua phân vùng còn bản ghi hiện hành
+        (dt_last_update = '9999-12-31'), vì phiên bản hiện hành của sản phẩm không đổi
+        vẫn nằm ở tháng được cào lần đầu.
+    :return: Danh sách phân vùng đã gỡ.
+    """
+    if retention_months <= 0 or not is_partitioned(conn, table_name):
+        return []
+
+    cutoff = add_months(to_date(today).replace(day=1), -retention_months)
+    retired = []
+    with conn.cursor() as cur:
+        for name, month_start in list_monthly_partitions(conn, table_name):
+            if month_start >= cutoff:
+                continue
+            if keep_current:
+                cur.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {name} WHERE dt_last_update = '9999-12-31')"
+                )
+                if cur.fetchone()[0]:
+                    print(f"Giữ lại {name}: vẫn còn bản ghi hiện hành.")
+                    continue
+
+            cur.execute(f"ALTER TABLE {table_name} DETACH PARTITION {name}")
+            if action == "drop":
+                cur.execute(f"DROP TABLE {name}")
+            conn.commit()
+            print(f"Đã {'xóa' if action == 'drop' else 'gỡ'} phân vùng {name}.")
+            retired.append(name)
+    return retired
+
+
+def fetch_staging_tables(conn):
+    """
+    Lấy danh sách các bảng staging đang được khai báo trong file_config.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT destination_table_staging
+            FROM file_config
+            WHERE destination_table_staging IS NOT NULL
+            ORDER BY destination_table_staging
+            """
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Vui lòng nhập tham số path_config.")
+        print("Cú pháp: python partition_manager.py <path_config> [date]")
+        sys.exit(1)
+
+    path_config = sys.argv[1]
+    try:
+        today = to_date(sys.argv[2]) if len(sys.argv) > 2 else date.today()
+    except ValueError:
+        print("Lỗi: Ngày không đúng định dạng YYYY-MM-DD.")
+        sys.exit(1)
+
+    config = load_partition_config(path_config)
+    conn = connect_to_database(load_database_config("dw", path_config))
+    try:
+        tables = [(table, config["staging_retention_months"], False) for table in fetch_staging_tables(conn)]
+        tables.append(("dw", config["dw_retention_months"], True))
+        for table, retention_months, keep_current in tables:
+            if not is_partitioned(conn, table):
+                print(f"Bảng {table} chưa được phân vùng, hãy chạy migrate.py trước.")
+                continue
+            created = ensure_future_partitions(conn, table, config["months_ahead"], today)
+            print(f"{table}: các phân vùng tới {config['months_ahead']} tháng sau: {', '.join(created) or 'không có'}")
+            apply_retention(
+                conn, table, retention_months, config["retention_action"], today, keep_current
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
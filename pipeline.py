@@ -0,0 +1,187 @@
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+import b2_client as b2_client_module
+import http_client
+import extract_file
+import load_to_staging
+import load_to_dw
+import page_cache as page_cache_module
+
+# Các bước của pipeline theo thứ tự chạy
+STAGES = ("extract", "staging", "dw")
+
+
+def parse_dates(value):
+    """
+    Chuyển tham số ngày thành danh sách ngày 'YYYY-MM-DD'.
+
+    :param value: Một ngày 'YYYY-MM-DD' hoặc khoảng 'YYYY-MM-DD:YYYY-MM-DD' (gồm cả hai đầu).
+    :return: Danh sách chuỗi ngày theo thứ tự tăng dần.
+    """
+    start_text, _, end_text = value.partition(":")
+    start = datetime.strptime(start_text, "%Y-%m-%d").date()
+    end = datetime.strptime(end_text, "%Y-%m-%d").date() if end_text else start
+    if end < start:
+        raise ValueError("Ngày kết thúc phải không nhỏ hơn ngày bắt đầu.")
+    return [
+        (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+        for offset in range((end - start).days + 1)
+    ]
+
+
+def parse_stages(value):
+    stages = [stage.strip() for stage in value.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Bước không hợp lệ: {', '.join(unknown)}. Các bước: {', '.join(STAGES)}.")
+    # Luôn chạy theo thứ tự extract -> staging -> dw
+    return [stage for stage in STAGES if stage in stages]
+
+
+def run_pipeline(
+    conn,
+    path_config,
+    id_configs,
+    dates,
+    stages=STAGES,
+    b2_client=None,
+    stage_guard=None,
+    host_limiter=None,
+    page_cache=None,
+):
+    """
+    Chạy các bước extract -> staging -> dw cho từng ngày và từng id_config trong cùng
+    một tiến trình, dùng chung một kết nối PostgreSQL và một client B2. Nếu một bước
+    không thành công thì các bước sau của cặp (id_config, ngày) đó bị bỏ qua.
+
+    :param conn: Kết nối PostgreSQL dùng chung.
+    :param path_config: Đường dẫn file config.xml.
+    :param id_configs: Danh sách id_config.
+    :param dates: Danh sách ngày 'YYYY-MM-DD'.
+    :param stages: Các bước cần chạy.
+    :param b2_client: B2Client dùng chung (mặc định client chung của tiến trình).
+    :param stage_guard: Hàm (id_config, stage) trả về context manager bao quanh mỗi bước
+        (ví dụ giữ khóa của bảng đích), mặc định không có.
+    :param host_limiter: extract_file.HostLimiter dùng chung cho bước extract, để giới hạn
+        request đồng thời tới một host tính trên mọi id_config (mặc định mỗi lượt cào một limiter).
+    :param page_cache: page_cache.PageCache dùng chung cho bước extract (mặc định mỗi lượt cào
+        mở cache theo config.xml).
+    :return: Danh sách kết quả {id_config, date, stage, ok, seconds}.
+    """
+    runners = {
+        "extract": lambda id_config, day: extract_file.run_extract(
+            conn, id_config, path_config, day, b2_client, host_limiter, page_cache
+        ),
+        "staging": lambda id_config, day: load_to_staging.run_load_to_staging(
+            conn, id_config, path_config, day, b2_client
+        ),
+        "dw": lambda id_config, day: load_to_dw.run_load_to_dw(conn, id_config, path_config, day),
+    }
+    results = []
+    for day in dates:
+        for id_config in id_configs:
+            for stage in stages:
+                print(f"=== {stage} | ID Config: {id_config} | Date: {day} ===")
+                started = time.perf_counter()
+                try:
+                    with stage_guard(id_config, stage) if stage_guard else nullcontext():
+                        ok = bool(runners[stage](id_config, day))
+                except Exception as e:
+                    print(f"Lỗi ở bước {stage}: {e}")
+                    conn.rollback()
+                    ok = False
+                results.append(
+                    {
+                        "id_config": id_config,
+                        "date": day,
+                        "stage": stage,
+                        "ok": ok,
+                        "seconds": time.perf_counter() - started,
+                    }
+                )
+                if not ok:
+                    print(f"Bước {stage} không thành công, bỏ qua các bước sau cho ID Config {id_config} ngày {day}.")
+                    break
+    return results
+
+
+def print_timings(results):
+    """
+    In thời gian và kết quả của từng bước, kèm tổng thời gian theo bước.
+    """
+    print(f"{'id_config':>9}  {'date':<10}  {'stage':<8}  {'result':<6}  {'seconds':>8}")
+    totals = {}
+    for result in results:
+        print(
+            f"{result['id_config']:>9}  {result['date']:<10}  {result['stage']:<8}  "
+            f"{'OK' if result['ok'] else 'FAIL':<6}  {result['seconds']:>8.2f}"
+        )
+        totals[result["stage"]] = totals.get(result["stage"], 0.0) + result["seconds"]
+    for stage, seconds in totals.items():
+        print(f"Tổng {stage}: {seconds:.2f}s")
+    print(f"Tổng cộng: {sum(totals.values()):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Chạy extract -> staging -> dw trong một tiến trình cho một hoặc nhiều id_config và ngày."
+    )
+    parser.add_argument("id_configs", help="Một hoặc nhiều id_config, cách nhau bởi dấu phẩy (ví dụ 1,2)")
+    parser.add_argument("path_config", help="Đường dẫn file config.xml")
+    parser.add_argument(
+        "date",
+        nargs="?",
+        default=datetime.today().strftime("%Y-%m-%d"),
+        help="Ngày YYYY-MM-DD hoặc khoảng YYYY-MM-DD:YYYY-MM-DD (mặc định hôm nay)",
+    )
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"Các bước cần chạy, cách nhau bởi dấu phẩy (mặc định {','.join(STAGES)})",
+    )
+    args = parser.parse_args()
+
+    try:
+        dates = parse_dates(args.date)
+        stages = parse_stages(args.stages)
+    except ValueError as e:
+        print(f"Lỗi: {e}")
+        sys.exit(1)
+    id_configs = [value.strip() for value in args.id_configs.split(",") if value.strip()]
+
+    print(f"ID Config: {', '.join(id_configs)}")
+    print(f"Path Config: {args.path_config}")
+    print(f"Date: {dates[0]}" + (f" -> {dates[-1]}" if len(dates) > 1 else ""))
+
+    # Đọc config và mở kết nối, client B2 một lần cho toàn bộ pipeline
+    started = time.perf_counter()
+    http_client.configure_from_file(args.path_config)
+    db_config = load_to_dw.load_database_config("dw", args.path_config)
+    try:
+        conn = load_to_dw.connect_to_database(db_config)
+    except Exception as e:
+        load_to_dw.send_email(
+            load_to_dw.EMAIL, f"LỖI KẾT NỐI CƠ SỞ DỮ LIỆU DW NGÀY {dates[0]}", f"Lỗi phát hiện: {e}"
+        )
+        sys.exit(1)
+
+    b2_client = b2_client_module.get_client(args.path_config)
+    page_cache = page_cache_module.open_cache(args.path_config)
+    print(f"Khởi tạo kết nối: {time.perf_counter() - started:.2f}s")
+
+    try:
+        results = run_pipeline(
+            conn, args.path_config, id_configs, dates, stages, b2_client, page_cache=page_cache
+        )
+    finally:
+        conn.close()
+    print_timings(results)
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # lxml là tùy chọn
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # selectolax là tùy chọn, bản cũ chỉ có backend modest
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+DEFAULT_BACKEND = "lxml"
+
+# Các selector dùng chung cho mọi backend, mỗi selector chỉ được duyệt một lần
+SELECTORS = {
+    "product_name": "h1",
+    "price": "h4.ps-product__price",
+    "brand": 'a[href*="brands"]',
+    "description": "div.ps-product__desc",
+    "quantity": "div.number-items-available",
+}
+PRODUCT_LINK_SELECTOR = "a.ps-product__title"
+# Link phân trang: mọi thẻ <a> có tham số số trang trong href
+PAGINATION_LINK_SELECTOR = "a[href*='=']"
+
+# Các thuộc tính lấy từ phần mô tả sản phẩm: giá trị nằm sau "<label>:" cho tới
+# dấu "•" hoặc đoạn "Thông tin" kế tiếp. Có thể thêm thuộc tính qua config.xml.
+DESCRIPTION_FIELDS = [
+    {"name": "sku", "label": "Mã sản phẩm", "transform": "strip"},
+    {"name": "material", "label": "Chất liệu", "transform": "strip"},
+    {"name": "shape", "label": "Hình dạng", "transform": "strip"},
+    {"name": "dimension", "label": "Thông số", "transform": "strip"},
+    # Xuất xứ chỉ lấy tên quốc gia (từ đầu tiên)
+    {"name": "origin", "label": "Xuất xứ", "transform": "first_word"},
+]
+
+DESCRIPTION_TERMINATORS = ("•", "Thông tin")
+
+DESCRIPTION_TRANSFORMS = {
+    "strip": lambda value: value.strip(),
+    "first_word": lambda value: value.split()[0] if value.split() else None,
+}
+
+
+def _to_text(content):
+    if isinstance(content, bytes):
+        return content.decode("utf-8", errors="replace")
+    return content
+
+
+# ---- html.parser (BeautifulSoup, chỉ dùng thư viện chuẩn) ----
+def _bs4_links(content):
+    soup = BeautifulSoup(content, "html.parser")
+    return (
+        [a.get("href") for a in soup.select(PRODUCT_LINK_SELECTOR)],
+        [a.get("href") for a in soup.select(PAGINATION_LINK_SELECTOR)],
+    )
+
+
+def _bs4_page(content):
+    soup = BeautifulSoup(content, "html.parser")
+    result = {}
+    for field, selector in SELECTORS.items():
+        node = soup.select_one(selector)
+        result[field] = node.text if node is not None else None
+    return result
+
+
+# ---- lxml ----
+def _lxml_links(content):
+    tree = lxml.html.document_fromstring(_to_text(content))
+    return (
+        [a.get("href") for a in tree.cssselect(PRODUCT_LINK_SELECTOR)],
+        [a.get("href") for a in tree.cssselect(PAGINATION_LINK_SELECTOR)],
+    )
+
+
+def _lxml_page(content):
+    tree = lxml.html.document_fromstring(_to_text(content))
+    result = {}
+    for field, selector in SELECTORS.items():
+        nodes = tree.cssselect(selector)
+        result[field] = nodes[0].text_content() if nodes else None
+    return result
+
+
+# ---- selectolax ----
+def _selectolax_links(content):
+    tree = HTMLParser(_to_text(content))
+    return (
+        [a.attributes.get("href") for a in tree.css(PRODUCT_LINK_SELECTOR)],
+        [a.attributes.get("href") for a in tree.css(PAGINATION_LINK_SELECTOR)],
+    )
+
+
+def _selectolax_page(content):
+    tree = HTMLParser(_to_text(content))
+    result = {}
+    for field, selector in SELECTORS.items():
+        node = tree.css_first(selector)
+        result[field] = node.text() if node is not None else None
+    return result
+
+
+BACKENDS = {
+    "html.parser": (_bs4_links, _bs4_page),
+    "lxml": (_lxml_links, _lxml_page),
+    "selectolax": (_selectolax_links, _selectolax_page),
+}
+
+
+def available_backends():
+    """
+    Trả về danh sách backend có thể dùng với các thư viện đang được cài đặt.
+    """
+    backends = ["html.parser"]
+    if lxml is not None:
+        try:
+            import cssselect  # noqa: F401  (lxml cần cssselect để dùng CSS selector)
+            backends.append("lxml")
+        except ImportError:
+            pass
+    if HTMLParser is not None:
+        backends.append("selectolax")
+    return backends
+
+
+def resolve_backend(name):
+    """
+    Kiểm tra backend được yêu cầu, nếu thư viện chưa được cài thì quay về html.parser.
+
+    :param name: Tên backend ('html.parser', 'lxml', 'selectolax').
+    :return: Tên backend sẽ được sử dụng.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend HTML không hợp lệ: '{name}'.")
+    if name not in available_backends():
+        print(f"Backend '{name}' chưa được cài đặt, sử dụng 'html.parser'.")
+        return "html.parser"
+    return name
+
+
+def parse_product_links(content, backend=DEFAULT_BACKEND):
+    """
+    Lấy danh sách link sản phẩm từ nội dung HTML của trang danh mục.
+
+    :param content: Nội dung HTML (bytes hoặc str).
+    :param backend: Tên backend parser.
+    :return: Danh sách href (bỏ qua link rỗng).
+    """
+    return parse_listing_page(content, backend)["product_links"]
+
+
+def parse_listing_page(content, backend=DEFAULT_BACKEND, page_param="pages"):
+    """
+    Phân tích trang danh mục: lấy link sản phẩm và số trang lớn nhất trong phần phân trang.
+
+    :param content: Nội dung HTML (bytes hoặc str).
+    :param backend: Tên backend parser.
+    :param page_param: Tên tham số số trang trong URL (ví dụ 'pages').
+    :return: Dictionary gồm product_links (bỏ qua link rỗng) và last_page
+             (None nếu trang không có phần phân trang).
+    """
+    links, _ = BACKENDS[backend]
+    product_links, pagination_links = links(content)
+    page_pattern = re.compile(r"[?&]%s=(\d+)" % re.escape(page_param))
+    page_numbers = [
+        int(match.group(1))
+        for match in (page_pattern.search(href) for href in pagination_links if href)
+        if match
+    ]
+    return {
+        "product_links": [href for href in product_links if href],
+        "last_page": max(page_numbers) if page_numbers else None,
+    }
+
+
+def parse_product_page(content, backend=DEFAULT_BACKEND):
+    """
+    Trích xuất text thô của các phần tử cần thiết trong trang chi tiết sản phẩm.
+
+    :param content: Nội dung HTML (bytes hoặc str).
+    :param backend: Tên backend parser.
+    :return: Dictionary gồm product_name, price, brand, description, quantity
+             (None nếu không tìm thấy phần tử).
+    """
+    _, page = BACKENDS[backend]
+    return page(content)
+
+
+def compile_description_spec(fields=DESCRIPTION_FIELDS):
+    """
+    Biên dịch danh sách thuộc tính thành một biểu thức chính quy duy nhất.
+
+    :param fields: Danh sách dictionary gồm name, label, transform.
+    :return: Dictionary gồm pattern đã biên dịch và ánh xạ label -> thuộc tính.
+    """
+    for field in fields:
+        if field["transform"] not in DESCRIPTION_TRANSFORMS:
+            raise ValueError(f"Transform không hợp lệ: '{field['transform']}'.")
+
+    # Label dài hơn được thử trước để tránh khớp nhầm label là tiền tố của label khác
+    labels = sorted((field["label"] for field in fields), key=len, reverse=True)
+    pattern = re.compile("(%s):" % "|".join(re.escape(label) for label in labels))
+    return {
+        "pattern": pattern,
+        "fields": {field["label"]: field for field in fields},
+    }
+
+
+DEFAULT_DESCRIPTION_SPEC = compile_description_spec()
+
+
+def extract_description_fields(text, spec=DEFAULT_DESCRIPTION_SPEC):
+    """
+    Lấy toàn bộ thuộc tính trong phần mô tả sản phẩm bằng một lần quét.
+
+    :param text: Nội dung text của phần mô tả.
+    :param spec: Kết quả của compile_description_spec.
+    :return: Dictionary {tên thuộc tính: giá trị hoặc None} theo thứ tự khai báo.
+    """
+    result = {field["name"]: None for field in spec["fields"].values()}
+    found = set()
+    for match in spec["pattern"].finditer(text):
+        field = spec["fields"][match.group(1)]
+        # Chỉ lấy lần xuất hiện đầu tiên của mỗi label
+        if field["name"] in found:
+            continue
+        found.add(field["name"])
+        # Giá trị kết thúc ở dấu "•" hoặc đoạn "Thông tin" gần nhất phía sau
+        end = len(text)
+        for terminator in DESCRIPTION_TERMINATORS:
+            position = text.find(terminator, match.end(), end)
+            if position != -1:
+                end = position
+        result[field["name"]] = DESCRIPTION_TRANSFORMS[field["transform"]](
+            text[match.end():end]
+        )
+    return result
+
+
+def benchmark(pages, repeat=20):
+    """
+    Đo thời gian parse trung bình mỗi trang của từng backend đang có.
+
+    :param pages: Danh sách nội dung HTML (bytes).
+    :param repeat: Số lần lặp lại cho mỗi trang.
+    :return: Dictionary {backend: mili giây mỗi trang}.
+    """
+    results = {}
+    for backend in available_backends():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for content in pages:
+                parse_product_page(content, backend)
+        elapsed = time.perf_counter() - started
+        results[backend] = elapsed * 1000 / (repeat * len(pages))
+    return results
+
+
+if __name__ == "__main__":
+    # Cú pháp: python product_parser.py <trang1.html> [trang2.html ...]
+    if len(sys.argv) < 2:
+        print("Cú pháp: python product_parser.py <file_html> [file_html ...]")
+        sys.exit(1)
+
+    saved_pages = []
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            saved_pages.append(f.read())
+
+    for backend, ms in benchmark(saved_pages).items():
+        print(f"{backend:12s} {ms:8.3f} ms/trang")
@@ -0,0 +1,65 @@
+import hashlib
+import xml.etree.ElementTree as ET
+from decimal import Decimal, InvalidOperation
+
+# Các cột thuộc tính được theo dõi thay đổi (SCD type 2), có thể ghi đè trong
+# thẻ <dw><tracked_columns> của config.xml
+DEFAULT_TRACKED_COLUMNS = [
+    "sku",
+    "product_name",
+    "price",
+    "brand",
+    "material",
+    "shape",
+    "dimension",
+    "origin",
+    "quantity_available",
+    "product_url",
+]
+
+
+def load_tracked_columns(config_path):
+    """
+    Hàm đọc danh sách cột được theo dõi trong thẻ <dw><tracked_columns> của config.xml.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Danh sách tên cột.
+    """
+    root = ET.parse(config_path).getroot()
+    columns = root.findall("./dw/tracked_columns/column")
+    if not columns:
+        return list(DEFAULT_TRACKED_COLUMNS)
+    return [column.text.strip() for column in columns]
+
+
+def canonical_value(value):
+    """
+    Mã hóa một giá trị thành chuỗi chuẩn để tính hash:
+    - None được mã hóa riêng ('-') nên không trùng với chuỗi rỗng hay 'N/A'.
+    - Số (int, Decimal, float) được chuẩn hóa: 7900000, Decimal('7900000.00') -> '7900000'.
+    - Chuỗi được bỏ khoảng trắng hai đầu (giá '7900000 ' trong CSV -> '7900000'). Staging cũng
+      lưu giá trị đã bỏ khoảng trắng (load_to_staging.extend_rows), nên giá trị được hash
+      và giá trị được lưu luôn giống nhau; ở đây chỉ còn tác dụng với bản ghi dw cũ.
+    Mỗi giá trị có tiền tố độ dài nên dấu phân cách trong dữ liệu không gây nhập nhằng.
+    """
+    if value is None:
+        return "-"
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        try:
+            text = format(Decimal(str(value)).normalize(), "f")
+        except InvalidOperation:
+            text = str(value)
+    else:
+        text = str(value).strip()
+    return f"{len(text)}:{text}"
+
+
+def compute_row_hash(values):
+    """
+    Tính hash MD5 (32 ký tự hex) của các giá trị theo đúng thứ tự cột được theo dõi.
+
+    :param values: Iterable giá trị của các cột được theo dõi.
+    :return: Chuỗi hex 32 ký tự.
+    """
+    encoded = "|".join(canonical_value(value) for value in values)
+    return hashlib.md5(encoded.encode("utf-8")).hexdigest()
@@ -25,11 +25,10 @@ if "%date_param%"=="" (
     for /f %%i in ('powershell -command "Get-Date -Format yyyy-MM-dd"') do set date_param=%%i
 )
 
-python extract_file.py %id_config% %config_path% %date_param%
+python partition_manager.py %config_path% %date_param%
 
-python load_to_staging.py %id_config% %config_path% %date_param%
-
-python load_to_dw.py %id_config% %config_path% %date_param%
+:: Chạy extract -> staging -> dw trong một tiến trình (id_config có thể là danh sách, ví dụ 1,2)
+python pipeline.py %id_config% %config_path% %date_param%
 
 echo Hoàn tất!
 pause
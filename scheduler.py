@@ -0,0 +1,268 @@
+import argparse
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+import xml.etree.ElementTree as ET
+import psycopg2
+from psycopg2 import extras
+import b2_client as b2_client_module
+import extract_file
+import http_client
+import load_to_dw
+import page_cache as page_cache_module
+import pipeline
+
+# Cấu hình mặc định (có thể ghi đè trong thẻ <scheduler> của config.xml)
+DEFAULT_SCHEDULER_CONFIG = {
+    "max_workers": 4,
+    # Số id_config cùng một nguồn (file_config.source) được cào cùng lúc
+    "per_source_limit": 1,
+}
+# Không gian khóa advisory của scheduler: (namespace, key) với key là id_config hoặc hash tên bảng
+CONFIG_LOCK_NAMESPACE = 7101
+TABLE_LOCK_NAMESPACE = 7102
+# Khóa của bước dw theo bảng staging nguồn: merge của các bảng staging khác nhau chạy song song
+DW_LOCK_NAMESPACE = 7103
+
+
+def load_scheduler_config(config_path):
+    """
+    Hàm đọc thẻ <scheduler> trong file config.xml. Các giá trị thiếu sẽ dùng mặc định.
+
+    :param config_path: Đường dẫn file config.xml.
+    :return: Dictionary gồm max_workers, per_source_limit.
+    """
+    root = ET.parse(config_path).getroot()
+    scheduler = root.find("./scheduler")
+    config = dict(DEFAULT_SCHEDULER_CONFIG)
+    if scheduler is None:
+        return config
+
+    for key in config:
+        node = scheduler.find(key)
+        if node is not None and node.text:
+            config[key] = max(1, int(node.text.strip()))
+    return config
+
+
+def fetch_active_configs(conn):
+    """
+    Lấy các dòng file_config đang hoạt động.
+
+    :param conn: Kết nối PostgreSQL.
+    :return: Danh sách dictionary gồm id, source, destination_table_staging.
+    """
+    with conn.cursor(cursor_factory=extras.DictCursor) as cur:
+        cur.execute(
+            """
+            SELECT id, source, destination_table_staging
+            FROM file_config
+            WHERE is_active
+            ORDER BY id
+            """
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+
+def table_lock_key(table_name):
+    # Khóa advisory nhận số nguyên 32 bit có dấu
+    return zlib.crc32(table_name.encode("utf-8")) - (1 << 31)
+
+
+@contextmanager
+def advisory_lock(conn, namespace, key):
+    """
+    Giữ khóa advisory mức phiên (chờ nếu phiên khác đang giữ) trong khối with.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s, %s)", (namespace, key))
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s, %s)", (namespace, key))
+        conn.commit()
+
+
+def try_config_lock(conn, id_config):
+    """
+    Giữ khóa của id_config để hai tiến trình (hai scheduler, hoặc scheduler và pipeline
+    chạy tay qua scheduler) không cùng xử lý một id_config và làm sai trạng thái file_logs.
+
+    :return: True nếu lấy được khóa.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (CONFIG_LOCK_NAMESPACE, int(id_config)))
+        locked = cur.fetchone()[0]
+    conn.commit()
+    return locked
+
+
+def run_config(
+    path_config,
+    db_config,
+    file_config,
+    date,
+    stages,
+    b2_client,
+    source_limits,
+    host_limiter=None,
+    page_cache=None,
+):
+    """
+    Chạy pipeline của một id_config trên kết nối riêng của worker:
+    - Bước extract giữ semaphore của nguồn (lịch sự với website) và dùng host_limiter chung
+      của lượt chạy, nên per_host_limit là giới hạn cho cả tiến trình chứ không cho từng id_config.
+      page_cache cũng dùng chung giữa các id_config.
+    - Bước staging giữ khóa của bảng staging. Bước dw giữ khóa dw của bảng staging đó, nên
+      chỉ các id_config nạp cùng một bảng staging mới merge vào dw lần lượt.
+
+    :return: Danh sách kết quả của pipeline.run_pipeline (rỗng nếu id_config đang được xử lý ở nơi khác).
+    """
+    id_config = str(file_config["id"])
+    conn = load_to_dw.connect_to_database(db_config)
+    try:
+        if not try_config_lock(conn, id_config):
+            print(f"ID Config {id_config} đang được xử lý ở tiến trình khác, bỏ qua.")
+            return []
+
+        @contextmanager
+        def stage_guard(_, stage):
+            if stage == "extract":
+                with source_limits[file_config["source"]]:
+                    yield
+            else:
+                namespace = TABLE_LOCK_NAMESPACE if stage == "staging" else DW_LOCK_NAMESPACE
+                key = table_lock_key(file_config["destination_table_staging"])
+                with advisory_lock(conn, namespace, key):
+                    yield
+
+        return pipeline.run_pipeline(
+            conn,
+            path_config,
+            [id_config],
+            [date],
+            stages,
+            b2_client,
+            stage_guard,
+            host_limiter,
+            page_cache,
+        )
+    finally:
+        conn.close()
+
+
+def print_summary(results, skipped, elapsed):
+    """
+    In tóm tắt lượt chạy: kết quả từng bước và id_config thành công/thất bại.
+    """
+    print("===== TÓM TẮT LƯỢT CHẠY =====")
+    pipeline.print_timings(results)
+    by_config = {}
+    for result in results:
+        by_config.setdefault(result["id_config"], []).append(result["ok"])
+    succeeded = [id_config for id_config, oks in by_config.items() if all(oks)]
+    failed = [id_config for id_config, oks in by_config.items() if not all(oks)]
+    print(f"Thành công: {', '.join(succeeded) or 'không có'}")
+    print(f"Thất bại: {', '.join(failed) or 'không có'}")
+    if skipped:
+        print(f"Bỏ qua (đang chạy ở nơi khác): {', '.join(skipped)}")
+    print(f"Thời gian thực tế: {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Chạy song song pipeline của mọi file_config đang hoạt động."
+    )
+    parser.add_argument("path_config", help="Đường dẫn file config.xml")
+    parser.add_argument(
+        "date",
+        nargs="?",
+        default=datetime.today().strftime("%Y-%m-%d"),
+        help="Ngày YYYY-MM-DD (mặc định hôm nay)",
+    )
+    parser.add_argument(
+        "--stages",
+        default=",".join(pipeline.STAGES),
+        help=f"Các bước cần chạy, cách nhau bởi dấu phẩy (mặc định {','.join(pipeline.STAGES)})",
+    )
+    args = parser.parse_args()
+    try:
+        datetime.strptime(args.date, "%Y-%m-%d")
+        stages = pipeline.parse_stages(args.stages)
+    except ValueError as e:
+        print(f"Lỗi: {e}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    config = load_scheduler_config(args.path_config)
+    http_client.configure_from_file(args.path_config)
+    db_config = load_to_dw.load_database_config("dw", args.path_config)
+    conn = load_to_dw.connect_to_database(db_config)
+    try:
+        file_configs = fetch_active_configs(conn)
+    finally:
+        conn.close()
+    if not file_configs:
+        print("Không có file_config nào đang hoạt động.")
+        return
+
+    print(f"Date: {args.date} | {len(file_configs)} id_config | {config['max_workers']} worker")
+    # Client B2 dùng chung giữa các luồng (authorize một lần, khi có bước cần tới B2)
+    b2_client = b2_client_module.get_client(args.path_config)
+    source_limits = {
+        source: threading.BoundedSemaphore(config["per_source_limit"])
+        for source in {file_config["source"] for file_config in file_configs}
+    }
+    # Một semaphore cho mỗi host, dùng chung giữa các id_config cào cùng website
+    host_limiter = extract_file.HostLimiter(
+        extract_file.load_scraper_config(args.path_config)["per_host_limit"]
+    )
+    # Một PageCache (index và thống kê trong bộ nhớ) dùng chung giữa các luồng
+    page_cache = page_cache_module.open_cache(args.path_config)
+
+    results_by_config, skipped = {}, []
+    with ThreadPoolExecutor(max_workers=config["max_workers"]) as executor:
+        futures = {
+            executor.submit(
+                run_config,
+                args.path_config,
+                db_config,
+                file_config,
+                args.date,
+                stages,
+                b2_client,
+                source_limits,
+                host_limiter,
+                page_cache,
+            ): file_config["id"]
+            for file_config in file_configs
+        }
+        for future in as_completed(futures):
+            id_config = futures[future]
+            try:
+                config_results = future.result()
+            except Exception as e:
+                print(f"Lỗi khi chạy ID Config {id_config}: {e}")
+                config_results = [
+                    {"id_config": str(id_config), "date": args.date, "stage": "connect", "ok": False, "seconds": 0.0}
+                ]
+            if config_results:
+                results_by_config[id_config] = config_results
+            else:
+                skipped.append(str(id_config))
+
+    results = [result for id_config in sorted(results_by_config) for result in results_by_config[id_config]]
+    print_summary(results, skipped, time.perf_counter() - started)
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+So sánh tốc độ lấy thuộc tính mô tả sản phẩm: product_parser.extract_description_fields
+(một regex, một lần quét) với cách cũ (format_description_text rồi split() theo từng label).
+
+Cú pháp: python tests/bench_description.py [số lần lặp]
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import product_parser  # noqa: E402
+
+SAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "descriptions.json")
+
+
+def legacy_format_description_text(text):
+    # Bản cũ trong extract_file.py
+    pattern = r"(•\s*)?Thông tin"
+    return re.sub(pattern, r"• Thông tin", text)
+
+
+def legacy_extract_description_fields(text):
+    """
+    Cách lấy thuộc tính của get_product_details trước khi có product_parser.
+    """
+    desc_text = legacy_format_description_text(text.strip())
+    sku = material = shape = dimension = origin = None
+    if "Mã sản phẩm" in desc_text:
+        sku = desc_text.split("Mã sản phẩm:")[1].split("•")[0].strip()
+    if "Chất liệu" in desc_text:
+        material = desc_text.split("Chất liệu:")[1].split("•")[0].strip()
+    if "Hình dạng" in desc_text:
+        shape = desc_text.split("Hình dạng:")[1].split("•")[0].strip()
+    if "Thông số" in desc_text:
+        dimension = desc_text.split("Thông số:")[1].split("•")[0].strip()
+    if "Xuất xứ" in desc_text:
+        origin = desc_text.split("Xuất xứ:")[1].split("•")[0].split()[0].strip()
+    return {"sku": sku, "material": material, "shape": shape, "dimension": dimension, "origin": origin}
+
+
+def load_samples():
+    with open(SAMPLES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def long_description(samples):
+    # Mô tả dài (~1.5 KB): đoạn giới thiệu trước danh sách thuộc tính như nhiều trang sản phẩm
+    intro = "Gọng kính được hoàn thiện tỉ mỉ, ôm sát khuôn mặt và phù hợp đeo hằng ngày. " * 16
+    return intro + samples[0]["text"]
+
+
+def run(number=5000):
+    samples = load_samples()
+    texts = [sample["text"] for sample in samples]
+    cases = {"mẫu ngắn": texts, "mô tả dài": [long_description(samples)]}
+    for name, batch in cases.items():
+        legacy = timeit.timeit(lambda: [legacy_extract_description_fields(t) for t in batch], number=number)
+        compiled = timeit.timeit(
+            lambda: [product_parser.extract_description_fields(t) for t in batch], number=number
+        )
+        count = number * len(batch)
+        print(
+            f"{name:10s} {count} lần: split() {legacy:.3f}s | regex một lần quét {compiled:.3f}s "
+            f"({legacy / compiled:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
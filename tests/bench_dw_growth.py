@@ -0,0 +1,105 @@
+"""
+Đo thời gian load_to_dw.merge_scd2_into_dw của một lô cố định khi lịch sử dw lớn dần, cùng với
+câu UPDATE toàn bảng của update_dt_dim cũ (gán lại dt_dim cho mọi bản ghi trong dw ở mỗi lần
+load) trên cùng dw.
+
+Lô có 5.000 dòng: 2.500 khóa đã có bản ghi hiện hành (cứ 20 khóa có một khóa đổi giá) và
+2.500 khóa mới, nên lượng việc của merge như nhau ở mọi kích thước dw. dw có H bản ghi hiện
+hành và H/2 bản ghi đã đóng (xem bench_merge.seed_dw), được VACUUM ANALYZE sau khi nạp.
+Câu UPDATE cũ được rollback sau khi đo.
+Với lô lớn cỡ vài phần trăm số bản ghi hiện hành, planner chuyển sang hash join quét toàn bộ
+phân vùng và thời gian merge tăng theo dw.
+
+Cần biến môi trường DW_TEST_DSN (xem tests/conftest.py). Schema public của database này
+bị xóa và tạo lại.
+Cú pháp: python tests/bench_dw_growth.py [H ...]   (mặc định 50000 500000 1500000)
+"""
+import os
+import sys
+import time
+
+import psycopg2
+
+# bench_merge thêm thư mục gốc của dự án vào sys.path
+from bench_merge import BATCH_TABLE, LOAD_DAY, ROOT_DIR, create_batch, reset_schema, seed_dw
+import insert_date_dim  # noqa: E402
+import load_to_dw  # noqa: E402
+import row_hash  # noqa: E402
+
+DEFAULT_SIZES = [50000, 500000, 1500000]
+EXISTING_KEYS = 2500
+NEW_KEYS = 2500
+
+
+def legacy_update_dt_dim(conn):
+    # Câu lệnh của update_dt_dim trước khi dt_dim được gán trong merge
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE dw
+            SET dt_dim = date_dim.id
+            FROM date_dim
+            WHERE dw.dt_extract = date_dim.full_date
+            """
+        )
+    conn.rollback()
+
+
+def vacuum_dw(conn):
+    # Như autovacuum sau khi nạp lịch sử: cập nhật visibility map để anti-join trên
+    # dw_current_idx là index-only scan thay vì đọc heap của các bản ghi vừa nạp
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE dw")
+    finally:
+        conn.autocommit = False
+
+
+def fetch_date_keys(conn, day):
+    with conn.cursor() as cur:
+        cur.execute("SELECT full_date, id FROM date_dim WHERE full_date = %s", (day,))
+        return dict(cur.fetchall())
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def run(sizes):
+    dsn = os.environ.get("DW_TEST_DSN")
+    if not dsn:
+        sys.exit("Chưa đặt DW_TEST_DSN (database PostgreSQL chỉ dùng cho test).")
+    conn = psycopg2.connect(dsn)
+    try:
+        reset_schema(conn)
+        insert_date_dim.insert_date_dim(
+            conn, insert_date_dim.read_date_dim_csv(os.path.join(ROOT_DIR, "date_dim.csv"))
+        )
+        date_keys = fetch_date_keys(conn, LOAD_DAY)
+        for size in sizes:
+            size = max(size, EXISTING_KEYS)
+            seed_dw(conn, size)
+            vacuum_dw(conn)
+            create_batch(conn, [(1, EXISTING_KEYS), (size + 1, size + NEW_KEYS)])
+            merge = timed(
+                load_to_dw.merge_scd2_into_dw,
+                conn,
+                BATCH_TABLE,
+                LOAD_DAY,
+                row_hash.DEFAULT_TRACKED_COLUMNS,
+                date_keys,
+            )
+            update = timed(legacy_update_dt_dim, conn)
+            print(
+                f"dw {size + size // 2:>9,} dòng: merge lô {EXISTING_KEYS + NEW_KEYS:,} dòng {merge:.2f}s"
+                f" | UPDATE dt_dim toàn bảng (cũ) {update:.2f}s"
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    run([int(value) for value in sys.argv[1:]] or DEFAULT_SIZES)
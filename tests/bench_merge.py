@@ -0,0 +1,197 @@
+"""
+So sánh merge SCD2 vào dw: load_to_dw.merge_scd2_into_dw (một câu lệnh, một lần quét bảng
+tạm) với luồng ba bước cũ (insert_news_into_dw, update_news_dt_last_update,
+insert_changed_into_dw, mỗi bước commit riêng) trên lịch sử tổng hợp.
+
+dw có N bản ghi hiện hành và N/2 bản ghi đã đóng. Lô load có N dòng: 95% là khóa đã có
+(cứ 20 khóa có một khóa đổi giá) và 5% là khóa mới. Mỗi cách chạy trên một dw vừa nạp lại.
+NOT IN của bước cũ không kết thúc trong nhiều phút với work_mem mặc định, nên bước cũ
+được chạy với work_mem = LEGACY_WORK_MEM.
+
+Cần biến môi trường DW_TEST_DSN (xem tests/conftest.py). Schema public của database này
+bị xóa và tạo lại.
+Cú pháp: python tests/bench_merge.py [N ...]   (mặc định 1000000)
+"""
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+import psycopg2  # noqa: E402
+
+import load_to_dw  # noqa: E402
+import migrate  # noqa: E402
+import partition_manager  # noqa: E402
+
+SCHEMA_PATH = os.path.join(ROOT_DIR, "tests", "fixtures", "schema.sql")
+DEFAULT_SIZES = [1000000]
+LEGACY_WORK_MEM = "256MB"
+BATCH_TABLE = "bench_batch"
+HISTORY_DAY = "2024-11-08"
+CURRENT_DAY = "2024-12-08"
+LOAD_DAY = "2024-12-09"
+COLUMNS = (
+    "natural_key, sku, product_name, price, brand, material, shape, dimension, origin, "
+    "quantity_available, product_url, id_config, dt_extract, dt_load"
+)
+
+
+def product_values(price="1000 + i"):
+    # Các cột của COLUMNS (trừ dt_extract, dt_load) cho sản phẩm số i; '%%' vì câu lệnh có tham số
+    return f"""
+        'SP ' || i || '-SKU' || i, 'SKU' || i, 'SP ' || i, {price}, 'BRAND ' || i %% 50,
+        'Titanium', 'Vuông', '52-18-140', 'Nhật', i %% 30,
+        'https://kinhmatviettin.vn/products/sp-' || i, 1"""
+
+
+def reset_schema(conn):
+    with open(SCHEMA_PATH, mode="r", encoding="utf-8") as f:
+        schema = f.read()
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA public CASCADE")
+        cur.execute("CREATE SCHEMA public")
+        cur.execute(schema)
+    conn.commit()
+    migrate.apply_migrations(conn)
+    for day in (HISTORY_DAY, CURRENT_DAY, LOAD_DAY):
+        partition_manager.ensure_partition(conn, "dw", day)
+    conn.commit()
+
+
+def seed_dw(conn, current, first=1):
+    """
+    Nạp lại dw: các sản phẩm first..first+current-1 có bản ghi hiện hành (CURRENT_DAY),
+    sản phẩm số chẵn có thêm một bản ghi đã đóng (HISTORY_DAY).
+    """
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE dw")
+        cur.execute(
+            f"""
+            INSERT INTO dw ({COLUMNS}, dt_load_to_dw, dt_last_update, row_hash)
+            SELECT {product_values()}, %(day)s::date, %(day)s::date, %(day)s::date, '9999-12-31', md5(i::text)
+            FROM generate_series(%(first)s, %(last)s) AS i
+            UNION ALL
+            SELECT {product_values("900 + i")}, %(old)s::date, %(old)s::date, %(old)s::date, %(day)s::date, md5(i || 'cũ')
+            FROM generate_series(%(first)s, %(last)s) AS i
+            WHERE i %% 2 = 0
+            """,
+            {"day": CURRENT_DAY, "old": HISTORY_DAY, "first": first, "last": first + current - 1},
+        )
+        cur.execute("ANALYZE dw")
+    conn.commit()
+
+
+def create_batch(conn, keys):
+    """
+    Tạo bảng tạm BATCH_TABLE (cùng cột với bảng tạm của load_to_dw.create_work_table)
+    cho các khóa trong keys: cứ 20 sản phẩm có một sản phẩm đổi giá.
+
+    :param keys: Danh sách các khoảng (first, last) số sản phẩm.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {BATCH_TABLE}")
+        cur.execute(f"CREATE TEMP TABLE {BATCH_TABLE} (LIKE dw INCLUDING DEFAULTS)")
+        cur.execute(f"ALTER TABLE {BATCH_TABLE} DROP COLUMN id")
+        for first, last in keys:
+            cur.execute(
+                f"""
+                INSERT INTO {BATCH_TABLE} ({COLUMNS}, row_hash)
+                SELECT {product_values("CASE WHEN i %% 20 = 0 THEN 1001 + i ELSE 1000 + i END")},
+                       %(day)s::date, %(day)s::date,
+                       CASE WHEN i %% 20 = 0 THEN md5(i || 'mới') ELSE md5(i::text) END
+                FROM generate_series(%(first)s, %(last)s) AS i
+                """,
+                {"day": LOAD_DAY, "first": first, "last": last},
+            )
+        cur.execute(f"ANALYZE {BATCH_TABLE}")
+    conn.commit()
+
+
+def legacy_merge(conn, batch_table, dt_load_to_dw):
+    """
+    Ba bước của load_to_dw trước khi có merge_scd2_into_dw (temp_dw thay bằng batch_table),
+    mỗi bước commit riêng.
+
+    :return: (số bản ghi mới, số bản ghi thay đổi).
+    """
+    changed = " OR ".join(
+        f"d.{column} <> t.{column}"
+        for column in (
+            "sku", "product_name", "price", "brand", "material", "shape", "dimension",
+            "origin", "quantity_available", "product_url",
+        )
+    )
+    selected = ", ".join(f"t.{column.strip()}" for column in COLUMNS.split(","))
+    with conn.cursor() as cur:
+        cur.execute(f"SET work_mem = '{LEGACY_WORK_MEM}'")
+        # insert_news_into_dw
+        cur.execute(
+            f"""
+            INSERT INTO dw ({COLUMNS}, dt_load_to_dw, dt_last_update)
+            SELECT {selected}, %s, '9999-12-31'
+            FROM {batch_table} t
+            WHERE t.natural_key NOT IN (SELECT d.natural_key FROM dw d)
+            """,
+            (dt_load_to_dw,),
+        )
+        new_count = cur.rowcount
+        conn.commit()
+        # update_news_dt_last_update
+        cur.execute(
+            f"""
+            UPDATE dw d
+            SET dt_last_update = %s
+            FROM {batch_table} t
+            WHERE d.natural_key = t.natural_key
+              AND d.dt_last_update = '9999-12-31'
+              AND ({changed})
+            """,
+            (dt_load_to_dw,),
+        )
+        changed_count = cur.rowcount
+        conn.commit()
+        # insert_changed_into_dw
+        cur.execute(
+            f"""
+            INSERT INTO dw ({COLUMNS}, dt_load_to_dw, dt_last_update)
+            SELECT {selected}, %s, '9999-12-31'
+            FROM {batch_table} t
+            JOIN dw d ON t.natural_key = d.natural_key
+            WHERE {changed}
+            """,
+            (dt_load_to_dw,),
+        )
+        conn.commit()
+        cur.execute("RESET work_mem")
+    return new_count, changed_count
+
+
+def run(sizes):
+    dsn = os.environ.get("DW_TEST_DSN")
+    if not dsn:
+        sys.exit("Chưa đặt DW_TEST_DSN (database PostgreSQL chỉ dùng cho test).")
+    conn = psycopg2.connect(dsn)
+    try:
+        reset_schema(conn)
+        for size in sizes:
+            new_keys = size // 20
+            batch_keys = [(new_keys + 1, size + new_keys)]
+            results = []
+            for name, merge in (
+                ("ba bước cũ", legacy_merge),
+                ("merge một câu lệnh", load_to_dw.merge_scd2_into_dw),
+            ):
+                seed_dw(conn, size)
+                create_batch(conn, batch_keys)
+                started = time.perf_counter()
+                new_count, changed_count = merge(conn, BATCH_TABLE, LOAD_DAY)
+                elapsed = time.perf_counter() - started
+                results.append(f"{name} {elapsed:.2f}s ({new_count} mới, {changed_count} thay đổi)")
+            print(f"dw {size:,} hiện hành + {size // 2:,} đã đóng, lô {size:,} dòng: " + " | ".join(results))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    run([int(value) for value in sys.argv[1:]] or DEFAULT_SIZES)
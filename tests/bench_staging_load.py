@@ -0,0 +1,113 @@
+"""
+So sánh tốc độ nạp staging (dòng/giây) của load_to_staging: COPY ... FROM STDIN, execute_values
+(dùng khi server không cho COPY) và cách cũ (một câu INSERT cho mỗi dòng).
+
+Dữ liệu là các dòng của file daily lặp lại, mã sku được đánh số để natural_key không trùng, và
+đi qua extend_rows như khi nạp thật. Dữ liệu được nạp vào một bảng tạm (TEMP) rồi rollback,
+nên không động tới các bảng của database.
+
+Cần biến môi trường DW_TEST_DSN (database PostgreSQL chỉ dùng cho test, xem tests/conftest.py).
+Cú pháp: python tests/bench_staging_load.py [số dòng ...]   (mặc định 1000 100000 1000000)
+"""
+import csv
+import itertools
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+import psycopg2  # noqa: E402
+
+import load_to_staging  # noqa: E402
+
+DAILY_CSV = os.path.join(ROOT_DIR, "daily", "data_matkinh_daily_2024-12-08_kinhmatviettin.vn.csv")
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# Cách cũ chạy một round trip mỗi dòng, chỉ đo với số dòng nhỏ
+LEGACY_MAX_ROWS = 100000
+TABLE_NAME = "bench_staging"
+
+
+def read_daily():
+    with open(DAILY_CSV, mode="r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        return headers, list(reader)
+
+
+def synthetic_rows(headers, rows, count):
+    """
+    count dòng CSV lặp lại từ file daily, mỗi dòng có sku riêng.
+    """
+    sku_index = headers.index("sku")
+    for number, row in enumerate(itertools.islice(itertools.cycle(rows), count)):
+        row = list(row)
+        row[sku_index] = f"{row[sku_index]}-{number}"
+        yield row
+
+
+def legacy_insert(conn, table_name, columns, rows):
+    # Bản cũ của insert_csv_to_table: một câu INSERT cho mỗi dòng
+    query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    count = 0
+    with conn.cursor() as cursor:
+        for row in rows:
+            cursor.execute(query, row)
+            count += 1
+    return count
+
+
+def create_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TEMP TABLE {TABLE_NAME} (
+                sku text, product_name text, price numeric, brand text, material text,
+                shape text, dimension text, origin text, quantity_available int, product_url text,
+                natural_key text, id_config int, dt_extract date, dt_load date, row_hash char(32)
+            )
+            """
+        )
+    conn.commit()
+
+
+def measure(conn, headers, rows, count, method):
+    columns = headers + load_to_staging.EXTRA_COLUMNS
+
+    def make_rows():
+        return load_to_staging.extend_rows(
+            synthetic_rows(headers, rows, count), headers, 1, "2024-12-08", "2024-12-08"
+        )
+
+    started = time.perf_counter()
+    if method == "từng dòng":
+        loaded = legacy_insert(conn, TABLE_NAME, columns, make_rows())
+    else:
+        loaded = load_to_staging.load_rows(conn, TABLE_NAME, columns, make_rows, method)
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    assert loaded == count
+    return elapsed
+
+
+def run(sizes):
+    dsn = os.environ.get("DW_TEST_DSN")
+    if not dsn:
+        sys.exit("Chưa đặt DW_TEST_DSN (database PostgreSQL chỉ dùng cho test).")
+    headers, rows = read_daily()
+    conn = psycopg2.connect(dsn)
+    try:
+        create_table(conn)
+        for count in sizes:
+            methods = ["copy", "execute_values"] + (["từng dòng"] if count <= LEGACY_MAX_ROWS else [])
+            results = []
+            for method in methods:
+                elapsed = measure(conn, headers, rows, count, method)
+                results.append(f"{method} {count / elapsed:,.0f} dòng/s ({elapsed:.2f}s)")
+            print(f"{count:>9,} dòng: " + " | ".join(results))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    run([int(value) for value in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,348 @@
+import hashlib
+import io
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pytest
+
+# Các script của dự án nằm ở thư mục gốc, không phải package
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT_DIR)
+
+# Chuỗi kết nối tới database chỉ dùng cho test, ví dụ
+# "host=127.0.0.1 port=5432 dbname=dw_test user=postgres password=...".
+# Schema public của database này bị xóa và tạo lại ở mỗi test.
+DW_TEST_DSN = os.environ.get("DW_TEST_DSN")
+SCHEMA_PATH = os.path.join(FIXTURES_DIR, "schema.sql")
+# Trang mẫu dựng từ dữ liệu cào thật (xem fixtures/build_pages.py)
+PAGES_DIR = os.path.join(FIXTURES_DIR, "pages")
+SITE_URL = "https://kinhmatviettin.vn"
+LAST_MODIFIED = "Sun, 08 Dec 2024 00:00:00 GMT"
+
+
+@pytest.fixture
+def legacy_conn():
+    """
+    Kết nối tới database test (DW_TEST_DSN) với schema gốc, chưa áp dụng migration.
+    Test bị bỏ qua nếu chưa đặt DW_TEST_DSN.
+    """
+    if not DW_TEST_DSN:
+        pytest.skip("Chưa đặt DW_TEST_DSN (database PostgreSQL chỉ dùng cho test).")
+    import psycopg2
+
+    conn = psycopg2.connect(DW_TEST_DSN)
+    with open(SCHEMA_PATH, mode="r", encoding="utf-8") as f:
+        schema = f.read()
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA public CASCADE")
+        cur.execute("CREATE SCHEMA public")
+        cur.execute(schema)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def dw_conn(legacy_conn):
+    """
+    Kết nối tới database test đã áp dụng toàn bộ migrations/.
+    """
+    import migrate
+
+    migrate.apply_migrations(legacy_conn)
+    return legacy_conn
+
+
+@pytest.fixture
+def dw_db_config():
+    """
+    Thông tin kết nối tới database test theo dạng của load_database_config
+    (cho các hàm tự mở kết nối, ví dụ backfill.run_backfill).
+    """
+    if not DW_TEST_DSN:
+        pytest.skip("Chưa đặt DW_TEST_DSN (database PostgreSQL chỉ dùng cho test).")
+    from psycopg2.extensions import parse_dsn
+
+    dsn = parse_dsn(DW_TEST_DSN)
+    return {
+        "hostname": dsn.get("host", "localhost"),
+        "port": dsn.get("port", "5432"),
+        "database": dsn.get("dbname"),
+        "username": dsn.get("user"),
+        "password": dsn.get("password"),
+    }
+
+
+@pytest.fixture
+def path_config(tmp_path, monkeypatch):
+    """
+    File config.xml tối thiểu cho các bước staging/dw (giá trị mặc định, date_dim on_miss null).
+    """
+    import date_key_cache
+
+    # Bảng tra date_dim dùng chung của tiến trình được nạp lại cho database của từng test
+    monkeypatch.setattr(date_key_cache, "_shared_cache", None)
+    path = tmp_path / "config.xml"
+    path.write_text(
+        "<config><date_dim><on_miss>null</on_miss></date_dim></config>", encoding="utf-8"
+    )
+    return str(path)
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    """
+    Ghi lại email của bước dw thay vì gửi qua SMTP.
+    """
+    import load_to_dw
+
+    emails = []
+    monkeypatch.setattr(load_to_dw, "send_email", lambda *args: emails.append(args))
+    return emails
+
+
+class FixtureSite:
+    """
+    Website giả lập kinhmatviettin.vn chạy trên 127.0.0.1, phục vụ các trang trong
+    fixtures/pages: danh mục '/product-categories/gong-kinh?pages=<n>' (catalog_<n>.html)
+    và chi tiết '/products/<slug>'. Link tuyệt đối trong trang được đổi sang địa chỉ của
+    server. Mỗi trang có ETag (tắt được bằng use_etag = False) và Last-Modified, trả 304
+    khi If-None-Match hoặc If-Modified-Since khớp.
+
+    Có thể chèn response cho một đường dẫn qua inject(path, status, headers, body):
+    các response chèn được trả lần lượt trước khi trả trang thật.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.use_etag = True
+        # Thời gian chờ (giây) trước khi trả mỗi response
+        self.delay = 0
+        self._injected = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self.base_url = f"{self.url}/product-categories/gong-kinh?pages="
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def inject(self, path, status, headers=None, body=b""):
+        with self._lock:
+            self._injected.setdefault(path, []).append((status, headers or {}, body))
+
+    def count(self, prefix):
+        with self._lock:
+            return sum(1 for path, _ in self.requests if path.startswith(prefix))
+
+    def page(self, path):
+        """
+        Nội dung trang của đường dẫn (đã đổi link), None nếu không có.
+        """
+        parsed = urlparse(path)
+        if parsed.path == "/product-categories/gong-kinh":
+            page = parse_qs(parsed.query).get("pages", ["1"])[0]
+            file_path = os.path.join(PAGES_DIR, f"catalog_{page}.html")
+        elif parsed.path.startswith("/products/"):
+            file_path = os.path.join(PAGES_DIR, "products", parsed.path[len("/products/"):] + ".html")
+        else:
+            return None
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return f.read().replace(SITE_URL.encode(), self.url.encode())
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if site.delay:
+                    time.sleep(site.delay)
+                with site._lock:
+                    site.requests.append((self.path, dict(self.headers)))
+                    injected = site._injected.get(self.path)
+                    response = injected.pop(0) if injected else None
+                if response is not None:
+                    self._send(*response)
+                    return
+                content = site.page(self.path)
+                if content is None:
+                    self._send(404, {}, b"Not Found")
+                    return
+                headers = {"Last-Modified": LAST_MODIFIED}
+                if site.use_etag:
+                    headers["ETag"] = '"%s"' % hashlib.sha1(content).hexdigest()
+                if_none_match = self.headers.get("If-None-Match")
+                if (if_none_match is not None and if_none_match == headers.get("ETag")) or (
+                    if_none_match is None and self.headers.get("If-Modified-Since") == LAST_MODIFIED
+                ):
+                    self._send(304, headers, b"")
+                    return
+                headers["Content-Type"] = "text/html; charset=utf-8"
+                self._send(200, headers, content)
+
+            do_POST = do_GET
+
+            def _send(self, status, headers, body):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fixture_site():
+    """
+    Website giả lập (FixtureSite) cho các test cào dữ liệu.
+    """
+    site = FixtureSite()
+    yield site
+    site.close()
+
+
+class FakeB2:
+    """
+    B2 giả lập cho test: b2sdk RawSimulator (bucket, upload, download authorization) và một
+    HTTP server trên 127.0.0.1 đóng vai endpoint tải file '/file/<bucket>/<tên file>'.
+    Endpoint chỉ nhận header Authorization là token tải xuống của thư mục chứa file, và
+    cũng nhận response chèn trước qua inject(path, status) như FixtureSite.
+
+    :param config_path: File config.xml cho B2Client (khóa là khóa của tài khoản giả lập).
+    """
+
+    bucket_name = "bucket"
+
+    def __init__(self, config_path):
+        from b2sdk.v2 import B2Api, B2HttpApiConfig, InMemoryAccountInfo, RawSimulator
+
+        import b2_client
+
+        self.requests = []
+        self._injected = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        download_url = self.url
+
+        class Simulator(RawSimulator):
+            # Link tải file trỏ tới HTTP server ở trên
+            DOWNLOAD_URL = download_url
+            DOWNLOAD_URL_MATCHER = re.compile(
+                re.escape(download_url)
+                + r"(?:/b2api/v[0-9]+/b2_download_file_by_id\?fileId=(?P<file_id>[^/]+)"
+                + r"|/file/(?P<bucket_name>[^/]+)/(?P<file_name>.+))$"
+            )
+
+        self.api = B2Api(
+            InMemoryAccountInfo(), api_config=B2HttpApiConfig(_raw_api_class=Simulator)
+        )
+        self.simulator = self.api.session.raw_api
+        key_id, application_key = self.simulator.create_account()
+        self.api.authorize_account("production", key_id, application_key)
+        self.bucket = self.api.create_bucket(self.bucket_name, "allPrivate")
+        with open(config_path, mode="w", encoding="utf-8") as f:
+            f.write(
+                f"<config><backblaze><key_id>{key_id}</key_id>"
+                f"<application_key>{application_key}</application_key></backblaze></config>"
+            )
+        self.client = b2_client.B2Client(config_path, api=self.api)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def inject(self, path, status, headers=None, body=b""):
+        with self._lock:
+            self._injected.setdefault(path, []).append((status, headers or {}, body))
+
+    def count(self, prefix):
+        with self._lock:
+            return sum(1 for path, _ in self.requests if path.startswith(prefix))
+
+    def token_prefix(self, file_name):
+        """
+        Phần đầu của token tải xuống mà RawSimulator cấp cho thư mục chứa file
+        (phần còn lại là thời hạn của token).
+        """
+        from b2sdk.v2 import b2_url_encode
+
+        folder = file_name.rpartition("/")[0]
+        prefix = folder + "/" if folder else file_name
+        return f"fake_download_auth_token_{self.bucket.id_}_{b2_url_encode(prefix)}_"
+
+    def read(self, file_name):
+        """
+        Nội dung file đang có trên B2 giả lập, None nếu không có.
+        """
+        from b2sdk.v2.exception import FileNotPresent
+
+        buffer = io.BytesIO()
+        try:
+            self.bucket.download_file_by_name(file_name).save(buffer)
+        except FileNotPresent:
+            return None
+        return buffer.getvalue()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests.append((self.path, dict(self.headers)))
+                    injected = fake._injected.get(self.path)
+                    response = injected.pop(0) if injected else None
+                if response is not None:
+                    self._send(*response)
+                    return
+                _, _, file_name = unquote(self.path).partition(f"/file/{fake.bucket_name}/")
+                if not self.headers.get("Authorization", "").startswith(fake.token_prefix(file_name)):
+                    self._send(401, {}, b"bad_auth_token")
+                    return
+                content = fake.read(file_name)
+                if content is None:
+                    self._send(404, {}, b"not_found")
+                    return
+                self._send(200, {"Content-Type": "text/csv"}, content)
+
+            def _send(self, status, headers, body):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_b2(tmp_path):
+    """
+    B2 giả lập (FakeB2) với một bucket 'bucket' như trong fixtures/schema.sql.
+    """
+    fake = FakeB2(str(tmp_path / "b2_config.xml"))
+    yield fake
+    fake.close()
@@ -0,0 +1,202 @@
+"""
+Dựng lại các trang HTML mẫu trong tests/fixtures/pages từ dữ liệu đã cào thật của
+kinhmatviettin.vn (daily/data_matkinh_daily_2024-12-08_kinhmatviettin.vn.csv).
+
+Mỗi trang sản phẩm chứa đúng giá trị của một dòng trong file daily, đặt trong các thẻ mà
+product_parser.SELECTORS tìm (giá theo dạng của website: '7,900,000₫ / 1 chiếc'). Các trang
+danh mục catalog_<n>.html là danh mục thu nhỏ (CATALOG_PAGES trang, PER_PAGE sản phẩm) mà
+fixture fixture_site phục vụ; expected_catalog.csv là các dòng tương ứng của file daily,
+tức kết quả mà extract_file phải cào ra được.
+
+Chạy lại: python tests/fixtures/build_pages.py
+"""
+import csv
+import os
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(FIXTURES_DIR))
+DAILY_CSV = os.path.join(ROOT_DIR, "daily", "data_matkinh_daily_2024-12-08_kinhmatviettin.vn.csv")
+OUT = os.path.join(FIXTURES_DIR, "pages")
+BASE = "https://kinhmatviettin.vn"
+CATALOG_PAGES = 3
+PER_PAGE = 4
+# Trang danh mục thật có 24 sản phẩm mỗi trang
+LISTING_PER_PAGE = 24
+# File daily chỉ giữ từ đầu tiên của xuất xứ
+ORIGINS = {"Nhật": "Nhật Bản", "Trung": "Trung Quốc"}
+CATEGORIES = ["Gọng kính", "Kính râm", "Tròng kính", "Kính áp tròng", "Phụ kiện", "Kính trẻ em", "Kính thể thao", "Khuyến mãi"]
+
+
+def header():
+    items = "\n".join(
+        f'          <li class="menu-item"><a href="{BASE}/product-categories/c{i}">{c}</a>\n            <ul class="sub-menu">'
+        + "".join(f'<li><a href="{BASE}/product-categories/c{i}-{j}">{c} loại {j}</a></li>' for j in range(1, 9))
+        + "</ul></li>"
+        for i, c in enumerate(CATEGORIES)
+    )
+    return f'''<!DOCTYPE html>
+<html lang="vi">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <link rel="stylesheet" href="{BASE}/themes/martfury/css/style.css">
+  <script src="{BASE}/themes/martfury/js/jquery.min.js"></script>
+  <script>window.siteConfig = {{"url": "{BASE}", "currency": "VND", "locale": "vi"}};</script>
+</head>
+<body>
+  <header class="header header--1">
+    <div class="header__top">
+      <div class="ps-container">
+        <div class="header__left"><a class="ps-logo" href="{BASE}"><img src="{BASE}/storage/logo.png" alt="Kính mắt Việt Tín"></a></div>
+        <div class="header__center">
+          <form class="ps-form--quick-search" action="{BASE}/products" method="get">
+            <input class="form-control" name="q" type="text" placeholder="Tìm kiếm sản phẩm...">
+            <button>Tìm kiếm</button>
+          </form>
+        </div>
+      </div>
+    </div>
+    <nav class="navigation">
+      <div class="ps-container">
+        <ul class="menu">
+{items}
+        </ul>
+      </div>
+    </nav>
+  </header>
+'''
+
+
+def footer():
+    cols = "\n".join(
+        f'      <aside class="widget widget_footer"><h4 class="widget-title">Cột {k}</h4><ul class="ps-list--link">'
+        + "".join(f'<li><a href="{BASE}/pages/trang-{k}-{j}">Thông tin {k}.{j}</a></li>' for j in range(1, 7))
+        + "</ul></aside>"
+        for k in range(1, 5)
+    )
+    return f'''  <footer class="ps-footer">
+    <div class="ps-container">
+{cols}
+      <div class="ps-footer__copyright"><p>© 2024 Kính mắt Việt Tín.</p></div>
+    </div>
+  </footer>
+  <script src="{BASE}/themes/martfury/js/main.js"></script>
+</body>
+</html>
+'''
+
+
+def card(slug, title, price):
+    return f'''        <div class="ps-product">
+          <div class="ps-product__thumbnail"><a href="{BASE}/products/{slug}"><img src="{BASE}/storage/products/{slug}.jpg" alt=""></a></div>
+          <div class="ps-product__container"><a class="ps-product__title" href="{BASE}/products/{slug}">{title}</a><p class="ps-product__price">{price}</p></div>
+        </div>'''
+
+
+def card(row):
+    url = row["product_url"]
+    slug = url.rsplit("/", 1)[1]
+    return f'''        <div class="ps-product">
+          <div class="ps-product__thumbnail"><a href="{url}"><img src="{BASE}/storage/products/{slug}.jpg" alt=""></a></div>
+          <div class="ps-product__container"><a class="ps-product__title" href="{url}">{row["product_name"]}</a><p class="ps-product__price">{price_text(row)}</p></div>
+        </div>'''
+
+
+def price_text(row):
+    return f"{int(row['price']):,}₫ / 1 chiếc"
+
+
+def product_page(row, related):
+    name = row["product_name"]
+    slug = row["product_url"].rsplit("/", 1)[1]
+    brand_slug = row["brand"].lower().replace(" ", "-")
+    desc = [
+        f"Mã sản phẩm: {row['sku']}",
+        f"Chất liệu: {row['material']}",
+        f"Hình dạng: {row['shape']}",
+        f"Thông số: {row['dimension']}",
+        f"Xuất xứ: {ORIGINS.get(row['origin'], row['origin'])}",
+    ]
+    desc_html = "\n".join(f"            <p>• {d}</p>" for d in desc)
+    related_html = "\n".join(card(other) for other in related)
+    body = f'''  <main class="ps-page--product">
+    <div class="ps-breadcrumb"><ul class="breadcrumb"><li><a href="{BASE}">Trang chủ</a></li><li><a href="{BASE}/product-categories/gong-kinh">Gọng kính</a></li><li>{name}</li></ul></div>
+    <div class="ps-product--detail">
+      <div class="ps-product__header">
+        <div class="ps-product__thumbnail"><img src="{BASE}/storage/products/{slug}-1.jpg" alt="{name}"></div>
+        <div class="ps-product__info">
+          <h1>{name}</h1>
+          <div class="ps-product__meta"><p>Thương hiệu: <a href="{BASE}/brands/{brand_slug}">{row["brand"]}</a></p></div>
+          <h4 class="ps-product__price">{price_text(row)}</h4>
+          <div class="ps-product__desc">
+{desc_html}
+            <p>Thông tin NK và PP: Công ty TNHH Kính mắt Việt Tín</p>
+          </div>
+          <div class="number-items-available">Còn {row["quantity_available"]} sản phẩm</div>
+          <div class="ps-product__shopping"><button class="ps-btn">Thêm vào giỏ</button></div>
+        </div>
+      </div>
+    </div>
+    <div class="ps-section--default ps-related-products">
+      <h3>Sản phẩm liên quan</h3>
+      <div class="ps-carousel">
+{related_html}
+      </div>
+    </div>
+  </main>
+'''
+    return header() + body + footer()
+
+
+def listing_page(rows, page, last_page):
+    items = "\n".join(card(row) for row in rows)
+    pages = "".join(
+        f'<li class="active"><span>{q}</span></li>' if q == page
+        else f'<li><a href="{BASE}/product-categories/gong-kinh?pages={q}">{q}</a></li>'
+        for q in range(1, last_page + 1)
+    )
+    if page < last_page:
+        pages += f'<li><a href="{BASE}/product-categories/gong-kinh?pages={page + 1}">Tiếp</a></li>'
+    return header() + f'''  <main class="ps-page--shop">
+    <div class="ps-shopping-product">
+      <div class="row">
+{items}
+      </div>
+    </div>
+    <div class="ps-pagination"><ul class="pagination">{pages}</ul></div>
+  </main>
+''' + footer()
+
+
+def write(path, text):
+    with open(path, mode="w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+
+
+def main():
+    with open(DAILY_CSV, mode="r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    # Trang 1 của danh mục thật (dùng cho test parse_listing_page)
+    last_page = -(-len(rows) // LISTING_PER_PAGE)
+    write(os.path.join(OUT, "listing.html"), listing_page(rows[:LISTING_PER_PAGE], 1, last_page))
+
+    catalog = rows[: CATALOG_PAGES * PER_PAGE]
+    for page in range(1, CATALOG_PAGES + 1):
+        page_rows = catalog[(page - 1) * PER_PAGE: page * PER_PAGE]
+        write(os.path.join(OUT, f"catalog_{page}.html"), listing_page(page_rows, page, CATALOG_PAGES))
+    for index, row in enumerate(catalog):
+        related = [catalog[(index + step) % len(catalog)] for step in range(1, 5)]
+        slug = row["product_url"].rsplit("/", 1)[1]
+        write(os.path.join(OUT, "products", f"{slug}.html"), product_page(row, related))
+
+    with open(os.path.join(FIXTURES_DIR, "expected_catalog.csv"), mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(catalog)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+-- Schema gốc của cơ sở dữ liệu (trước các file trong migrations/), dùng cho các test
+-- chạy với PostgreSQL. Các migration được áp dụng sau đó bằng migrate.apply_migrations.
+CREATE TABLE file_config (
+    id serial PRIMARY KEY,
+    source text,
+    source_file_location text,
+    destination_table_staging text,
+    destination_table_dw text,
+    bucket_name text,
+    folder_b2_name text,
+    bucket_id text
+);
+
+CREATE TABLE file_logs (
+    id serial PRIMARY KEY,
+    id_config int,
+    file_name text,
+    time date,
+    status text,
+    count int,
+    file_size_kb numeric,
+    dt_update timestamp
+);
+
+CREATE TABLE matkinh_daily (
+    sku text,
+    product_name text,
+    price numeric,
+    brand text,
+    material text,
+    shape text,
+    dimension text,
+    origin text,
+    quantity_available int,
+    product_url text,
+    natural_key text,
+    id_config int,
+    dt_extract date,
+    dt_load date
+);
+
+CREATE TABLE temp_dw (
+    natural_key text,
+    sku text,
+    product_name text,
+    price numeric,
+    brand text,
+    material text,
+    shape text,
+    dimension text,
+    origin text,
+    quantity_available int,
+    product_url text,
+    id_config int,
+    dt_extract date,
+    dt_load date
+);
+
+CREATE TABLE dw (
+    id serial PRIMARY KEY,
+    natural_key text,
+    sku text,
+    product_name text,
+    price numeric,
+    brand text,
+    material text,
+    shape text,
+    dimension text,
+    origin text,
+    quantity_available int,
+    product_url text,
+    id_config int,
+    dt_extract date,
+    dt_load date,
+    dt_load_to_dw date,
+    dt_last_update date,
+    dt_dim int
+);
+
+CREATE TABLE date_dim (
+    id int PRIMARY KEY,
+    full_date date,
+    day_of_month int,
+    month int,
+    day_name text,
+    month_name text,
+    year int,
+    start_of_week text,
+    day_of_week int,
+    day_of_year int,
+    iso_week int,
+    iso_week_year text,
+    start_of_iso_week date,
+    iso_week_alt int,
+    iso_week_year_alt text,
+    start_of_iso_alt date,
+    quarter text,
+    quarter_num int,
+    holiday_flag text,
+    is_weekend text
+);
+
+INSERT INTO file_config (
+    source, source_file_location, destination_table_staging, destination_table_dw,
+    bucket_name, folder_b2_name, bucket_id
+)
+VALUES ('kinhmatviettin.vn', 'daily', 'matkinh_daily', 'dw', 'bucket', 'daily', 'bucket-id');
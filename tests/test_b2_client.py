@@ -0,0 +1,143 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import b2_client
+
+
+@pytest.fixture
+def calls(fake_b2, monkeypatch):
+    """
+    Số lần B2Client gọi tới b2sdk để lấy bucket và download authorization.
+    """
+    counts = Counter()
+
+    def counting(target, name):
+        method = getattr(target, name)
+
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(target, name, wrapper)
+
+    counting(fake_b2.api, "get_bucket_by_name")
+    counting(fake_b2.simulator, "get_download_authorization")
+    return counts
+
+
+def test_bucket_is_looked_up_once(fake_b2, calls):
+    fake_b2.api.create_bucket("archive", "allPrivate")
+    client = fake_b2.client
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        buckets = list(executor.map(client.bucket, ["bucket"] * 16))
+
+    assert {bucket.id_ for bucket in buckets} == {fake_b2.bucket.id_}
+    assert calls["get_bucket_by_name"] == 1
+    assert client.bucket("archive").name == "archive"
+    assert client.bucket("bucket") is buckets[0]
+    assert calls["get_bucket_by_name"] == 2
+
+
+def test_download_token_is_shared_per_folder(fake_b2, calls):
+    client = fake_b2.client
+    first = client.download_url("bucket", "daily/data_2024-12-08.csv")
+    second = client.download_url("bucket", "daily/data_2024-12-09.csv")
+
+    assert first["authorization_token"] == second["authorization_token"]
+    assert first["authorization_token"].startswith(fake_b2.token_prefix("daily/data_2024-12-08.csv"))
+    assert second["download_url_base"] == f"{fake_b2.url}/file/bucket/daily/data_2024-12-09.csv"
+    assert calls["get_download_authorization"] == 1
+
+    # Thư mục khác cần token riêng
+    weekly = client.download_url("bucket", "weekly/data_2024-12-09.csv")
+    assert weekly["authorization_token"].startswith(fake_b2.token_prefix("weekly/data_2024-12-09.csv"))
+    assert calls["get_download_authorization"] == 2
+
+
+def test_download_token_is_refreshed(fake_b2, calls, monkeypatch):
+    client = fake_b2.client
+    monkeypatch.setattr(b2_client.time, "monotonic", lambda: 1000.0)
+    client.download_url("bucket", "daily/data.csv")
+    client.download_url("bucket", "daily/data.csv", refresh=True)
+    assert calls["get_download_authorization"] == 2
+
+    # Token được dùng tới REFRESH_MARGIN_SECONDS trước khi hết hạn
+    expires = 1000.0 + client.config["download_auth_seconds"] - b2_client.REFRESH_MARGIN_SECONDS
+    monkeypatch.setattr(b2_client.time, "monotonic", lambda: expires - 1)
+    client.download_url("bucket", "daily/data.csv")
+    assert calls["get_download_authorization"] == 2
+    monkeypatch.setattr(b2_client.time, "monotonic", lambda: expires + 1)
+    client.download_url("bucket", "daily/data.csv")
+    assert calls["get_download_authorization"] == 3
+
+
+@pytest.fixture
+def uploads(fake_b2, monkeypatch):
+    """
+    Upload của fake_b2.client với large file từ 1000 byte, mỗi phần 1000 byte (phần nhỏ
+    nhất của RawSimulator là 200 byte); ghi lại kích thước của các request upload.
+    """
+    fake_b2.client.config.update(large_file_threshold=1000, part_size=1000)
+    record = {"files": [], "parts": []}
+
+    def recording(name, key):
+        method = getattr(fake_b2.simulator, name)
+
+        def wrapper(*args, **kwargs):
+            # Tham số thứ tư của upload_file và upload_part là content_length
+            record[key].append(args[3])
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(fake_b2.simulator, name, wrapper)
+
+    recording("upload_file", "files")
+    recording("upload_part", "parts")
+    return record
+
+
+@pytest.mark.parametrize(
+    "size, parts",
+    [
+        (0, []),
+        (500, []),
+        # Trên ngưỡng nhưng phần thứ hai sẽ nhỏ hơn 200 byte: vẫn upload một request
+        (1001, []),
+        (1200, [1000, 200]),
+        (4500, [1000, 1000, 1000, 1000, 500]),
+    ],
+)
+def test_upload_file(fake_b2, uploads, tmp_path, size, parts):
+    content = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    local_file = tmp_path / "data.csv"
+    local_file.write_bytes(content)
+
+    sha1 = fake_b2.client.upload_file("bucket", "daily/data.csv", str(local_file), {"id_config": "1"})
+
+    assert sha1 == b2_client.file_sha1(str(local_file))
+    # Các phần được upload song song, thứ tự ghi lại không cố định
+    assert sorted(uploads["parts"], reverse=True) == parts
+    assert uploads["files"] == ([] if parts else [size])
+    assert fake_b2.read("daily/data.csv") == content
+    info = fake_b2.bucket.get_file_info_by_name("daily/data.csv")
+    assert info.file_info["id_config"] == "1"
+    if parts:
+        assert info.file_info["large_file_sha1"] == sha1
+
+
+def test_upload_rejects_size_mismatch(fake_b2, tmp_path, monkeypatch):
+    local_file = tmp_path / "data.csv"
+    local_file.write_bytes(b"sku,price\n")
+    bucket = fake_b2.client.bucket("bucket")
+    create_file = bucket.create_file
+
+    def truncated(*args, **kwargs):
+        # B2 báo lại kích thước khác với file đã gửi
+        file_version = create_file(*args, **kwargs)
+        file_version.size -= 1
+        return file_version
+
+    monkeypatch.setattr(bucket, "create_file", truncated)
+    with pytest.raises(ValueError):
+        fake_b2.client.upload_file("bucket", "daily/data.csv", str(local_file))
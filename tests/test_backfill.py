@@ -0,0 +1,68 @@
+import shutil
+
+import backfill
+import load_to_dw
+from conftest import ROOT_DIR
+
+DATES = ["2024-12-08", "2024-12-09", "2024-12-10"]
+
+
+def archive_files(conn, folder):
+    """
+    Chuẩn bị file .csv đã lưu và file log của từng ngày trong DATES cho id_config 1
+    (ngày 10 dùng lại file của ngày 9).
+    """
+    for day in DATES:
+        source_day = min(day, "2024-12-09")
+        file_name = f"data_matkinh_daily_{day}_kinhmatviettin.vn.csv"
+        shutil.copy(
+            f"{ROOT_DIR}/daily/data_matkinh_daily_{source_day}_kinhmatviettin.vn.csv",
+            folder / file_name,
+        )
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO file_logs (id_config, file_name, time, status) VALUES (1, %s, %s, 'LWS')",
+                (file_name, day),
+            )
+    with conn.cursor() as cur:
+        cur.execute("UPDATE file_config SET source_file_location = %s", (str(folder),))
+    conn.commit()
+
+
+def fetch_statuses(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT time::text, status FROM file_logs ORDER BY time")
+        return dict(cur.fetchall())
+
+
+def test_failed_merge_stops_later_days(dw_conn, dw_db_config, path_config, sent_emails, tmp_path, monkeypatch):
+    archive_files(dw_conn, tmp_path)
+    merge = load_to_dw.merge_scd2_into_dw
+
+    def failing_merge(conn, work_table, dt_load_to_dw, *args):
+        # Merge của ngày thứ hai lỗi (merge_scd2_into_dw trả về None)
+        if str(dt_load_to_dw) == DATES[1]:
+            return None
+        return merge(conn, work_table, dt_load_to_dw, *args)
+
+    monkeypatch.setattr(load_to_dw, "merge_scd2_into_dw", failing_merge)
+    results = backfill.run_backfill(path_config, dw_db_config, ["1"], DATES, "local", 2)
+
+    merged = {result["date"]: result["ok"] for result in results if result["stage"] == "dw"}
+    assert merged == {DATES[0]: True, DATES[1]: False}
+    assert all(result["ok"] for result in results if result["stage"] == "staging")
+    # Ngày lỗi và các ngày sau vẫn chờ merge lại
+    assert fetch_statuses(dw_conn) == {DATES[0]: "LWS", DATES[1]: "LS", DATES[2]: "LS"}
+    with dw_conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT dt_load_to_dw::text FROM dw")
+        assert cur.fetchall() == [(DATES[0],)]
+    assert len(sent_emails) == 1
+
+
+def test_backfill_merges_every_day(dw_conn, dw_db_config, path_config, sent_emails, tmp_path):
+    archive_files(dw_conn, tmp_path)
+    results = backfill.run_backfill(path_config, dw_db_config, ["1"], DATES, "local", 2)
+
+    assert len(results) == 2 * len(DATES)
+    assert all(result["ok"] for result in results)
+    assert set(fetch_statuses(dw_conn).values()) == {"LWS"}
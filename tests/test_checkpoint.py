@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import time
+
+import extract_file
+from checkpoint import CheckpointJournal
+from conftest import ROOT_DIR
+from test_extract_file import read_expected, read_output
+
+CRAWL_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import extract_file
+extract_file.scrape_all_products_to_csv(sys.argv[2], "matkinh_daily", 1, base_url=sys.argv[3], max_workers=1)
+"""
+
+
+def test_truncated_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = CheckpointJournal(path)
+    journal.record("a", {"sku": "A"})
+    journal.record("b", {"sku": "B"})
+    journal.close()
+    # Tiến trình bị dừng khi đang ghi dòng "b"
+    with open(path, "rb+") as f:
+        f.truncate(len(f.read()) - 8)
+
+    journal = CheckpointJournal(path)
+    journal.record("c", {"sku": "C"})
+    journal.close()
+
+    assert list(CheckpointJournal(path).rows) == ["a", "c"]
+
+
+def test_resume_after_killed_crawl(fixture_site, tmp_path):
+    fixture_site.delay = 0.1
+    process = subprocess.Popen(
+        [sys.executable, "-c", CRAWL_SCRIPT, ROOT_DIR, str(tmp_path), fixture_site.base_url],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        # Dừng tiến trình cào sau khi đã ghi được vài sản phẩm vào nhật ký
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            journals = list(tmp_path.glob("*.journal"))
+            if journals and journals[0].read_bytes().count(b"\n") >= 4:
+                break
+            time.sleep(0.02)
+    finally:
+        process.kill()
+        process.wait()
+    assert not list(tmp_path.glob("*.csv"))
+
+    # Dòng cuối của nhật ký bị ghi dở
+    journal_path = next(tmp_path.glob("*.journal"))
+    data = journal_path.read_bytes()
+    journal_path.write_bytes(data[: len(data) - 20])
+    done = data.count(b"\n") - 1
+    requested = fixture_site.count("/products/")
+
+    fixture_site.delay = 0
+    file_name, file_stats = extract_file.scrape_all_products_to_csv(
+        str(tmp_path), "matkinh_daily", 1, base_url=fixture_site.base_url, max_workers=4
+    )
+
+    assert read_output(tmp_path, file_name, fixture_site) == read_expected()
+    assert file_stats["line_count"] == 12
+    # Chỉ các sản phẩm chưa có trong nhật ký được cào lại
+    assert fixture_site.count("/products/") - requested == 12 - done
+    assert not journal_path.exists()
@@ -0,0 +1,65 @@
+import csv
+import os
+
+import pytest
+
+import date_key_cache
+import insert_date_dim
+from conftest import ROOT_DIR
+
+DATE_DIM_CSV = os.path.join(ROOT_DIR, "date_dim.csv")
+
+
+def read_csv_keys():
+    """
+    Các cặp (full_date, id) của date_dim.csv, đọc trực tiếp từ file.
+    """
+    with open(DATE_DIM_CSV, mode="r", encoding="utf-8", newline="") as f:
+        return [(row[1], int(row[0])) for row in csv.reader(f) if row]
+
+
+def test_csv_ids_match_every_row():
+    rows = read_csv_keys()
+    cache = date_key_cache.DateKeyCache()
+
+    assert cache.load_csv(DATE_DIM_CSV) == len(rows) == len(cache)
+    mismatches = [(day, key, cache.get(day)) for day, key in rows if cache.get(day) != key]
+    assert mismatches == []
+
+
+def test_days_outside_csv_are_missing():
+    cache = date_key_cache.DateKeyCache(miss_policy="null")
+    cache.load_csv(DATE_DIM_CSV)
+
+    last_day = read_csv_keys()[-1][0]
+    assert cache.get("2026-01-02") is None
+    assert cache.lookup("2026-01-02") is None
+    assert cache.get(last_day) is not None
+    with pytest.raises(ValueError):
+        cache.add("2004-12-31", 1)
+
+
+def test_database_ids_match_every_row(dw_conn):
+    insert_date_dim.insert_date_dim(dw_conn, insert_date_dim.read_date_dim_csv(DATE_DIM_CSV))
+    cache = date_key_cache.DateKeyCache()
+    cache.load_database(dw_conn)
+
+    with dw_conn.cursor() as cur:
+        cur.execute("SELECT full_date, id FROM date_dim")
+        rows = cur.fetchall()
+    assert len(rows) == len(read_csv_keys()) == len(cache)
+    assert [(day, key) for day, key in rows if cache.get(day) != key] == []
+
+
+def test_extended_days_match_database(dw_conn):
+    insert_date_dim.insert_date_dim(dw_conn, insert_date_dim.read_date_dim_csv(DATE_DIM_CSV))
+    cache = date_key_cache.DateKeyCache(miss_policy="extend")
+    cache.load_database(dw_conn)
+
+    key = cache.lookup("2026-10-17", dw_conn)
+    with dw_conn.cursor() as cur:
+        cur.execute("SELECT full_date, id FROM date_dim")
+        rows = cur.fetchall()
+        cur.execute("SELECT id FROM date_dim WHERE full_date = '2026-10-17'")
+        assert cur.fetchone()[0] == key
+    assert [(day, key) for day, key in rows if cache.get(day) != key] == []
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+import product_parser
+from bench_description import SAMPLES_PATH, legacy_extract_description_fields, long_description
+from conftest import FIXTURES_DIR
+
+with open(SAMPLES_PATH, encoding="utf-8") as f:
+    SAMPLES = json.load(f)
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=lambda sample: sample["name"])
+def test_extract_description_fields(sample):
+    assert product_parser.extract_description_fields(sample["text"]) == sample["expected"]
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=lambda sample: sample["name"])
+def test_matches_legacy_split(sample):
+    if not sample["text"]:
+        pytest.skip("bản cũ không xử lý mô tả rỗng")
+    assert product_parser.extract_description_fields(sample["text"]) == legacy_extract_description_fields(
+        sample["text"]
+    )
+
+
+def test_long_description_matches_legacy():
+    text = long_description(SAMPLES)
+    assert product_parser.extract_description_fields(text) == legacy_extract_description_fields(text)
+
+
+def test_label_without_value_is_none():
+    result = product_parser.extract_description_fields("• Xuất xứ:   • Chất liệu: Nhựa")
+    assert result["origin"] is None
+    assert result["material"] == "Nhựa"
+
+
+def test_fields_from_config_spec():
+    spec = product_parser.compile_description_spec(
+        product_parser.DESCRIPTION_FIELDS + [{"name": "warranty", "label": "Bảo hành", "transform": "strip"}]
+    )
+    sample = next(sample for sample in SAMPLES if sample["name"] == "extra_text")
+    result = product_parser.extract_description_fields(sample["text"], spec)
+    assert result["warranty"] == "6 tháng"
+    assert result["sku"] == "GK 8810"
+
+
+def test_invalid_transform():
+    with pytest.raises(ValueError):
+        product_parser.compile_description_spec([{"name": "x", "label": "X", "transform": "upper"}])
+
+
+def test_fixture_pages_descriptions():
+    # Mô tả của trang mẫu đi qua parser HTML rồi mới tới bước lấy thuộc tính
+    path = os.path.join(FIXTURES_DIR, "pages", "products", "porsche-desingn-gold-18k-p8124-56-a.html")
+    with open(path, "rb") as f:
+        page = product_parser.parse_product_page(f.read(), "html.parser")
+    result = product_parser.extract_description_fields(page["description"])
+    # Mã sản phẩm trên website có một khoảng trắng không ngắt (giữ nguyên như file daily)
+    assert result == {
+        "sku": "GOLD 18K \xa0P8124 56 A",
+        "material": "Vàng nguyên khối 18K",
+        "shape": "Chữ nhật",
+        "dimension": "53-18-145",
+        "origin": "Nhật",
+    }
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+import requests
+
+import extract_file
+import http_client
+from conftest import FIXTURES_DIR, SITE_URL
+
+# Các dòng tương ứng của file daily đã cào thật (xem fixtures/build_pages.py)
+EXPECTED_CSV = os.path.join(FIXTURES_DIR, "expected_catalog.csv")
+
+
+def read_output(folder, file_name, site):
+    """
+    Nội dung file CSV đã cào, với địa chỉ của website giả lập đổi lại thành SITE_URL.
+    """
+    with open(os.path.join(folder, file_name), mode="r", encoding="utf-8", newline="") as f:
+        return f.read().replace(site.url, SITE_URL)
+
+
+def read_expected():
+    with open(EXPECTED_CSV, mode="r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_crawl_matches_committed_csv(fixture_site, tmp_path):
+    file_name, file_stats = extract_file.scrape_all_products_to_csv(
+        str(tmp_path), "matkinh_daily", 1, base_url=fixture_site.base_url, max_workers=4
+    )
+
+    assert read_output(tmp_path, file_name, fixture_site) == read_expected()
+    assert file_stats["line_count"] == 12
+    # Mỗi trang chỉ được tải một lần
+    assert fixture_site.count("/product-categories/") == 3
+    assert fixture_site.count("/products/") == 12
+
+
+def test_missing_product_page_fails_crawl(fixture_site, tmp_path):
+    fixture_site.inject("/products/bolon-bt6002-50-b12", 404)
+
+    with pytest.raises(requests.HTTPError):
+        extract_file.scrape_all_products_to_csv(
+            str(tmp_path), "matkinh_daily", 1, base_url=fixture_site.base_url, max_workers=4
+        )
+    # Không có file CSV nào được tạo, sản phẩm lỗi không vào nhật ký checkpoint
+    assert not list(tmp_path.glob("*.csv"))
+    journal = next(tmp_path.glob("*.journal"))
+    assert "bolon-bt6002-50-b12" not in journal.read_text(encoding="utf-8")
+
+
+def test_request_stats_cover_one_crawl(fixture_site, tmp_path):
+    for _ in range(2):
+        extract_file.scrape_all_products_to_csv(
+            str(tmp_path), "matkinh_daily", 1, base_url=fixture_site.base_url, max_workers=4
+        )
+        assert http_client.get_retry_stats()["requests"] == 15
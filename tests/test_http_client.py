@@ -0,0 +1,53 @@
+import pytest
+import requests
+
+import http_client
+
+PAGE = "/products/titantec-tf-1850-56-c03"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Ghi lại thời gian chờ backoff thay vì chờ thật; mỗi test bắt đầu với bộ đếm bằng 0.
+    """
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    monkeypatch.setitem(http_client._config, "max_retries", 2)
+    http_client.reset_retry_stats()
+    return delays
+
+
+def test_retries_503_and_429_with_retry_after(fixture_site, sleeps):
+    fixture_site.inject(PAGE, 503)
+    fixture_site.inject(PAGE, 429, {"Retry-After": "7"})
+
+    response = http_client.get(fixture_site.url + PAGE)
+
+    assert response.status_code == 200
+    assert fixture_site.count(PAGE) == 3
+    # Lần chờ thứ hai theo đúng Retry-After của server
+    assert sleeps[1] == 7.0
+    stats = http_client.get_retry_stats()
+    assert (stats["requests"], stats["retries"], stats["failures"]) == (3, 2, 0)
+
+
+def test_raises_when_retries_run_out(fixture_site, sleeps):
+    for _ in range(3):
+        fixture_site.inject(PAGE, 503)
+
+    with pytest.raises(requests.HTTPError):
+        http_client.get(fixture_site.url + PAGE)
+    assert fixture_site.count(PAGE) == 3
+    assert http_client.get_retry_stats()["failures"] == 1
+
+
+def test_post_is_not_retried_by_default(fixture_site, sleeps):
+    fixture_site.inject(PAGE, 503)
+    with pytest.raises(requests.HTTPError):
+        http_client.post(fixture_site.url + PAGE)
+    assert fixture_site.count(PAGE) == 1
+
+    fixture_site.inject(PAGE, 503)
+    assert http_client.post(fixture_site.url + PAGE, retry=True).status_code == 200
+    assert fixture_site.count(PAGE) == 3
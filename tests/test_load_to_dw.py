@@ -0,0 +1,58 @@
+import pytest
+
+import load_to_dw
+from test_staging_reload import DT_LOAD, load_csv
+
+
+@pytest.fixture
+def staged_conn(dw_conn):
+    """
+    Database test với dữ liệu của DT_LOAD đã nạp vào staging và file log ở trạng thái LS.
+    """
+    row_count = load_csv(dw_conn, "copy")
+    with dw_conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO file_logs (id_config, file_name, time, status, count) "
+            "VALUES (1, 'data_matkinh_daily.csv', %s, 'LS', %s)",
+            (DT_LOAD, row_count),
+        )
+    dw_conn.commit()
+    return dw_conn
+
+
+def fetch_status(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT status FROM file_logs WHERE id_config = 1")
+        return cur.fetchone()[0]
+
+
+def count_rows(conn, table_name):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {table_name}")
+        return cur.fetchone()[0]
+
+
+def test_merge_sets_status_lws(staged_conn, path_config, sent_emails):
+    assert load_to_dw.run_load_to_dw(staged_conn, 1, path_config, DT_LOAD) is True
+    assert fetch_status(staged_conn) == "LWS"
+    assert count_rows(staged_conn, "dw") == count_rows(staged_conn, "matkinh_daily")
+    assert sent_emails == []
+
+
+def test_failed_merge_keeps_status_ls(staged_conn, path_config, sent_emails, monkeypatch):
+    monkeypatch.setattr(load_to_dw, "merge_scd2_into_dw", lambda *args: None)
+
+    assert load_to_dw.run_load_to_dw(staged_conn, 1, path_config, DT_LOAD) is False
+    assert fetch_status(staged_conn) == "LS"
+    assert len(sent_emails) == 1
+
+
+def test_failed_work_table_keeps_status_ls(staged_conn, path_config, sent_emails):
+    with staged_conn.cursor() as cur:
+        cur.execute("UPDATE file_config SET destination_table_staging = 'bang_khong_ton_tai'")
+    staged_conn.commit()
+
+    assert load_to_dw.run_load_to_dw(staged_conn, 1, path_config, DT_LOAD) is False
+    assert fetch_status(staged_conn) == "LS"
+    assert count_rows(staged_conn, "dw") == 0
+    assert len(sent_emails) == 1
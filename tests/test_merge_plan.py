@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import load_to_dw
+import partition_manager
+
+# Ngày của lượt load trong test và số bản ghi hiện hành có sẵn trong dw
+DT_LOAD = "2026-10-17"
+CURRENT_ROWS = 50000
+
+
+def fill_dw(conn, current_rows):
+    """
+    Chèn current_rows bản ghi hiện hành và cùng số bản ghi lịch sử (đã đóng) vào dw.
+    """
+    partition_manager.ensure_partition(conn, "dw", "2026-09-01")
+    partition_manager.ensure_partition(conn, "dw", DT_LOAD)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO dw (natural_key, sku, product_name, id_config, dt_extract, dt_load,
+                            row_hash, dt_load_to_dw, dt_last_update)
+            SELECT 'sp-' || i, 'SKU' || i, 'Sản phẩm ' || i, 1, DATE '2026-09-15', DATE '2026-09-15',
+                   md5('cu-' || i), DATE '2026-09-15', DATE '2026-10-01'
+            FROM generate_series(1, %(n)s) AS i
+            UNION ALL
+            SELECT 'sp-' || i, 'SKU' || i, 'Sản phẩm ' || i, 1, DATE '2026-10-01', DATE '2026-10-01',
+                   md5('sp-' || i), DATE '2026-10-01', DATE '9999-12-31'
+            FROM generate_series(1, %(n)s) AS i
+            """,
+            {"n": current_rows},
+        )
+        cur.execute("ANALYZE dw")
+    conn.commit()
+
+
+def create_batch(conn, first, last):
+    """
+    Nạp vào staging các sản phẩm sp-<first>..sp-<last> (một phần mười có row_hash khác,
+    phần vượt quá CURRENT_ROWS là sản phẩm mới) rồi tạo bảng tạm của lượt load.
+    """
+    partition_manager.ensure_partition(conn, "matkinh_daily", DT_LOAD)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO matkinh_daily (natural_key, sku, product_name, id_config, dt_extract,
+                                       dt_load, row_hash)
+            SELECT 'sp-' || i, 'SKU' || i, 'Sản phẩm ' || i, 1, %(day)s::date, %(day)s::date,
+                   CASE WHEN i %% 10 = 0 THEN md5('moi-' || i) ELSE md5('sp-' || i) END
+            FROM generate_series(%(first)s, %(last)s) AS i
+            """,
+            {"day": DT_LOAD, "first": first, "last": last},
+        )
+    conn.commit()
+    return load_to_dw.create_work_table(conn, 1, DT_LOAD, "matkinh_daily")
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain_merge(conn, work_table):
+    with conn.cursor() as cur:
+        cur.execute(
+            "EXPLAIN (FORMAT JSON) " + load_to_dw.build_merge_query(work_table),
+            {"dt_load_to_dw": DT_LOAD, "days": [DT_LOAD], "keys": [1]},
+        )
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(plan_nodes(plan[0]["Plan"]))
+
+
+def anti_joins(nodes):
+    # PostgreSQL 16 có thêm "Right Anti" (bảng băm được dựng từ dw)
+    return [node for node in nodes if node.get("Join Type") in ("Anti", "Right Anti")]
+
+
+def uses_current_index(node):
+    """
+    Anti-join dạng nested loop mà phía trong là index scan trên dw (dw_current_idx).
+    """
+    if node["Node Type"] != "Nested Loop":
+        return False
+    return any("Index" in inner["Node Type"] for inner in plan_nodes(node["Plans"][1]))
+
+
+def test_small_batch_uses_index_anti_join(dw_conn):
+    fill_dw(dw_conn, CURRENT_ROWS)
+    work_table = create_batch(dw_conn, CURRENT_ROWS - 50, CURRENT_ROWS + 50)
+
+    joins = anti_joins(explain_merge(dw_conn, work_table))
+    assert joins, "NOT EXISTS trong CTE changes không còn là anti-join"
+    # Lượt load nhỏ không được quét toàn bộ các bản ghi hiện hành của dw
+    assert all(uses_current_index(node) for node in joins), [node["Node Type"] for node in joins]
+
+
+def test_full_batch_uses_index_or_hash_anti_join(dw_conn):
+    fill_dw(dw_conn, CURRENT_ROWS)
+    work_table = create_batch(dw_conn, 1, CURRENT_ROWS + 5000)
+
+    joins = anti_joins(explain_merge(dw_conn, work_table))
+    assert joins, "NOT EXISTS trong CTE changes không còn là anti-join"
+    for node in joins:
+        assert node["Node Type"] == "Hash Join" or uses_current_index(node), node["Node Type"]
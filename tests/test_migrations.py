@@ -0,0 +1,81 @@
+import psycopg2
+import pytest
+
+import migrate
+import partition_manager
+
+
+def insert_legacy_rows(conn):
+    """
+    Dữ liệu cũ trước khi phân vùng: mỗi bảng có một dòng thiếu khóa phân vùng (NULL).
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO matkinh_daily (sku, product_name, natural_key, id_config, dt_extract, dt_load)
+            VALUES ('SKU1', 'Sản phẩm 1', 'Sản phẩm 1-SKU1', 1, '2024-12-08', '2024-12-08'),
+                   ('SKU2', 'Sản phẩm 2', 'Sản phẩm 2-SKU2', 1, '2024-12-08', NULL)
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO dw (natural_key, sku, id_config, dt_extract, dt_load, dt_load_to_dw, dt_last_update)
+            VALUES ('Sản phẩm 1-SKU1', 'SKU1', 1, '2024-12-08', '2024-12-08', '2024-12-08', '9999-12-31'),
+                   ('Sản phẩm 2-SKU2', 'SKU2', 1, NULL, '2024-12-08', '2024-12-08', '9999-12-31')
+            """
+        )
+    conn.commit()
+
+
+def fetch_partitions(conn, table_name):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            (table_name,),
+        )
+        return dict(cur.fetchall())
+
+
+def test_null_partition_keys_go_to_default_partition(legacy_conn):
+    insert_legacy_rows(legacy_conn)
+    migrate.apply_migrations(legacy_conn)
+
+    assert fetch_partitions(legacy_conn, "matkinh_daily")["matkinh_daily_null"] == "DEFAULT"
+    assert fetch_partitions(legacy_conn, "dw")["dw_null"] == "DEFAULT"
+    with legacy_conn.cursor() as cur:
+        cur.execute("SELECT sku FROM matkinh_daily_null")
+        assert cur.fetchall() == [("SKU2",)]
+        cur.execute("SELECT sku FROM matkinh_daily_legacy")
+        assert cur.fetchall() == [("SKU1",)]
+        cur.execute("SELECT sku FROM dw_null")
+        assert cur.fetchall() == [("SKU2",)]
+        cur.execute("SELECT COUNT(*) FROM dw WHERE dt_last_update = '9999-12-31'")
+        assert cur.fetchone()[0] == 2
+
+
+def test_default_partition_only_accepts_null_keys(legacy_conn):
+    insert_legacy_rows(legacy_conn)
+    migrate.apply_migrations(legacy_conn)
+
+    # Ngày chưa có phân vùng tháng vẫn bị từ chối thay vì rơi vào phân vùng DEFAULT
+    with pytest.raises(psycopg2.errors.CheckViolation):
+        with legacy_conn.cursor() as cur:
+            cur.execute("INSERT INTO dw (sku, dt_extract) VALUES ('SKU3', '2099-01-15')")
+    legacy_conn.rollback()
+
+    # và phân vùng tháng mới vẫn được tạo bình thường
+    assert partition_manager.ensure_partition(legacy_conn, "dw", "2099-01-15") == "dw_p209901"
+    with legacy_conn.cursor() as cur:
+        cur.execute("INSERT INTO dw (sku, dt_extract) VALUES ('SKU3', '2099-01-15')")
+    legacy_conn.commit()
+
+
+def test_no_default_partition_without_null_keys(dw_conn):
+    assert "matkinh_daily_null" not in fetch_partitions(dw_conn, "matkinh_daily")
+    assert "dw_null" not in fetch_partitions(dw_conn, "dw")
@@ -0,0 +1,57 @@
+import gzip
+
+import pytest
+
+import output_writer
+from test_staging_stream import read_csv_rows
+
+
+def write_file(folder, file_name, output_format):
+    headers, *rows = read_csv_rows()
+    path = folder / file_name
+    writer = output_writer.open_writer(str(path), headers, output_format)
+    for row in rows:
+        writer.write_row(dict(zip(headers, row)))
+    writer.commit()
+    return path
+
+
+def read_file(path):
+    with open(path, mode="rb") as f:
+        rows, headers = output_writer.open_reader(f, path.name)
+        return [headers] + list(rows)
+
+
+def test_gzip_output_is_byte_stable(tmp_path, monkeypatch):
+    # Hai lần ghi ở hai thời điểm và hai thư mục khác nhau
+    paths = []
+    for day, clock in (("2024-12-08", 1733616000), ("2024-12-09", 1733702400)):
+        monkeypatch.setattr(gzip.time, "time", lambda: clock)
+        folder = tmp_path / day
+        folder.mkdir()
+        paths.append(write_file(folder, f"data_{day}.csv.gz", "csv.gz"))
+
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+    assert read_file(paths[0]) == read_csv_rows()
+    assert not list(tmp_path.glob("*/*.part"))
+
+
+def test_abort_removes_temp_file(tmp_path):
+    writer = output_writer.open_writer(str(tmp_path / "data.csv.gz"), ["sku"], "csv.gz")
+    writer.write_row({"sku": "BT6002"})
+    writer.abort()
+
+    assert writer._raw.closed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_parquet_round_trip(tmp_path):
+    if output_writer.pq is None:
+        pytest.skip("Chưa cài pyarrow.")
+    path = write_file(tmp_path, "data.parquet", "parquet")
+
+    headers, *rows = read_csv_rows()
+    # Giá được lưu thành số nên đọc lại không còn khoảng trắng ở cuối
+    price = headers.index("price")
+    expected = [[value.strip() if i == price else value for i, value in enumerate(row)] for row in rows]
+    assert read_file(path) == [headers] + expected
@@ -0,0 +1,70 @@
+import page_cache
+
+PAGES = [
+    "/products/titantec-tf-1850-56-c03",
+    "/products/titantec-tf-1782-54-c01b",
+    "/products/porsche-desingn-gold-18k-p8124-56-a",
+]
+
+
+def last_headers(site, path):
+    return [headers for request_path, headers in site.requests if request_path == path][-1]
+
+
+def test_unchanged_page_is_served_from_cache(fixture_site, tmp_path):
+    cache = page_cache.PageCache(str(tmp_path), 10 * 1024 * 1024)
+    url = fixture_site.url + PAGES[0]
+
+    first = cache.fetch(url)
+    assert "If-None-Match" not in last_headers(fixture_site, PAGES[0])
+    assert cache.fetch(url) == first
+    # Lần thứ hai gửi ETag đã lưu và nhận 304 (không có nội dung)
+    assert last_headers(fixture_site, PAGES[0])["If-None-Match"] == cache.lookup(url)[0]["etag"]
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_if_modified_since_without_etag(fixture_site, tmp_path):
+    fixture_site.use_etag = False
+    cache = page_cache.PageCache(str(tmp_path), 10 * 1024 * 1024)
+    url = fixture_site.url + PAGES[0]
+
+    first = cache.fetch(url)
+    assert cache.fetch(url) == first
+    headers = last_headers(fixture_site, PAGES[0])
+    assert "If-None-Match" not in headers
+    assert headers["If-Modified-Since"] == cache.lookup(url)[0]["last_modified"]
+    assert cache.stats["hits"] == 1
+
+
+def test_changed_page_replaces_cache_entry(fixture_site, tmp_path):
+    cache = page_cache.PageCache(str(tmp_path), 10 * 1024 * 1024)
+    url = fixture_site.url + PAGES[0]
+    cache.fetch(url)
+
+    fixture_site.inject(PAGES[0], 200, {"ETag": '"v2"'}, b"<h1>v2</h1>")
+    assert cache.fetch(url) == b"<h1>v2</h1>"
+    assert cache.lookup(url)[0]["etag"] == '"v2"'
+    assert cache.stats["revalidated_changed"] == 1
+
+
+def test_least_recently_used_page_is_evicted(fixture_site, tmp_path):
+    urls = [fixture_site.url + path for path in PAGES]
+    sizes = [len(fixture_site.page(path)) for path in PAGES]
+    # Đủ chỗ cho hai trang bất kỳ nhưng không đủ cho cả ba
+    cache = page_cache.PageCache(str(tmp_path), sum(sizes) - 1)
+
+    cache.fetch(urls[0])
+    cache.fetch(urls[1])
+    # Dùng lại trang đầu tiên: trang thứ hai thành trang lâu nhất chưa dùng
+    cache.fetch(urls[0])
+    cache.fetch(urls[2])
+
+    assert cache.stats["evictions"] == 1
+    assert cache.lookup(urls[1]) is None
+    assert cache.lookup(urls[0]) is not None
+    assert cache.lookup(urls[2]) is not None
+
+    # Chỉ mục được dựng lại từ thư mục cache khi mở lại
+    reopened = page_cache.PageCache(str(tmp_path), sum(sizes) - 1)
+    assert reopened._total_bytes == sizes[0] + sizes[2]
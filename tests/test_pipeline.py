@@ -0,0 +1,102 @@
+import pytest
+
+import extract_file
+import load_to_staging
+import page_cache
+import pipeline
+from test_extract_file import read_expected
+
+DATES = ["2024-12-08", "2024-12-09"]
+CHANGED_PRODUCT = "/products/bolon-bt6002-50-b12"
+
+
+def write_config(path, site):
+    """
+    config.xml cho pipeline: cào website giả lập, không dùng cache trang, date_dim on_miss null.
+    """
+    with open(path, mode="w", encoding="utf-8") as f:
+        f.write(
+            f"""<config>
+    <scraper>
+        <base_url>{site.base_url}</base_url>
+        <max_workers>4</max_workers>
+        <output_format>csv</output_format>
+    </scraper>
+    <cache><enabled>false</enabled></cache>
+    <date_dim><on_miss>null</on_miss></date_dim>
+</config>"""
+        )
+
+
+def fetch_logs(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT time::text, status, count FROM file_logs ORDER BY time")
+        return cur.fetchall()
+
+
+def fetch_prices(conn, product_url):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT price, dt_last_update::text FROM dw WHERE product_url = %s ORDER BY dt_load_to_dw",
+            (product_url,),
+        )
+        return cur.fetchall()
+
+
+@pytest.fixture
+def output_dir(dw_conn, path_config, sent_emails, fixture_site, tmp_path, monkeypatch):
+    """
+    Thư mục lưu file cào về của id_config 1; config.xml của path_config được ghi đè
+    bằng write_config và email của mọi bước được ghi vào sent_emails.
+    """
+    for module in (extract_file, load_to_staging):
+        monkeypatch.setattr(module, "send_email", lambda *args: sent_emails.append(args))
+    write_config(path_config, fixture_site)
+    folder = tmp_path / "daily"
+    folder.mkdir()
+    with dw_conn.cursor() as cur:
+        cur.execute("UPDATE file_config SET source_file_location = %s", (str(folder),))
+    dw_conn.commit()
+    return folder
+
+
+def test_pipeline_loads_crawled_products_into_dw(
+    dw_conn, path_config, sent_emails, fixture_site, fake_b2, output_dir
+):
+    results = pipeline.run_pipeline(dw_conn, path_config, ["1"], DATES[:1], b2_client=fake_b2.client)
+    assert [(result["stage"], result["ok"]) for result in results] == [
+        ("extract", True), ("staging", True), ("dw", True)
+    ]
+    expected_rows = read_expected().count("\n") - 1
+    assert fetch_logs(dw_conn) == [(DATES[0], "LWS", expected_rows)]
+    # File trên B2 là file đã cào
+    file_name = next(output_dir.glob("*.csv")).name
+    assert fake_b2.read(f"daily/{file_name}") == (output_dir / file_name).read_bytes()
+
+    # Ngày sau một sản phẩm đổi giá
+    page = fixture_site.page(CHANGED_PRODUCT).decode("utf-8")
+    fixture_site.inject(CHANGED_PRODUCT, 200, {}, page.replace("3,480,000₫", "3,580,000₫").encode("utf-8"))
+    results = pipeline.run_pipeline(dw_conn, path_config, ["1"], DATES[1:], b2_client=fake_b2.client)
+
+    assert all(result["ok"] for result in results)
+    assert [status for _, status, _ in fetch_logs(dw_conn)] == ["LWS", "LWS"]
+    with dw_conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE dt_last_update = '9999-12-31') FROM dw")
+        assert cur.fetchone() == (expected_rows + 1, expected_rows)
+    prices = fetch_prices(dw_conn, fixture_site.url + CHANGED_PRODUCT)
+    assert [(int(price), last_update) for price, last_update in prices] == [
+        (3480000, DATES[1]), (3580000, "9999-12-31")
+    ]
+    assert sent_emails == []
+
+
+def test_extract_shares_page_cache(dw_conn, path_config, fixture_site, fake_b2, output_dir, tmp_path):
+    cache = page_cache.PageCache(str(tmp_path / "cache"), 1024 * 1024)
+    results = pipeline.run_pipeline(
+        dw_conn, path_config, ["1"], DATES, ["extract"], fake_b2.client, page_cache=cache
+    )
+
+    assert all(result["ok"] for result in results)
+    # Ngày thứ hai dùng cùng cache: mọi trang đều trả 304
+    assert (cache.stats["misses"], cache.stats["hits"]) == (15, 15)
+    assert fixture_site.count("/") == 30
@@ -0,0 +1,56 @@
+import glob
+import os
+
+import pytest
+
+import product_parser
+from conftest import PAGES_DIR
+
+# Trang mẫu dựng từ dữ liệu cào thật của kinhmatviettin.vn (xem fixtures/build_pages.py).
+# Đo tốc độ parse của từng backend: python product_parser.py tests/fixtures/pages/products/*.html
+PRODUCT_PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, "products", "*.html")))
+
+
+def read_page(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def normalized(page):
+    return {field: " ".join(value.split()) if value else value for field, value in page.items()}
+
+
+@pytest.mark.parametrize("path", PRODUCT_PAGES, ids=os.path.basename)
+def test_backends_agree_on_product_pages(path):
+    content = read_page(path)
+    results = {
+        backend: normalized(product_parser.parse_product_page(content, backend))
+        for backend in product_parser.available_backends()
+    }
+    expected = results["html.parser"]
+    assert all(value is not None for value in expected.values())
+    for backend, result in results.items():
+        assert result == expected, backend
+
+
+def test_product_page_fields():
+    path = os.path.join(PAGES_DIR, "products", "titantec-tf-1850-56-c03.html")
+    page = product_parser.parse_product_page(read_page(path), "html.parser")
+    assert page["product_name"].strip() == "TITANTEC TF-1850"
+    assert page["price"].strip() == "7,900,000₫ / 1 chiếc"
+    assert page["brand"].strip() == "TITANTEC"
+    assert page["quantity"].strip() == "Còn 4 sản phẩm"
+
+
+@pytest.mark.parametrize("backend", product_parser.available_backends())
+def test_listing_page(backend):
+    listing = product_parser.parse_listing_page(read_page(os.path.join(PAGES_DIR, "listing.html")), backend)
+    assert len(listing["product_links"]) == 24
+    assert listing["product_links"][0] == "https://kinhmatviettin.vn/products/titantec-tf-1850-56-c03"
+    assert listing["last_page"] == 9
+
+
+def test_benchmark_covers_available_backends():
+    timings = product_parser.benchmark([read_page(path) for path in PRODUCT_PAGES], repeat=1)
+    assert set(timings) == set(product_parser.available_backends())
+    assert all(ms > 0 for ms in timings.values())
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import psycopg2
+import pytest
+
+import scheduler
+from conftest import DW_TEST_DSN
+
+DAY = "2024-12-08"
+FILE_CONFIG = {"id": 1, "source": "kinhmatviettin.vn", "destination_table_staging": "matkinh_daily"}
+
+
+@pytest.fixture
+def other_conn(dw_conn):
+    """
+    Kết nối thứ hai tới database test, đóng vai một tiến trình khác đang giữ khóa.
+    """
+    conn = psycopg2.connect(DW_TEST_DSN)
+    yield conn
+    conn.close()
+
+
+def submit_dw_stage(executor, path_config, db_config, file_config=FILE_CONFIG):
+    # Chưa có file log LS nên bước dw dừng ngay sau khi lấy được khóa
+    return executor.submit(
+        scheduler.run_config, path_config, db_config, file_config, DAY, ["dw"], None, {}
+    )
+
+
+def test_dw_stage_does_not_lock_whole_dw(other_conn, dw_db_config, path_config, sent_emails):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Khóa của bảng dw và khóa dw của một bảng staging khác không chặn bước dw
+        with scheduler.advisory_lock(
+            other_conn, scheduler.TABLE_LOCK_NAMESPACE, scheduler.table_lock_key("dw")
+        ), scheduler.advisory_lock(
+            other_conn, scheduler.DW_LOCK_NAMESPACE, scheduler.table_lock_key("matkinh_weekly")
+        ):
+            results = submit_dw_stage(executor, path_config, dw_db_config).result(timeout=10)
+
+    assert [(result["stage"], result["ok"]) for result in results] == [("dw", False)]
+    assert len(sent_emails) == 1
+
+
+def test_dw_stage_waits_for_same_staging_table(other_conn, dw_db_config, path_config, sent_emails):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with scheduler.advisory_lock(
+            other_conn, scheduler.DW_LOCK_NAMESPACE, scheduler.table_lock_key("matkinh_daily")
+        ):
+            future = submit_dw_stage(executor, path_config, dw_db_config)
+            with pytest.raises(TimeoutError):
+                future.result(timeout=1)
+            assert sent_emails == []
+        results = future.result(timeout=10)
+
+    assert [result["stage"] for result in results] == ["dw"]
+    assert len(sent_emails) == 1
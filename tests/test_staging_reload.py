@@ -0,0 +1,66 @@
+import csv
+import os
+
+import pytest
+
+import load_to_dw
+import load_to_staging
+import partition_manager
+from conftest import ROOT_DIR
+
+CSV_PATH = os.path.join(ROOT_DIR, "daily", "data_matkinh_daily_2024-12-08_kinhmatviettin.vn.csv")
+DT_LOAD = "2024-12-08"
+
+
+def load_csv(conn, load_method, id_config=1):
+    partition_manager.ensure_partition(conn, "matkinh_daily", DT_LOAD)
+    with open(CSV_PATH, mode="r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        row_count = load_to_staging.load_rows(
+            conn,
+            "matkinh_daily",
+            headers + load_to_staging.EXTRA_COLUMNS,
+            lambda: load_to_staging.extend_rows(reader, headers, id_config, DT_LOAD, DT_LOAD),
+            load_method,
+            batch=(id_config, DT_LOAD),
+        )
+    conn.commit()
+    return row_count
+
+
+def count_keys(conn, id_config=1):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT natural_key) FROM matkinh_daily "
+            "WHERE id_config = %s AND dt_load = %s",
+            (id_config, DT_LOAD),
+        )
+        return cur.fetchone()
+
+
+@pytest.mark.parametrize("load_method", ["copy", "execute_values"])
+def test_reloading_a_batch_replaces_its_rows(dw_conn, load_method):
+    first = load_csv(dw_conn, "copy")
+    second = load_csv(dw_conn, load_method)
+
+    assert first == second > 0
+    assert count_keys(dw_conn) == (first, first)
+
+
+def test_reload_keeps_other_batches(dw_conn):
+    load_csv(dw_conn, "copy", id_config=1)
+    load_csv(dw_conn, "copy", id_config=2)
+    row_count = load_csv(dw_conn, "copy", id_config=1)
+
+    assert count_keys(dw_conn, 2) == (row_count, row_count)
+
+
+def test_work_table_has_unique_keys_after_reload(dw_conn):
+    row_count = load_csv(dw_conn, "copy")
+    load_csv(dw_conn, "copy")
+
+    work_table = load_to_dw.create_work_table(dw_conn, 1, DT_LOAD, "matkinh_daily")
+    with dw_conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*), COUNT(DISTINCT natural_key) FROM {work_table}")
+        assert cur.fetchone() == (row_count, row_count)
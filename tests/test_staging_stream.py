@@ -0,0 +1,111 @@
+import csv
+import gzip
+
+import psycopg2.errors
+import pytest
+
+import b2_client
+import load_to_staging
+import partition_manager
+from test_staging_reload import CSV_PATH, DT_LOAD, count_keys
+
+FILE_NAME = "daily/data_matkinh_daily_2024-12-08_kinhmatviettin.vn.csv"
+DOWNLOAD_PATH = f"/file/bucket/{FILE_NAME}"
+
+
+def read_csv_rows():
+    with open(CSV_PATH, mode="r", encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+@pytest.fixture
+def uploaded(fake_b2):
+    """
+    B2 giả lập đã có file daily của DT_LOAD.
+    """
+    fake_b2.bucket.upload_local_file(CSV_PATH, FILE_NAME)
+    return fake_b2
+
+
+def refresher(fake, file_name, calls):
+    def refresh_url():
+        calls.append(file_name)
+        return fake.client.download_url(fake.bucket_name, file_name, refresh=True)
+
+    return refresh_url
+
+
+def test_stream_refreshes_rejected_token(uploaded):
+    url = uploaded.client.download_url("bucket", FILE_NAME)
+    # Token bị từ chối một lần (hết hạn hoặc bị thu hồi)
+    uploaded.inject(DOWNLOAD_PATH, 401)
+    calls = []
+
+    response, reader, headers = load_to_staging.open_csv_stream(
+        url, FILE_NAME, refresher(uploaded, FILE_NAME, calls), b2_client.file_sha1(CSV_PATH)
+    )
+    try:
+        rows = list(reader)
+    finally:
+        response.close()
+
+    assert [headers] + rows == read_csv_rows()
+    assert calls == [FILE_NAME]
+    assert uploaded.count(DOWNLOAD_PATH) == 2
+
+
+def test_stream_decodes_gzip(uploaded):
+    gz_name = FILE_NAME + ".gz"
+    with open(CSV_PATH, mode="rb") as f:
+        uploaded.bucket.upload_bytes(gzip.compress(f.read()), gz_name)
+
+    response, reader, headers = load_to_staging.open_csv_stream(
+        uploaded.client.download_url("bucket", gz_name), gz_name
+    )
+    try:
+        assert [headers] + list(reader) == read_csv_rows()
+    finally:
+        response.close()
+
+
+def test_stream_rejects_wrong_sha1(uploaded):
+    response, reader, _ = load_to_staging.open_csv_stream(
+        uploaded.client.download_url("bucket", FILE_NAME), FILE_NAME, expected_sha1="0" * 40
+    )
+    try:
+        with pytest.raises(ValueError):
+            list(reader)
+    finally:
+        response.close()
+
+
+def test_copy_fallback_reopens_download(uploaded, dw_conn, monkeypatch):
+    partition_manager.ensure_partition(dw_conn, "matkinh_daily", DT_LOAD)
+
+    def rejected_copy(conn, table_name, columns, rows):
+        # Server không cho COPY sau khi luồng tải đầu tiên đã được đọc một phần
+        next(iter(rows))
+        raise psycopg2.errors.InsufficientPrivilege("permission denied for COPY")
+
+    monkeypatch.setattr(load_to_staging, "copy_rows", rejected_copy)
+    url = uploaded.client.download_url("bucket", FILE_NAME)
+    uploaded.inject(DOWNLOAD_PATH, 401)
+    calls = []
+
+    assert load_to_staging.insert_csv_to_table(
+        dw_conn,
+        url,
+        "bucket",
+        FILE_NAME,
+        "matkinh_daily",
+        1,
+        DT_LOAD,
+        DT_LOAD,
+        refresh_url=refresher(uploaded, FILE_NAME, calls),
+        expected_sha1=b2_client.file_sha1(CSV_PATH),
+    ) is True
+    # Lần tải bị từ chối, lần đọc dở cho COPY và lần mở lại cho execute_values
+    assert uploaded.count(DOWNLOAD_PATH) == 3
+    assert calls == [FILE_NAME]
+    keys = {f"{row[1]}-{row[0]}" for row in read_csv_rows()[1:]}
+    assert count_keys(dw_conn) == (len(keys), len(keys))